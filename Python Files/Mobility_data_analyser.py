@@ -1,25 +1,328 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import argparse
+import glob
+import hashlib
+import io
+import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+import quality_rules
+from etl_telemetry import PipelineTelemetry, timed_stage
+import quantile_sketches
+import trip_cube
+import trip_histograms
+import trip_schema
+import trip_store
+
+
+def clean_frame(df, counts=None):
+    """
+    Remove trip records that violate an enforced quality rule (see quality_rules)
+
+    Args:
+        df: Raw trip DataFrame
+        counts: If given, an int64 array of length quality_rules.N_COMBINATIONS
+            that the rows per violation combination are added to, so counts
+            can be accumulated across chunks
+
+    Returns:
+        DataFrame: Copy of df containing only valid trips
+    """
+    mask = quality_rules.evaluate_rules(df)
+    if counts is not None:
+        counts += quality_rules.combination_counts(mask)
+    return df[quality_rules.is_valid(mask)].copy()
+
+
+def add_features(df):
+    """
+    Add the derived time and fare features to a cleaned trip DataFrame
+
+    Args:
+        df: Cleaned trip DataFrame (modified in place)
+
+    Returns:
+        DataFrame: df with the 8 derived columns (typed per trip_schema),
+            rows with inf/NaN metrics dropped
+    """
+    # Time-based features
+    df['hour'] = df['tpep_pickup_datetime'].dt.hour
+    df['day_of_week'] = df['tpep_pickup_datetime'].dt.dayofweek
+    df['day'] = df['tpep_pickup_datetime'].dt.day
+
+    # Categorical features
+    df['is_weekend'] = df['day_of_week'].isin([5, 6])
+    df['is_peak'] = df['hour'].isin([7, 8, 17, 18, 19])
+
+    # Calculated metrics
+    df['trip_duration'] = (
+                                  df['tpep_dropoff_datetime'] - df['tpep_pickup_datetime']
+                          ).dt.total_seconds() / 60
+    df['fare_per_mile'] = df['fare_amount'] / df['trip_distance']
+    df['tip_percentage'] = (df['tip_amount'] / df['fare_amount']) * 100
+
+    # Remove any infinity or NaN values created by calculations
+    df = df.replace([np.inf, -np.inf], np.nan)
+    df = df.dropna(subset=['fare_per_mile', 'tip_percentage', 'trip_duration'])
+
+    return trip_schema.apply_feature_dtypes(df)
+
+
+def file_fingerprint(filepath, with_hash=True):
+    """
+    Fingerprint a source file for the incremental manifest
+
+    Args:
+        filepath: Path to the file
+        with_hash: Also compute the SHA-256 of the content (reads the whole file)
+
+    Returns:
+        dict: size, mtime_ns and (optionally) sha256
+    """
+    stat = os.stat(filepath)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(8 * 1024 * 1024), b''):
+                digest.update(block)
+        fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+def load_manifest(manifest_path):
+    """
+    Load the processed-file manifest (empty if it does not exist yet)
+
+    Args:
+        manifest_path: Path to the manifest JSON file
+
+    Returns:
+        dict: {'files': {source file name: entry}}
+    """
+    if not os.path.exists(manifest_path):
+        return {'files': {}}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, manifest_path):
+    """
+    Atomically write the processed-file manifest
+
+    Args:
+        manifest: Manifest dict
+        manifest_path: Path to the manifest JSON file
+    """
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+# Lookup table for the is_peak flag (7-9 AM, 5-7 PM), indexed by hour
+PEAK_HOURS = np.zeros(24, dtype=bool)
+PEAK_HOURS[[7, 8, 17, 18, 19]] = True
+
+NS_PER_HOUR = 3_600_000_000_000
+NS_PER_DAY = 86_400_000_000_000
+
+
+def fused_clean_and_engineer(df, counts=None):
+    """
+    Single-pass equivalent of add_features(clean_frame(df)). Takes the validity
+    mask from the quality rules and computes all derived columns directly on
+    the NumPy arrays, writing into preallocated outputs instead of building
+    intermediate boolean Series and full-frame copies.
+
+    Args:
+        df: Raw trip DataFrame (not modified)
+        counts: Optional violation combination counts to add to (see clean_frame)
+
+    Returns:
+        DataFrame: Valid trips with the 8 derived columns, identical to the
+            clean_data -> feature_engineering chain
+    """
+    violations = quality_rules.evaluate_rules(df)
+    if counts is not None:
+        counts += quality_rules.combination_counts(violations)
+
+    # Validity mask (NaT timestamps would yield a NaN trip_duration, which the
+    # unfused chain drops afterwards)
+    mask = quality_rules.is_valid(violations)
+    del violations
+    scratch = np.empty(len(df), dtype=bool)
+    for stamps in (df['tpep_pickup_datetime'].to_numpy(), df['tpep_dropoff_datetime'].to_numpy()):
+        np.isnat(stamps, out=scratch)
+        np.logical_not(scratch, out=scratch)
+        np.logical_and(mask, scratch, out=mask)
+    del scratch
+
+    rows = np.flatnonzero(mask)
+    del mask
+    out = df.iloc[rows]
+    m = len(rows)
+
+    pickup_ns = out['tpep_pickup_datetime'].to_numpy().view('int64')
+    dropoff_ns = out['tpep_dropoff_datetime'].to_numpy().view('int64')
+    fare = out['fare_amount'].to_numpy()
+
+    # Preallocated outputs and work buffers
+    hour = np.empty(m, dtype=np.int8)
+    day_of_week = np.empty(m, dtype=np.int8)
+    day = np.empty(m, dtype=np.int8)
+    is_weekend = np.empty(m, dtype=bool)
+    is_peak = np.empty(m, dtype=bool)
+    trip_duration = np.empty(m, dtype=np.float32)
+    fare_per_mile = np.empty(m, dtype=np.float32)
+    tip_percentage = np.empty(m, dtype=np.float32)
+    work = np.empty(m, dtype=np.int64)
+    work_f = np.empty(m, dtype=np.float64)
+
+    # Time-based features
+    np.floor_divide(pickup_ns, NS_PER_HOUR, out=work)
+    np.remainder(work, 24, out=work)
+    np.copyto(hour, work, casting='unsafe')
+
+    np.floor_divide(pickup_ns, NS_PER_DAY, out=work)
+    month_start = work.view('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').view('int64')
+    np.subtract(work, month_start, out=month_start)
+    np.add(month_start, 1, out=month_start)
+    np.copyto(day, month_start, casting='unsafe')
+    del month_start
+
+    np.add(work, 3, out=work)  # 1970-01-01 was a Thursday; Monday = 0
+    np.remainder(work, 7, out=work)
+    np.copyto(day_of_week, work, casting='unsafe')
+
+    # Categorical features
+    np.greater_equal(day_of_week, 5, out=is_weekend)
+    np.take(PEAK_HOURS, hour, out=is_peak)
+
+    # Calculated metrics (same operation order as the pandas chain)
+    np.subtract(dropoff_ns, pickup_ns, out=work)
+    np.divide(work, 1e9, out=work_f)
+    np.divide(work_f, 60, out=work_f)
+    np.copyto(trip_duration, work_f, casting='same_kind')
+
+    np.divide(fare, out['trip_distance'].to_numpy(), out=work_f)
+    np.copyto(fare_per_mile, work_f, casting='same_kind')
+
+    np.divide(out['tip_amount'].to_numpy(), fare, out=work_f)
+    np.multiply(work_f, 100, out=work_f)
+    np.copyto(tip_percentage, work_f, casting='same_kind')
+    del work, work_f
+
+    return out.assign(
+        hour=hour,
+        day_of_week=day_of_week,
+        day=day,
+        is_weekend=is_weekend,
+        is_peak=is_peak,
+        trip_duration=trip_duration,
+        fare_per_mile=fare_per_mile,
+        tip_percentage=tip_percentage
+    )
+
+
+def split_byte_ranges(filepath, n_ranges):
+    """
+    Split a CSV file into newline-aligned byte ranges covering every data row
+
+    Args:
+        filepath: Path to the CSV file
+        n_ranges: Target number of ranges (fewer are returned for small files)
+
+    Returns:
+        tuple: (header column names, list of (start, end) byte offsets)
+    """
+    file_size = os.path.getsize(filepath)
+
+    with open(filepath, 'rb') as f:
+        header_line = f.readline()
+        data_start = f.tell()
+        names = header_line.decode('utf-8').strip().split(',')
+
+        step = max((file_size - data_start) // max(n_ranges, 1), 1)
+        boundaries = [data_start]
+        for i in range(1, n_ranges):
+            f.seek(data_start + i * step)
+            f.readline()  # skip to the start of the next full row
+            offset = f.tell()
+            if boundaries[-1] < offset < file_size:
+                boundaries.append(offset)
+        boundaries.append(file_size)
+
+    ranges = [(start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start]
+    return names, ranges
+
+
+def _init_ingest_worker():
+    # Each process parses one range; keep Arrow from spawning its own thread pool
+    pa.set_cpu_count(1)
+    pa.set_io_thread_count(1)
+
+
+def process_byte_range(filepath, names, start, end, part_path=None):
+    """
+    Parse, clean and feature-engineer one byte range of a trip CSV
+
+    Args:
+        filepath: Path to the CSV file
+        names: Header column names
+        start: First byte of the range (start of a row)
+        end: Byte after the last row of the range
+        part_path: If given, write the result to this Parquet file instead of
+            returning it
+
+    Returns:
+        tuple: (rows read, quality combination counts, processed DataFrame or
+            None when written to part_path)
+    """
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    df = trip_schema.read_trips_csv(io.BytesIO(data), names=names)
+    del data
+    rows_read = len(df)
+
+    counts = np.zeros(quality_rules.N_COMBINATIONS, dtype=np.int64)
+    df = add_features(clean_frame(df, counts))
+
+    if part_path is not None:
+        pq.write_table(trip_schema.to_arrow(df), part_path, compression='snappy')
+        return rows_read, counts, None
+    return rows_read, counts, df
+
 
 class MobilityDataAnalyzer:
     """
     NYC Taxi Trip Data Analyzer - Handles data ingestion, cleaning, and feature engineering
     """
 
-    def __init__(self, filepath):
+    def __init__(self, filepath, telemetry=None):
         """
         Initialize the analyzer with data file path
 
         Args:
             filepath: Path to the CSV file containing taxi trip data
+            telemetry: PipelineTelemetry collecting per-stage timing and memory
+                (a new one is created if not given)
         """
         self.filepath = filepath
         self.df = None
+        self.quality_counts = None
+        self.telemetry = telemetry or PipelineTelemetry('pandas_etl')
+        self.telemetry_record = None
         print(f"Initialized MobilityDataAnalyzer for: {filepath}")
 
+    @timed_stage('load')
     def load_data(self):
         """
         Load taxi trip data from CSV file
@@ -32,22 +335,15 @@ class MobilityDataAnalyzer:
         print("=" * 60)
         print(f"Reading file: {self.filepath}")
 
-        start_time = datetime.now()
-
-        self.df = pd.read_csv(
-            self.filepath,
-            parse_dates=['tpep_pickup_datetime', 'tpep_dropoff_datetime']
-        )
-
-        load_time = (datetime.now() - start_time).total_seconds()
+        self.df = trip_schema.read_trips_csv(self.filepath)
 
         print(f"✓ Successfully loaded {len(self.df):,} rows")
         print(f"✓ Columns: {len(self.df.columns)}")
         print(f"✓ Memory usage: {self.df.memory_usage(deep=True).sum() / 1024 ** 2:.2f} MB")
-        print(f"✓ Load time: {load_time:.2f} seconds")
 
         return self
 
+    @timed_stage('clean')
     def clean_data(self):
         """
         Clean data by removing invalid records
@@ -70,16 +366,12 @@ class MobilityDataAnalyzer:
         print("  - Removing total_amount <= 0")
         print("  - Removing negative tips")
 
-        self.df = self.df[
-            (self.df['passenger_count'] > 0) &
-            (self.df['passenger_count'] <= 6) &
-            (self.df['trip_distance'] > 0.1) &
-            (self.df['trip_distance'] < 100) &
-            (self.df['fare_amount'] > 0) &
-            (self.df['fare_amount'] < 500) &
-            (self.df['total_amount'] > 0) &
-            (self.df['tip_amount'] >= 0)
-            ].copy()
+        # One vectorized pass over all quality rules; the enforced ones are the
+        # filters above, the rest (timestamps, duration, NYC bounds, payment
+        # codes) are reported only
+        self.quality_counts = np.zeros(quality_rules.N_COMBINATIONS, dtype=np.int64)
+        self.df = clean_frame(self.df, self.quality_counts)
+        quality_rules.print_report(self.quality_counts)
 
         removed_rows = initial_rows - len(self.df)
         removal_pct = (removed_rows / initial_rows) * 100
@@ -89,6 +381,7 @@ class MobilityDataAnalyzer:
 
         return self
 
+    @timed_stage('features')
     def feature_engineering(self):
         """
         Create new features from existing data
@@ -101,35 +394,14 @@ class MobilityDataAnalyzer:
         print("=" * 60)
 
         print("Creating new features:")
-
-        # Time-based features
         print("  - Extracting hour, day_of_week, day from pickup datetime")
-        self.df['hour'] = self.df['tpep_pickup_datetime'].dt.hour
-        self.df['day_of_week'] = self.df['tpep_pickup_datetime'].dt.dayofweek
-        self.df['day'] = self.df['tpep_pickup_datetime'].dt.day
-
-        # Categorical features
         print("  - Creating is_weekend flag")
-        self.df['is_weekend'] = self.df['day_of_week'].isin([5, 6])
-
         print("  - Creating is_peak flag (7-9 AM, 5-7 PM)")
-        self.df['is_peak'] = self.df['hour'].isin([7, 8, 17, 18, 19])
-
-        # Calculated metrics
         print("  - Calculating trip_duration (minutes)")
-        self.df['trip_duration'] = (
-                                           self.df['tpep_dropoff_datetime'] - self.df['tpep_pickup_datetime']
-                                   ).dt.total_seconds() / 60
-
         print("  - Calculating fare_per_mile")
-        self.df['fare_per_mile'] = self.df['fare_amount'] / self.df['trip_distance']
-
         print("  - Calculating tip_percentage")
-        self.df['tip_percentage'] = (self.df['tip_amount'] / self.df['fare_amount']) * 100
 
-        # Remove any infinity or NaN values created by calculations
-        self.df = self.df.replace([np.inf, -np.inf], np.nan)
-        self.df = self.df.dropna(subset=['fare_per_mile', 'tip_percentage', 'trip_duration'])
+        self.df = add_features(self.df)
 
         print(f"\n✓ Added 8 new features")
         print(f"✓ Final dataset: {len(self.df):,} rows × {len(self.df.columns)} columns")
@@ -138,12 +410,46 @@ class MobilityDataAnalyzer:
 
         return self
 
-    def export_clean_data(self, output_path='cleaned_trips.parquet'):
+    @timed_stage('clean_and_features_fused')
+    def clean_and_engineer(self):
+        """
+        Run cleaning and feature engineering as one fused NumPy pass
+        (see fused_clean_and_engineer). Replaces clean_data().feature_engineering().
+
+        Returns:
+            self: For method chaining
+        """
+        print("\n" + "=" * 60)
+        print("STEP 2+3: CLEANING & FEATURE ENGINEERING (FUSED)")
+        print("=" * 60)
+
+        initial_rows = len(self.df)
+        print(f"Initial row count: {initial_rows:,}")
+
+        self.quality_counts = np.zeros(quality_rules.N_COMBINATIONS, dtype=np.int64)
+        self.df = fused_clean_and_engineer(self.df, self.quality_counts)
+        quality_rules.print_report(self.quality_counts)
+
+        removed_rows = initial_rows - len(self.df)
+
+        print(f"\n✓ Cleaned: {len(self.df):,} rows remaining")
+        print(f"✓ Removed: {removed_rows:,} rows ({(removed_rows / initial_rows) * 100:.2f}%)")
+        print(f"✓ Final dataset: {len(self.df):,} rows × {len(self.df.columns)} columns")
+
+        return self
+
+    @timed_stage('export')
+    def export_clean_data(self, output_path='cleaned_trips.parquet', partition_by=None, arrow_path=None):
         """
         Export cleaned and engineered data to Parquet file
 
         Args:
-            output_path: Path for output file
+            output_path: Path for output file (dataset directory when partitioned)
+            partition_by: None for a single file, 'date' for a pickup_date=...
+                partitioned dataset, or 'hour' for pickup_date=.../pickup_hour=...
+                Partitioned output is sorted by pickup time (see trip_store)
+            arrow_path: If given, also write an uncompressed Arrow IPC file here
+                for memory-mapped, zero-decode loads
 
         Returns:
             self: For method chaining
@@ -154,12 +460,26 @@ class MobilityDataAnalyzer:
 
         print(f"Saving to: {output_path}")
 
-        self.df.to_parquet(output_path, index=False, compression='snappy')
-
-        file_size = os.path.getsize(output_path) / (1024 ** 2)
+        if partition_by is None:
+            pq.write_table(trip_schema.to_arrow(self.df), output_path, compression='snappy')
+            file_size = os.path.getsize(output_path) / (1024 ** 2)
+        else:
+            if partition_by not in ('date', 'hour'):
+                raise ValueError(f"partition_by must be None, 'date' or 'hour', got {partition_by!r}")
+            n_files = trip_store.write_partitioned(self.df, output_path, partition_hour=partition_by == 'hour')
+            file_size = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(output_path) for name in names
+            ) / (1024 ** 2)
+            print(f"✓ Partitioned by {'pickup date and hour' if partition_by == 'hour' else 'pickup date'}: "
+                  f"{n_files} files")
 
         print(f"✓ Successfully saved!")
         print(f"✓ File size: {file_size:.2f} MB")
+
+        if arrow_path is not None:
+            ipc_size = trip_store.write_arrow_ipc(self.df, arrow_path) / (1024 ** 2)
+            print(f"✓ Arrow IPC copy: {arrow_path} ({ipc_size:.2f} MB, uncompressed, memory-mappable)")
         print(f"✓ Rows: {len(self.df):,}")
         print(f"✓ Columns: {len(self.df.columns)}")
 
@@ -174,21 +494,389 @@ class MobilityDataAnalyzer:
 
         return self
 
+    @timed_stage('stream')
+    def process_in_chunks(self, output_path='cleaned_trips.parquet', chunksize=1_000_000):
+        """
+        Streaming alternative to load_data -> clean_data -> feature_engineering ->
+        export_clean_data. Reads the CSV in fixed-size chunks, cleans and engineers
+        each chunk, and appends it as a row group to an incremental Parquet writer,
+        so peak memory depends on chunksize rather than on the size of the input.
+
+        Args:
+            output_path: Path for output file
+            chunksize: Number of CSV rows read per chunk
+
+        Returns:
+            self: For method chaining (self.df is left as None)
+        """
+        print("\n" + "=" * 60)
+        print("STREAMING PIPELINE: LOAD → CLEAN → FEATURES → EXPORT")
+        print("=" * 60)
+        print(f"Reading file: {self.filepath}")
+        print(f"Chunk size: {chunksize:,} rows")
+
+        reader = trip_schema.read_trips_csv(self.filepath, chunksize=chunksize)
+
+        # Opened with the first chunk's schema, which carries the pandas metadata,
+        # so the file reads back with the same dtypes as export_clean_data's
+        writer = None
+        rows_read = 0
+        rows_written = 0
+        self.quality_counts = np.zeros(quality_rules.N_COMBINATIONS, dtype=np.int64)
+
+        try:
+            for i, chunk in enumerate(reader, 1):
+                rows_read += len(chunk)
+                chunk = add_features(clean_frame(chunk, self.quality_counts))
+
+                table = trip_schema.to_arrow(chunk)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema, compression='snappy')
+                writer.write_table(table)
+                rows_written += len(chunk)
+
+                print(f"  Chunk {i}: {rows_read:,} rows read, {rows_written:,} rows written")
+        finally:
+            if writer is None:
+                writer = pq.ParquetWriter(output_path, trip_schema.CLEANED_SCHEMA, compression='snappy')
+            writer.close()
+
+        self.telemetry_record.update(rows_in=rows_read, rows_out=rows_written)
+        quality_rules.print_report(self.quality_counts)
+        removed_rows = rows_read - rows_written
+        file_size = os.path.getsize(output_path) / (1024 ** 2)
+
+        print(f"\n✓ Read: {rows_read:,} rows")
+        print(f"✓ Removed: {removed_rows:,} rows ({(removed_rows / max(rows_read, 1)) * 100:.2f}%)")
+        print(f"✓ Saved: {rows_written:,} rows to {output_path} ({file_size:.2f} MB)")
+
+        print("\n" + "=" * 60)
+        print("DATA PROCESSING COMPLETE!")
+        print("=" * 60)
+
+        return self
+
+    @timed_stage('parallel_ingest')
+    def process_parallel(self, workers=None, output_dir=None, ranges_per_worker=4):
+        """
+        Parallel alternative to load_data -> clean_data -> feature_engineering.
+        Splits the CSV into newline-aligned byte ranges and parses, cleans and
+        engineers each range in a process pool.
+
+        Args:
+            workers: Number of worker processes (default: all cores)
+            output_dir: If given, write one Parquet part file per range into this
+                directory instead of merging the results into self.df
+            ranges_per_worker: Ranges per worker, so faster workers pick up the
+                remaining ranges instead of idling
+
+        Returns:
+            self: For method chaining (self.df holds the merged dataset unless
+                output_dir is set)
+        """
+        workers = workers or os.cpu_count()
+
+        print("\n" + "=" * 60)
+        print("PARALLEL PIPELINE: LOAD → CLEAN → FEATURES")
+        print("=" * 60)
+        print(f"Reading file: {self.filepath}")
+
+        names, ranges = split_byte_ranges(self.filepath, workers * ranges_per_worker)
+        print(f"Workers: {workers}, byte ranges: {len(ranges)}")
+
+        part_paths = [None] * len(ranges)
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+            part_paths = [os.path.join(output_dir, f"part-{i:05d}.parquet") for i in range(len(ranges))]
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_ingest_worker) as pool:
+            futures = [
+                pool.submit(process_byte_range, self.filepath, names, start, end, part_path)
+                for (start, end), part_path in zip(ranges, part_paths)
+            ]
+            results = [future.result() for future in futures]
+
+        rows_read = sum(rows for rows, _, _ in results)
+        self.quality_counts = sum(counts for _, counts, _ in results)
+        quality_rules.print_report(self.quality_counts)
+
+        if output_dir is None:
+            self.df = pd.concat([df for _, _, df in results], ignore_index=True)
+            rows_written = len(self.df)
+        else:
+            self.df = None
+            rows_written = sum(pq.read_metadata(path).num_rows for path in part_paths)
+
+        self.telemetry_record.update(rows_in=rows_read, rows_out=rows_written)
+        removed_rows = rows_read - rows_written
+
+        print(f"\n✓ Read: {rows_read:,} rows")
+        print(f"✓ Removed: {removed_rows:,} rows ({(removed_rows / max(rows_read, 1)) * 100:.2f}%)")
+        if output_dir is None:
+            print(f"✓ Merged dataset: {rows_written:,} rows × {len(self.df.columns)} columns")
+        else:
+            print(f"✓ Saved: {rows_written:,} rows in {len(part_paths)} part files under {output_dir}")
+
+        return self
+
+    @timed_stage('cube')
+    def build_cube(self, cube_path=trip_cube.CUBE_PATH, source=None):
+        """
+        Materialize the rollup cube (see trip_cube) that the dashboard and the
+        GenAI script aggregate from instead of the trip-level data
+
+        Args:
+            cube_path: Output Parquet path
+            source: Cleaned trips to read when self.df is not loaded (after the
+                streaming, parallel-parts or incremental modes); recorded in the
+                cube so load_cube() rebuilds it when they change
+
+        Returns:
+            self: For method chaining
+        """
+        print("\n" + "=" * 60)
+        print("STEP 5: BUILDING ROLLUP CUBE")
+        print("=" * 60)
+
+        trips = self.df if self.df is not None else trip_store.read_trips(source, columns=trip_cube.SOURCE_COLUMNS)
+        cube = trip_cube.build_cube(trips)
+        size = trip_cube.write_cube(cube, cube_path, source)
+        self.telemetry_record.update(rows_in=len(trips), rows_out=len(cube))
+
+        print(f"✓ {len(trips):,} trips → {len(cube):,} cells")
+        print(f"✓ Saved: {cube_path} ({size / 1024 ** 2:.2f} MB)")
+
+        return self
+
+    @timed_stage('histograms')
+    def build_histograms(self, histograms_path=trip_histograms.HISTOGRAMS_PATH, source=None):
+        """
+        Precompute the per-date fare and distance bin counts (see
+        trip_histograms) that the distribution charts are drawn from
+
+        Args:
+            histograms_path: Output Parquet path
+            source: Cleaned trips to read when self.df is not loaded (recorded
+                in the output, see trip_store.write_derived)
+
+        Returns:
+            self: For method chaining
+        """
+        print("\n" + "=" * 60)
+        print("STEP 6: PRECOMPUTING HISTOGRAMS")
+        print("=" * 60)
+
+        trips = self.df if self.df is not None else trip_store.read_trips(
+            source, columns=trip_histograms.SOURCE_COLUMNS)
+        histograms = trip_histograms.build_histograms(trips)
+        size = trip_histograms.write_histograms(histograms, histograms_path, source)
+        self.telemetry_record.update(rows_in=len(trips), rows_out=len(histograms))
+
+        print(f"✓ {len(trips):,} trips → {len(histograms):,} date/bin counts")
+        print(f"✓ Saved: {histograms_path} ({size / 1024:.1f} KB)")
+
+        return self
+
+    @timed_stage('sketches')
+    def build_sketches(self, sketches_path=quantile_sketches.SKETCHES_PATH, source=None):
+        """
+        Sketch the fare, duration and tip distributions per pickup date and hour
+        (see quantile_sketches) for the percentile KPIs
+
+        Args:
+            sketches_path: Output Parquet path
+            source: Cleaned trips to read when self.df is not loaded (recorded
+                in the output, see trip_store.write_derived)
+
+        Returns:
+            self: For method chaining
+        """
+        print("\n" + "=" * 60)
+        print("STEP 7: SKETCHING DISTRIBUTIONS")
+        print("=" * 60)
+
+        trips = self.df if self.df is not None else trip_store.read_trips(
+            source, columns=quantile_sketches.SOURCE_COLUMNS)
+        sketches = quantile_sketches.build_sketches(trips)
+        size = sketches.save(sketches_path, source)
+        groups = len(sketches)
+        self.telemetry_record.update(rows_in=len(trips), rows_out=groups)
+
+        print(f"✓ {len(trips):,} trips → {groups:,} date/hour sketches of {', '.join(sketches.columns)}")
+        print(f"✓ Saved: {sketches_path} ({size / 1024:.1f} KB)")
+
+        return self
+
+    def process_incremental(self, output_dir='cleaned_trips', pattern='*.csv', chunksize=1_000_000):
+        """
+        Incremental mode for a directory of monthly trip files. Each file's
+        fingerprint is recorded in output_dir/_manifest.json; only new or changed
+        files are processed (with process_in_chunks) into one Parquet file per
+        source next to the existing outputs. output_dir can be read as a single
+        dataset, e.g. pd.read_parquet(output_dir).
+
+        Args:
+            output_dir: Directory holding the per-file Parquet outputs and manifest
+            pattern: Glob pattern for source files inside self.filepath
+            chunksize: Rows per chunk when streaming each file
+
+        Returns:
+            self: For method chaining
+        """
+        print("\n" + "=" * 60)
+        print("INCREMENTAL PIPELINE")
+        print("=" * 60)
+        print(f"Source directory: {self.filepath}")
+        print(f"Output directory: {output_dir}")
+
+        os.makedirs(output_dir, exist_ok=True)
+        manifest_path = os.path.join(output_dir, '_manifest.json')
+        manifest = load_manifest(manifest_path)
+        entries = manifest['files']
+
+        sources = sorted(glob.glob(os.path.join(self.filepath, pattern)))
+        processed, skipped = [], []
+        # Quality counts of the files processed in this run
+        self.quality_counts = np.zeros(quality_rules.N_COMBINATIONS, dtype=np.int64)
+
+        for source in sources:
+            name = os.path.basename(source)
+            entry = entries.get(name)
+            fingerprint = file_fingerprint(source, with_hash=False)
+            output_path = os.path.join(output_dir, os.path.splitext(name)[0] + '.parquet')
+
+            # Size and mtime unchanged and output still there: trust the manifest
+            # without re-reading the file
+            if (entry and entry['size'] == fingerprint['size'] and entry['mtime_ns'] == fingerprint['mtime_ns']
+                    and os.path.exists(output_path)):
+                skipped.append(name)
+                continue
+
+            fingerprint = file_fingerprint(source)
+
+            # Touched but identical content: refresh the manifest only
+            if entry and entry['sha256'] == fingerprint['sha256'] and os.path.exists(output_path):
+                entry.update(fingerprint)
+                save_manifest(manifest, manifest_path)
+                skipped.append(name)
+                continue
+
+            print(f"\n→ {'Reprocessing changed' if entry else 'Processing new'} file: {name}")
+            tmp_path = os.path.join(output_dir, '.' + os.path.basename(output_path) + '.tmp')
+            analyzer = MobilityDataAnalyzer(source, telemetry=self.telemetry)
+            analyzer.process_in_chunks(tmp_path, chunksize=chunksize)
+            self.quality_counts += analyzer.quality_counts
+            os.replace(tmp_path, output_path)
+
+            entries[name] = dict(
+                fingerprint,
+                output=os.path.basename(output_path),
+                rows=pq.read_metadata(output_path).num_rows,
+                processed_at=datetime.now().isoformat(timespec='seconds')
+            )
+            save_manifest(manifest, manifest_path)
+            processed.append(name)
+
+        missing = sorted(set(entries) - {os.path.basename(source) for source in sources})
+
+        print("\n" + "=" * 60)
+        print("INCREMENTAL SUMMARY")
+        print("=" * 60)
+        print(f"✓ Processed: {len(processed)} file(s) {processed if processed else ''}")
+        print(f"✓ Up to date: {len(skipped)} file(s)")
+        if len(processed) > 1:
+            quality_rules.print_report(self.quality_counts)
+        if missing:
+            print(f"⚠ In manifest but no longer in source directory: {missing}")
+        print(f"✓ Total rows in {output_dir}: {sum(entry['rows'] for entry in entries.values()):,}")
+
+        return self
+
 
 # ============================================================================
 # EXECUTION - Uncomment the lines below when ready to run
 # ============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NYC taxi ETL: clean, engineer features and export to Parquet")
+    parser.add_argument('input', nargs='?', default='yellow_tripdata_2015-01.csv',
+                        help="Raw trip CSV file")
+    parser.add_argument('--output', default=None,
+                        help="Output Parquet path (default: cleaned_trips.parquet, or the cleaned_trips/ "
+                             "directory with --incremental)")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="Stream the CSV in chunks of this many rows (bounded memory)")
+    parser.add_argument('--fused', action='store_true',
+                        help="Clean and engineer features in one fused NumPy pass")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Parse, clean and engineer byte ranges of the CSV in this many processes")
+    parser.add_argument('--parts-dir', default=None,
+                        help="With --workers, write one Parquet part file per range into this directory")
+    parser.add_argument('--partition-by', choices=['date', 'hour'], default=None,
+                        help="Write a hive-partitioned dataset sorted by pickup time instead of one file")
+    parser.add_argument('--arrow-ipc', default=None, metavar='PATH',
+                        help="Also write an uncompressed Arrow IPC file (e.g. cleaned_trips.arrow) for mmap loads")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Treat input as a directory of monthly CSVs; process only new or changed "
+                             "files into the --output directory")
+    parser.add_argument('--cube', default=trip_cube.CUBE_PATH,
+                        help="Path of the rollup cube built from the cleaned trips")
+    parser.add_argument('--no-cube', action='store_true', help="Skip building the rollup cube")
+    parser.add_argument('--histograms', default=trip_histograms.HISTOGRAMS_PATH,
+                        help="Path of the pre-binned fare/distance histograms")
+    parser.add_argument('--no-histograms', action='store_true', help="Skip precomputing the histograms")
+    parser.add_argument('--sketches', default=quantile_sketches.SKETCHES_PATH,
+                        help="Path of the fare/duration/tip quantile sketches")
+    parser.add_argument('--no-sketches', action='store_true', help="Skip building the quantile sketches")
+    parser.add_argument('--telemetry', default='etl_telemetry.csv',
+                        help="Append per-stage timing/memory records to this .csv or .jsonl file")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Also record the tracemalloc allocation peak of each stage (slower)")
+    args = parser.parse_args()
+    if args.output is None:
+        args.output = 'cleaned_trips' if args.incremental else 'cleaned_trips.parquet'
+
     # Create analyzer and run full pipeline
-    analyzer = MobilityDataAnalyzer('yellow_tripdata_2015-01.csv')
+    telemetry = PipelineTelemetry('pandas_etl', trace_memory=args.trace_memory)
+    analyzer = MobilityDataAnalyzer(args.input, telemetry=telemetry)
 
     # Execute all steps
-    analyzer.load_data().clean_data().feature_engineering().export_clean_data()
+    if args.incremental:
+        analyzer.process_incremental(args.output, chunksize=args.chunksize or 1_000_000)
+    elif args.chunksize:
+        analyzer.process_in_chunks(args.output, chunksize=args.chunksize)
+    elif args.workers and args.parts_dir:
+        analyzer.process_parallel(args.workers, output_dir=args.parts_dir)
+        args.output = args.parts_dir
+    elif args.workers:
+        analyzer.process_parallel(args.workers).export_clean_data(
+            args.output, args.partition_by, args.arrow_ipc)
+    elif args.fused:
+        analyzer.load_data().clean_and_engineer().export_clean_data(
+            args.output, args.partition_by, args.arrow_ipc)
+    else:
+        analyzer.load_data().clean_data().feature_engineering().export_clean_data(
+            args.output, args.partition_by, args.arrow_ipc)
+
+    if not args.no_cube:
+        analyzer.build_cube(args.cube, source=args.output)
+    if not args.no_histograms:
+        analyzer.build_histograms(args.histograms, source=args.output)
+    if not args.no_sketches:
+        analyzer.build_sketches(args.sketches, source=args.output)
+
+    telemetry.write(args.telemetry)
 
     print("\n✅ All steps completed successfully!")
-    print("📁 Output saved to: cleaned_trips.parquet")
+    print(f"📁 Output saved to: {args.output}")
+    if not args.no_cube:
+        print(f"🧊 Rollup cube saved to: {args.cube}")
+    if not args.no_histograms:
+        print(f"📊 Histograms saved to: {args.histograms}")
+    if not args.no_sketches:
+        print(f"📐 Quantile sketches saved to: {args.sketches}")
+    print(f"📈 Stage telemetry appended to: {args.telemetry}")
     print("\nNext steps:")
-    print("  1. Load cleaned_trips.parquet for KPI analysis")
+    print(f"  1. Load {args.output} for KPI analysis")
     print("  2. Create visualizations")
     print("  3. Run SQL analytics")
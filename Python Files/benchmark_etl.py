@@ -0,0 +1,231 @@
+"""
+ETL and KPI benchmark suite on synthetic trips.
+
+For each scale, a synthetic CSV is generated once (and cached), then every
+MobilityDataAnalyzer stage (load, clean, features, export, the fused kernel,
+streaming and the parallel ingest) and the KPI computations are timed through
+PipelineTelemetry. The best of --repeats runs per stage is compared against a
+stored baseline, and stages that got slower than the tolerance are flagged.
+Baselines are machine-specific: record one with --update-baseline on the machine
+that runs the comparison.
+"""
+
+import pandas as pd
+import argparse
+import io
+import json
+import os
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import kpi_engine
+from etl_telemetry import PipelineTelemetry
+from Mobility_data_analyser import MobilityDataAnalyzer
+import synthetic_trips
+
+BASELINE_PATH = 'benchmark_baseline.json'
+RESULTS_PATH = 'benchmark_etl.csv'
+
+# Stages faster than this are too noisy to flag on relative change alone
+NOISE_FLOOR_SECONDS = 0.05
+
+
+def ensure_dataset(n_rows, data_dir, seed=2015, dirty_fraction=0.02):
+    """
+    Return the synthetic CSV for a scale, generating it on first use
+
+    Args:
+        n_rows: Number of trips
+        data_dir: Directory holding the cached CSVs
+        seed: Generator seed (part of the cache key)
+        dirty_fraction: Share of defective rows (part of the cache key)
+
+    Returns:
+        str: CSV path
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"synthetic_{n_rows}_s{seed}_d{dirty_fraction:g}.csv")
+    if not os.path.exists(path):
+        print(f"  Generating {n_rows:,} synthetic trips → {path}")
+        partial = path + '.tmp'
+        synthetic_trips.write_trips_csv(partial, n_rows, seed, dirty_fraction)
+        os.replace(partial, path)
+    return path
+
+
+def run_once(csv_path, work_dir, workers=None):
+    """
+    Run every analyzer stage and the KPI computations once
+
+    Args:
+        csv_path: Synthetic trip CSV
+        work_dir: Directory for the Parquet outputs
+        workers: Processes for the parallel ingest (default: all cores)
+
+    Returns:
+        list: Telemetry records of all stages
+    """
+    telemetries = {name: PipelineTelemetry(name, verbose=False)
+                   for name in ['pandas_etl', 'pandas_fused', 'pandas_stream', 'pandas_parallel', 'kpis']}
+
+    # The analyzer reports progress on stdout; keep the benchmark output readable
+    with redirect_stdout(io.StringIO()):
+        analyzer = MobilityDataAnalyzer(csv_path, telemetry=telemetries['pandas_etl'])
+        analyzer.load_data().clean_data().feature_engineering()
+        analyzer.export_clean_data(os.path.join(work_dir, 'cleaned_trips.parquet'))
+
+        MobilityDataAnalyzer(csv_path, telemetry=telemetries['pandas_fused']).load_data().clean_and_engineer()
+        MobilityDataAnalyzer(csv_path, telemetry=telemetries['pandas_stream']).process_in_chunks(
+            os.path.join(work_dir, 'cleaned_trips_stream.parquet'))
+        MobilityDataAnalyzer(csv_path, telemetry=telemetries['pandas_parallel']).process_parallel(workers)
+
+    # Streaming must write exactly what the in-memory pipeline writes, dtypes
+    # included, as read back by any Parquet reader
+    pd.testing.assert_frame_equal(pd.read_parquet(os.path.join(work_dir, 'cleaned_trips_stream.parquet')),
+                                  pd.read_parquet(os.path.join(work_dir, 'cleaned_trips.parquet')),
+                                  check_dtype=True)
+
+    df = analyzer.df
+    kpis = telemetries['kpis']
+    with kpis.stage('kpi_single_pass', rows_in=len(df)):
+        kpi_engine.compute_all(df[kpi_engine.KPI_COLUMNS])
+
+    return [record for telemetry in telemetries.values() for record in telemetry.records]
+
+
+def benchmark_scale(n_rows, data_dir, repeats=1, workers=None):
+    """
+    Benchmark all stages at one scale
+
+    Args:
+        n_rows: Number of synthetic trips
+        data_dir: Directory for the cached CSVs and scratch outputs
+        repeats: Runs per stage; the fastest is kept
+        workers: Processes for the parallel ingest
+
+    Returns:
+        DataFrame: One row per pipeline stage with the best wall time of the runs
+    """
+    csv_path = ensure_dataset(n_rows, data_dir)
+    work_dir = os.path.join(data_dir, f"work_{n_rows}")
+    os.makedirs(work_dir, exist_ok=True)
+
+    records = []
+    for _ in range(repeats):
+        records.extend(run_once(csv_path, work_dir, workers))
+
+    runs = pd.DataFrame(records)
+    best = runs.loc[runs.groupby(['pipeline', 'stage'], sort=False)['wall_seconds'].idxmin()]
+    best = best[['pipeline', 'stage', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb',
+                 'rows_in', 'rows_out', 'rows_per_second']]
+    best.insert(0, 'scale', n_rows)
+    return best.reset_index(drop=True)
+
+
+def load_baseline(path):
+    """
+    Returns:
+        dict: {scale (str): {'pipeline.stage': wall_seconds}}, empty if missing
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)['scales']
+
+
+def save_baseline(results, path):
+    """
+    Store the wall times of results as the new baseline (other scales already
+    in the file are kept)
+
+    Args:
+        results: DataFrame returned by benchmark_scale (one or several scales)
+        path: Baseline JSON path
+    """
+    scales = load_baseline(path)
+    for scale, rows in results.groupby('scale'):
+        scales[str(scale)] = {f"{row.pipeline}.{row.stage}": row.wall_seconds for row in rows.itertuples()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'updated_at': datetime.now().isoformat(timespec='seconds'), 'scales': scales}, f, indent=2)
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """
+    Add baseline wall time, relative change and a regression flag to results
+
+    Args:
+        results: DataFrame returned by benchmark_scale
+        baseline: Dict returned by load_baseline
+        tolerance: Allowed relative slowdown (0.2 = 20%)
+
+    Returns:
+        DataFrame: results with baseline_seconds, change_pct and regression columns
+    """
+    results = results.copy()
+    results['baseline_seconds'] = [
+        baseline.get(str(row.scale), {}).get(f"{row.pipeline}.{row.stage}")
+        for row in results.itertuples()
+    ]
+    base = results['baseline_seconds'].astype('float64')
+    results['change_pct'] = (results['wall_seconds'] / base - 1) * 100
+    results['regression'] = (
+        (results['wall_seconds'] > base * (1 + tolerance)) &
+        (results['wall_seconds'] - base > NOISE_FLOOR_SECONDS)
+    )
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the ETL stages and KPI computations on synthetic trips")
+    parser.add_argument('--scales', default='100K,1M',
+                        help="Comma-separated row counts, e.g. 100K,1M,10M,100M")
+    parser.add_argument('--data-dir', default='benchmark_data', help="Cache for synthetic CSVs and outputs")
+    parser.add_argument('--repeats', type=int, default=1, help="Runs per scale; the fastest is kept")
+    parser.add_argument('--workers', type=int, default=None, help="Processes for the parallel ingest stage")
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline JSON to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Relative slowdown that counts as a regression (default 0.2 = 20%%)")
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Store this run's timings as the new baseline")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Append results to this CSV")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ETL BENCHMARK SUITE")
+    print("=" * 60)
+
+    results = []
+    for n_rows in [synthetic_trips.parse_row_count(scale) for scale in args.scales.split(',')]:
+        print(f"\n📏 Scale: {n_rows:,} rows")
+        results.append(benchmark_scale(n_rows, args.data_dir, args.repeats, args.workers))
+    results = compare_to_baseline(pd.concat(results, ignore_index=True),
+                                  load_baseline(args.baseline), args.tolerance)
+
+    print("\n" + results.to_string(
+        index=False,
+        columns=['scale', 'pipeline', 'stage', 'wall_seconds', 'baseline_seconds', 'change_pct',
+                 'peak_rss_mb', 'rows_per_second', 'regression'],
+        float_format=lambda v: f"{v:,.3f}"
+    ))
+
+    results.insert(0, 'run_at', datetime.now().isoformat(timespec='seconds'))
+    results.to_csv(args.output, mode='a', header=not os.path.exists(args.output), index=False)
+    print(f"\n✓ Results appended to: {args.output}")
+
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f"✓ Baseline updated: {args.baseline}")
+
+    regressions = results[results['regression']]
+    if len(regressions):
+        print(f"\n❌ {len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}:")
+        for row in regressions.itertuples():
+            print(f"  {row.scale:,} rows  {row.pipeline}.{row.stage}: "
+                  f"{row.baseline_seconds:.3f}s → {row.wall_seconds:.3f}s (+{row.change_pct:.0f}%)")
+        if not args.update_baseline:
+            sys.exit(1)
+    elif results['baseline_seconds'].notna().any():
+        print("\n✅ No regressions against baseline")
+    elif not args.update_baseline:
+        print("\nℹ No baseline for these scales yet; record one with --update-baseline")
@@ -0,0 +1,70 @@
+import pandas as pd
+import argparse
+import time
+import tracemalloc
+
+import trip_schema
+from Mobility_data_analyser import clean_frame, add_features, fused_clean_and_engineer
+
+
+def chained(df):
+    return add_features(clean_frame(df))
+
+
+def measure(kernel, df, repeats):
+    """
+    Time a clean+feature kernel and record its peak traced allocation
+
+    Args:
+        kernel: Function taking the raw DataFrame and returning the enriched one
+        df: Raw trip DataFrame
+        repeats: Number of timed runs (the best wall time is reported)
+
+    Returns:
+        tuple: (result DataFrame, best wall time in seconds, peak allocation in MB)
+    """
+    best = float('inf')
+    peak = 0
+    result = None
+    for _ in range(repeats):
+        result = None
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = kernel(df)
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return result, best, peak / 1024 ** 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the chained and fused clean + feature kernels")
+    parser.add_argument('input', nargs='?', default='yellow_tripdata_2015-01.csv', help="Raw trip CSV file")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per kernel")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("FUSED KERNEL BENCHMARK")
+    print("=" * 60)
+
+    df = trip_schema.read_trips_csv(args.input)
+    input_mb = df.memory_usage(deep=True).sum() / 1024 ** 2
+    print(f"✓ Loaded {len(df):,} rows ({input_mb:.2f} MB)")
+
+    chained_df, chained_time, chained_peak = measure(chained, df, args.repeats)
+    fused_df, fused_time, fused_peak = measure(fused_clean_and_engineer, df, args.repeats)
+
+    pd.testing.assert_frame_equal(chained_df, fused_df)
+    print(f"✓ Outputs identical ({len(fused_df):,} rows)")
+
+    results = pd.DataFrame({
+        'kernel': ['chained', 'fused'],
+        'wall_seconds': [chained_time, fused_time],
+        'rows_per_second': [len(df) / chained_time, len(df) / fused_time],
+        'peak_alloc_mb': [chained_peak, fused_peak]
+    })
+    print("\n" + results.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+    print(f"\n⚡ Speedup: {chained_time / fused_time:.2f}x")
+    print(f"💾 Peak allocation: {chained_peak:.2f} MB → {fused_peak:.2f} MB "
+          f"({(1 - fused_peak / chained_peak) * 100:.1f}% lower)")
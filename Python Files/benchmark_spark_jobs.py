@@ -0,0 +1,108 @@
+import pandas as pd
+from pyspark.sql import functions as F
+import argparse
+import os
+import time
+
+import pyspark_etl
+import quality_rules
+import spark_schema
+import spark_transforms
+
+
+def per_query_pipeline(spark, path):
+    """
+    The original job structure: separate counts, a quality aggregation and one
+    query per KPI family, each re-running the CSV parse and the lineage
+    """
+    df = spark_schema.read_trips_csv(spark, path)
+    df.count()
+    quality_rules.combination_counts_spark(df)
+    enriched_df = spark_transforms.clean(df)
+    enriched_df.count()
+
+    enriched_df.groupBy('hour').agg(
+        F.count('*').alias('total_trips'),
+        F.round(F.sum('total_amount'), 2).alias('total_revenue'),
+        F.round(F.avg('trip_distance'), 2).alias('avg_distance'),
+        F.round(F.avg('fare_amount'), 2).alias('avg_fare'),
+        F.round(F.avg('fare_per_mile'), 2).alias('avg_fare_per_mile')
+    ).orderBy('hour').toPandas()
+    enriched_df.groupBy('VendorID').agg(
+        F.count('*').alias('total_trips'),
+        F.round(F.sum('total_amount'), 2).alias('total_revenue'),
+        F.round(F.avg('fare_amount'), 2).alias('avg_fare')
+    ).orderBy(F.desc('total_revenue')).toPandas()
+    enriched_df.groupBy('day_of_week').agg(
+        F.count('*').alias('total_trips'),
+        F.round(F.sum('total_amount'), 2).alias('total_revenue'),
+        F.round(F.avg('fare_amount'), 2).alias('avg_fare')
+    ).orderBy('day_of_week').toPandas()
+
+
+def single_pass_pipeline(spark, path):
+    """
+    The restructured job: counts and all KPI families from one GROUPING SETS job
+    """
+    df = spark_schema.read_trips_csv(spark, path)
+    spark_transforms.single_pass_kpis(spark, spark_transforms.flag_and_enrich(df))
+
+
+def measure(spark, name, pipeline, path):
+    """
+    Run a pipeline under its own job group and count the Spark jobs and stages
+    it launched
+
+    Returns:
+        dict: pipeline name, wall seconds, job and stage counts
+    """
+    sc = spark.sparkContext
+    group = f"{name}-{time.time_ns()}"
+    sc.setJobGroup(group, name)
+
+    start = time.perf_counter()
+    pipeline(spark, path)
+    wall = time.perf_counter() - start
+
+    tracker = sc.statusTracker()
+    jobs = tracker.getJobIdsForGroup(group)
+    stages = sum(len(info.stageIds) for info in map(tracker.getJobInfo, jobs) if info is not None)
+    return {'pipeline': name, 'wall_seconds': wall, 'jobs': len(jobs), 'stages': stages}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare Spark job counts and runtime: per-query vs single-pass KPIs")
+    parser.add_argument('input', nargs='?', default='yellow_tripdata_2015-01.csv', help="Raw trip CSV")
+    parser.add_argument('--repeats', type=int, default=1, help="Runs per pipeline; the median is reported")
+    parser.add_argument('--output', default='output/benchmark_spark_jobs.csv', help="Results CSV")
+    pyspark_etl.add_session_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SPARK JOB BENCHMARK: PER-QUERY vs SINGLE-PASS")
+    print("=" * 60)
+
+    config = pyspark_etl.apply_session_arguments({**pyspark_etl.DEFAULT_CONFIG, 'input': args.input}, args)
+    spark = pyspark_etl.create_spark_session(config, app_name="NYC_Taxi_Job_Benchmark")
+
+    records = []
+    for _ in range(args.repeats):
+        for name, pipeline in [('per_query', per_query_pipeline), ('single_pass', single_pass_pipeline)]:
+            result = measure(spark, name, pipeline, args.input)
+            records.append(result)
+            print(f"  {name}: {result['jobs']} jobs, {result['stages']} stages, {result['wall_seconds']:.2f}s")
+
+    spark.stop()
+
+    summary = pd.DataFrame(records).groupby('pipeline', sort=False).median()
+    print("\n" + summary.to_string(float_format=lambda v: f"{v:,.2f}"))
+    before, after = summary.loc['per_query'], summary.loc['single_pass']
+    print(f"\n✓ Jobs: {before['jobs']:.0f} → {after['jobs']:.0f}, "
+          f"runtime {before['wall_seconds']:.2f}s → {after['wall_seconds']:.2f}s "
+          f"({before['wall_seconds'] / after['wall_seconds']:.1f}x)")
+
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    summary.to_csv(args.output)
+    print(f"✓ Saved: {args.output}")
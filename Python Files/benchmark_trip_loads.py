@@ -0,0 +1,175 @@
+import pandas as pd
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import trip_store
+from etl_telemetry import memory_snapshot
+
+
+def _files(path):
+    if os.path.isdir(path):
+        return [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+    return [path]
+
+
+def evict_from_page_cache(path):
+    """
+    Ask the OS to drop cached pages of path (Linux/Unix only), so the next load
+    is a cold read from disk
+
+    Returns:
+        bool: True if eviction was possible on this platform
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return False
+    for filepath in _files(path):
+        fd = os.open(filepath, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+    return True
+
+
+def _mapped_ranges(path):
+    # Address ranges of path's memory mappings in this process (Linux), or None
+    try:
+        with open('/proc/self/maps') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    target = os.path.realpath(path)
+    ranges = []
+    for line in lines:
+        fields = line.split()
+        if len(fields) >= 6 and fields[5] == target:
+            low, high = (int(address, 16) for address in fields[0].split('-'))
+            ranges.append((low, high))
+    return ranges
+
+
+def check_zero_copy(df, path):
+    """
+    Assert that the numeric columns of a frame loaded from an Arrow IPC file are
+    views of its memory mapping (booleans are bit-packed in Arrow and
+    dictionary columns are rebuilt as categoricals, so those are copies; for
+    the nullable code columns the values are mapped and the null mask is not)
+
+    Returns:
+        int: Number of columns verified to be mapped, or None if mappings
+            cannot be inspected on this platform
+    """
+    ranges = _mapped_ranges(path)
+    if ranges is None:
+        return None
+    mapped = 0
+    for name in df.columns:
+        if df[name].dtype.kind not in 'iufM':
+            continue
+        # Nullable columns: to_numpy() would fill nulls into a float copy
+        values = getattr(df[name].array, '_data', None)
+        if values is None:
+            values = df[name].to_numpy()
+        address = values.__array_interface__['data'][0]
+        assert any(low <= address and address + values.nbytes <= high for low, high in ranges), \
+            f"column {name!r} of {path} was copied out of the memory-mapped file"
+        mapped += 1
+    return mapped
+
+
+def load_once(path, columns=None):
+    """
+    Load trips in this process and touch one column, as a dashboard worker would
+
+    Args:
+        path: Trip file or dataset
+        columns: Columns to load (default: all)
+
+    Returns:
+        dict: load/first-aggregate timings and RSS figures
+    """
+    start = time.perf_counter()
+    df = trip_store.read_trips(path, columns=columns)
+    load_seconds = time.perf_counter() - start
+    mapped_columns = check_zero_copy(df, path) if trip_store.is_arrow_ipc(path) else None
+
+    start = time.perf_counter()
+    df['total_amount' if 'total_amount' in df.columns else df.columns[0]].sum()
+    first_agg_seconds = time.perf_counter() - start
+
+    rss_mb, peak_rss_mb = memory_snapshot()
+    return {
+        'rows': len(df),
+        'mapped_columns': mapped_columns,
+        'load_seconds': load_seconds,
+        'first_agg_seconds': first_agg_seconds,
+        'rss_mb': rss_mb,
+        'peak_rss_mb': peak_rss_mb
+    }
+
+
+def run_child(path, columns=None):
+    # Each measurement runs in a fresh interpreter so RSS and caches start clean
+    command = [sys.executable, os.path.abspath(__file__), '--child', path]
+    if columns:
+        command += ['--columns', ','.join(columns)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare cold/warm load time and RSS of trip storage formats")
+    parser.add_argument('paths', nargs='*', default=['cleaned_trips.parquet', 'cleaned_trips.arrow'],
+                        help="Parquet file/dataset and Arrow IPC file(s) to compare")
+    parser.add_argument('--warm-runs', type=int, default=3, help="Warm-cache runs per format")
+    parser.add_argument('--columns', default=None,
+                        help="Comma-separated columns to load (e.g. the KPI columns); default all")
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    columns = args.columns.split(',') if args.columns else None
+
+    if args.child:
+        print(json.dumps(load_once(args.child, columns)))
+        sys.exit(0)
+
+    print("=" * 60)
+    print("TRIP LOAD BENCHMARK: PARQUET vs ARROW IPC (MMAP)")
+    print("=" * 60)
+
+    records = []
+    for path in args.paths:
+        if not os.path.exists(path):
+            print(f"⚠ Skipping missing path: {path}")
+            continue
+
+        size_mb = sum(os.path.getsize(f) for f in _files(path)) / 1024 ** 2
+        print(f"\n📁 {path} ({size_mb:.2f} MB)")
+
+        if evict_from_page_cache(path):
+            result = run_child(path, columns)
+            records.append(dict(result, path=path, cache='cold'))
+            print(f"  cold: {result['load_seconds']:.2f}s load, {result['rss_mb']:.0f} MB RSS")
+        else:
+            print("  cold: page-cache eviction not supported on this platform")
+
+        for _ in range(args.warm_runs):
+            result = run_child(path, columns)
+            records.append(dict(result, path=path, cache='warm'))
+        print(f"  warm: {result['load_seconds']:.2f}s load, {result['rss_mb']:.0f} MB RSS")
+
+    if records:
+        summary = pd.DataFrame(records).groupby(['path', 'cache'], sort=False).agg(
+            rows=('rows', 'first'),
+            load_seconds=('load_seconds', 'median'),
+            first_agg_seconds=('first_agg_seconds', 'median'),
+            rss_mb=('rss_mb', 'median'),
+            peak_rss_mb=('peak_rss_mb', 'median')
+        )
+        print("\n" + summary.to_string(float_format=lambda v: f"{v:,.3f}"))
+        summary.to_csv('benchmark_trip_loads.csv')
+        print("\n✓ Saved: benchmark_trip_loads.csv")
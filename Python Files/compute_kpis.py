@@ -1,51 +1,52 @@
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-import numpy as np
+import argparse
+
+import kpi_engine
+import quantile_sketches
+import trip_histograms
+import trip_store
+
+parser = argparse.ArgumentParser(description="Compute NYC taxi KPIs and dashboard plots")
+parser.add_argument('--data', default='cleaned_trips.parquet',
+                    help="Cleaned trips: Parquet file or partitioned dataset directory")
+parser.add_argument('--start', default=None, help="Only include pickups at or after this time (e.g. 2015-01-05)")
+parser.add_argument('--end', default=None, help="Only include pickups before this time")
+args = parser.parse_args()
 
 print("="*60)
 print("LOADING CLEANED DATA")
 print("="*60)
 
-# Load the cleaned parquet file (super fast!)
-df = pd.read_parquet('cleaned_trips.parquet')
+# Load the cleaned parquet data (partitions/row groups outside --start/--end are
+# skipped, and only the columns the KPIs use are decoded)
+df = trip_store.read_trips(args.data, args.start, args.end, columns=kpi_engine.KPI_COLUMNS)
 print(f"✓ Loaded {len(df):,} rows × {len(df.columns)} columns")
 
 print("\n" + "="*60)
 print("COMPUTING KEY PERFORMANCE INDICATORS")
 print("="*60)
 
-# Compute all KPIs
-kpis = {
-    'Total Trips': len(df),
-    'Total Revenue': df['total_amount'].sum(),
-    'Average Trip Distance': df['trip_distance'].mean(),
-    'Average Fare': df['fare_amount'].mean(),
-    'Average Tip Percentage': df['tip_percentage'].mean(),
-    'Average Trip Duration': df['trip_duration'].mean(),
-    'Revenue per Mile': df['total_amount'].sum() / df['trip_distance'].sum(),
-    'Peak Hour Trips': df[df['is_peak']].shape[0],
-    'Peak Hour Percentage': (df[df['is_peak']].shape[0] / len(df)) * 100,
-    'Weekend Trips': df[df['is_weekend']].shape[0],
-    'Weekend Percentage': (df[df['is_weekend']].shape[0] / len(df)) * 100,
-    'Average Passengers': df['passenger_count'].mean()
-}
+# Compute all KPIs and chart tables in one pass
+result = kpi_engine.compute_all(df)
+kpis = result['kpis']
 
 # Print formatted KPIs
 print("\n📊 JANUARY 2015 NYC TAXI INSIGHTS")
 print("-" * 60)
+kpi_engine.print_kpis(kpis)
 
-for key, value in kpis.items():
-    if 'Total Revenue' in key or 'Revenue per' in key or 'Fare' in key:
-        print(f"{key:.<40} ${value:,.2f}")
-    elif 'Total' in key or 'Peak Hour Trips' in key or 'Weekend Trips' in key:
-        print(f"{key:.<40} {value:,}")
-    elif 'Percentage' in key:
-        print(f"{key:.<40} {value:.2f}%")
-    elif 'Distance' in key or 'Duration' in key or 'Passengers' in key:
-        print(f"{key:.<40} {value:.2f}")
-    else:
-        print(f"{key:.<40} {value:,.2f}")
+# Medians and tail percentiles (means are pulled around by outlier fares and durations)
+sketches = quantile_sketches.QuantileAccumulator(['hour', 'day_of_week']).update(df)
+print("\n📐 DISTRIBUTION KPIs (approximate percentiles)")
+print("-" * 60)
+quantile_sketches.print_quantiles(sketches)
+quantiles_by_hour = sketches.rollup(['hour']).result().set_index('hour')
+quantiles_by_dow = sketches.rollup(['day_of_week']).result().set_index('day_of_week')
+median_fare = sketches.rollup().result()['fare_amount_p50'].iloc[0]
+print("\nMedians by day of week:")
+print(quantiles_by_dow[[f"{column}_p50" for column in quantile_sketches.QUANTILE_COLUMNS]]
+      .rename(index=dict(enumerate(kpi_engine.DAY_NAMES))).round(2).to_string())
 
 print("\n" + "="*60)
 print("CREATING VISUALIZATIONS")
@@ -60,7 +61,7 @@ fig, axes = plt.subplots(3, 3, figsize=(20, 14))
 fig.suptitle('NYC Taxi Analytics Dashboard - January 2015', fontsize=20, fontweight='bold', y=0.995)
 
 # 1. Hourly Demand
-hourly_trips = df.groupby('hour').size()
+hourly_trips = result['hourly_trips']
 axes[0, 0].bar(hourly_trips.index, hourly_trips.values, color='steelblue', edgecolor='black')
 axes[0, 0].set_title('Trip Demand by Hour', fontsize=14, fontweight='bold')
 axes[0, 0].set_xlabel('Hour of Day')
@@ -68,7 +69,7 @@ axes[0, 0].set_ylabel('Number of Trips')
 axes[0, 0].grid(axis='y', alpha=0.3)
 
 # 2. Daily Revenue Trend
-daily_revenue = df.groupby('day')['total_amount'].sum() / 1_000_000
+daily_revenue = result['daily_revenue'] / 1_000_000
 axes[0, 1].plot(daily_revenue.index, daily_revenue.values, marker='o', linewidth=2, color='green', markersize=8)
 axes[0, 1].set_title('Daily Revenue Trend', fontsize=14, fontweight='bold')
 axes[0, 1].set_xlabel('Day of Month')
@@ -76,23 +77,29 @@ axes[0, 1].set_ylabel('Revenue ($ Millions)')
 axes[0, 1].grid(True, alpha=0.3)
 
 # 3. Fare Distribution
-axes[0, 2].hist(df['fare_amount'], bins=50, range=(0, 50), edgecolor='black', color='coral', alpha=0.7)
+# (bars drawn from bin counts, so matplotlib never receives the raw trips)
+fare_hist = trip_histograms.histogram_of(df['fare_amount'], 'fare_amount')
+axes[0, 2].bar(fare_hist['bin_left'], fare_hist['count'], width=fare_hist['bin_right'] - fare_hist['bin_left'],
+               align='edge', edgecolor='black', color='coral', alpha=0.7)
 axes[0, 2].set_title('Fare Amount Distribution', fontsize=14, fontweight='bold')
 axes[0, 2].set_xlabel('Fare Amount ($)')
 axes[0, 2].set_ylabel('Frequency')
-axes[0, 2].axvline(df['fare_amount'].mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: ${df["fare_amount"].mean():.2f}')
+axes[0, 2].axvline(kpis['Average Fare'], color='red', linestyle='--', linewidth=2, label=f"Mean: ${kpis['Average Fare']:.2f}")
 axes[0, 2].legend()
 
 # 4. Distance Distribution
-axes[1, 0].hist(df['trip_distance'], bins=50, range=(0, 20), edgecolor='black', color='orange', alpha=0.7)
+distance_hist = trip_histograms.histogram_of(df['trip_distance'], 'trip_distance')
+axes[1, 0].bar(distance_hist['bin_left'], distance_hist['count'],
+               width=distance_hist['bin_right'] - distance_hist['bin_left'],
+               align='edge', edgecolor='black', color='orange', alpha=0.7)
 axes[1, 0].set_title('Trip Distance Distribution', fontsize=14, fontweight='bold')
 axes[1, 0].set_xlabel('Distance (miles)')
 axes[1, 0].set_ylabel('Frequency')
-axes[1, 0].axvline(df['trip_distance'].mean(), color='red', linestyle='--', linewidth=2, label=f'Mean: {df["trip_distance"].mean():.2f} mi')
+axes[1, 0].axvline(kpis['Average Trip Distance'], color='red', linestyle='--', linewidth=2, label=f"Mean: {kpis['Average Trip Distance']:.2f} mi")
 axes[1, 0].legend()
 
 # 5. Tip Percentage by Hour
-tip_by_hour = df.groupby('hour')['tip_percentage'].mean()
+tip_by_hour = result['tip_by_hour']
 axes[1, 1].plot(tip_by_hour.index, tip_by_hour.values, marker='o', linewidth=2, color='purple', markersize=8)
 axes[1, 1].set_title('Average Tip % by Hour', fontsize=14, fontweight='bold')
 axes[1, 1].set_xlabel('Hour of Day')
@@ -100,8 +107,8 @@ axes[1, 1].set_ylabel('Tip Percentage (%)')
 axes[1, 1].grid(True, alpha=0.3)
 
 # 6. Revenue by Day of Week
-day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-revenue_by_dow = df.groupby('day_of_week')['total_amount'].sum() / 1_000_000
+day_names = kpi_engine.DAY_NAMES
+revenue_by_dow = result['revenue_by_dow'] / 1_000_000
 axes[1, 2].bar(range(7), revenue_by_dow.values, color=['#FF6B6B', '#4ECDC4', '#45B7D1', '#FFA07A', '#98D8C8', '#F7DC6F', '#BB8FCE'], edgecolor='black')
 axes[1, 2].set_xticks(range(7))
 axes[1, 2].set_xticklabels(day_names, rotation=45, ha='right')
@@ -110,7 +117,7 @@ axes[1, 2].set_ylabel('Revenue ($ Millions)')
 axes[1, 2].grid(axis='y', alpha=0.3)
 
 # 7. Passenger Count Distribution
-passenger_counts = df['passenger_count'].value_counts().sort_index()
+passenger_counts = result['passenger_counts']
 axes[2, 0].bar(passenger_counts.index, passenger_counts.values, color='teal', edgecolor='black')
 axes[2, 0].set_title('Passenger Count Distribution', fontsize=14, fontweight='bold')
 axes[2, 0].set_xlabel('Number of Passengers')
@@ -118,7 +125,7 @@ axes[2, 0].set_ylabel('Number of Trips')
 axes[2, 0].grid(axis='y', alpha=0.3)
 
 # 8. Peak vs Off-Peak Comparison
-peak_data = [df[~df['is_peak']].shape[0], df[df['is_peak']].shape[0]]
+peak_data = result['peak_split']
 peak_labels = ['Off-Peak', 'Peak Hours\n(7-9 AM, 5-7 PM)']
 colors_peak = ['lightblue', 'darkred']
 axes[2, 1].bar(peak_labels, peak_data, color=colors_peak, edgecolor='black')
@@ -129,8 +136,7 @@ for i, v in enumerate(peak_data):
     axes[2, 1].text(i, v, f'{v:,}', ha='center', va='bottom', fontweight='bold')
 
 # 9. Demand Heatmap (Day of Week vs Hour)
-pivot_table = df.groupby(['day_of_week', 'hour']).size().reset_index(name='trips')
-pivot = pivot_table.pivot(index='day_of_week', columns='hour', values='trips')
+pivot = result['demand_heatmap']
 sns.heatmap(pivot, cmap='YlOrRd', ax=axes[2, 2], cbar_kws={'label': 'Trip Count'}, fmt='g')
 axes[2, 2].set_title('Demand Heatmap: Day vs Hour', fontsize=14, fontweight='bold')
 axes[2, 2].set_yticklabels(day_names, rotation=0)
@@ -168,6 +174,23 @@ plt.savefig('demand_heatmap.png', dpi=150, bbox_inches='tight')
 print("✓ Saved: demand_heatmap.png")
 plt.close()
 
+# Individual Plot: Percentiles by Hour
+fig, axes = plt.subplots(1, 3, figsize=(20, 6))
+for ax, column, title in zip(axes, quantile_sketches.QUANTILE_COLUMNS,
+                             ['Fare ($)', 'Trip Duration (min)', 'Tip Percentage (%)']):
+    ax.fill_between(quantiles_by_hour.index, quantiles_by_hour[f"{column}_p50"], quantiles_by_hour[f"{column}_p90"],
+                    color='steelblue', alpha=0.3, label='p50-p90')
+    ax.plot(quantiles_by_hour.index, quantiles_by_hour[f"{column}_p50"], marker='o', color='steelblue', label='Median')
+    ax.plot(quantiles_by_hour.index, quantiles_by_hour[f"{column}_p99"], linestyle='--', color='darkred', label='p99')
+    ax.set_title(f"{title} Percentiles by Hour", fontsize=14, fontweight='bold')
+    ax.set_xlabel('Hour of Day')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+plt.tight_layout()
+plt.savefig('quantiles_by_hour.png', dpi=150, bbox_inches='tight')
+print("✓ Saved: quantiles_by_hour.png")
+plt.close()
+
 print("\n" + "="*60)
 print("KPI ANALYSIS COMPLETE!")
 print("="*60)
@@ -175,8 +198,9 @@ print("\n✅ Generated Files:")
 print("  📊 comprehensive_dashboard.png (9-panel dashboard)")
 print("  📊 hourly_demand.png")
 print("  📊 demand_heatmap.png")
+print("  📊 quantiles_by_hour.png")
 print("\n📌 Key Insights:")
 print(f"  • Busiest hour: {hourly_trips.idxmax()}:00 with {hourly_trips.max():,} trips")
-print(f"  • Average fare: ${df['fare_amount'].mean():.2f}")
-print(f"  • Peak hours represent {(df[df['is_peak']].shape[0] / len(df)) * 100:.1f}% of trips")
-print(f"  • Total revenue: ${df['total_amount'].sum():,.2f}")
+print(f"  • Average fare: ${kpis['Average Fare']:.2f} (median ${median_fare:.2f})")
+print(f"  • Peak hours represent {kpis['Peak Hour Percentage']:.1f}% of trips")
+print(f"  • Total revenue: ${kpis['Total Revenue']:,.2f}")
@@ -0,0 +1,359 @@
+"""
+Cross-engine parity and throughput harness: pandas ETL vs Spark ETL.
+
+Both engines run on the same synthetic CSV (cached by benchmark_etl) at each
+scale. The pandas side is MobilityDataAnalyzer (load, clean, features, export);
+the Spark side is the batch job's path (declared-schema read, quality flags and
+features, the single-pass KPI job and the partitioned trip write). The checks:
+
+- quality-rule combination counts and cleaned row counts are identical
+- the cleaned trips, read back with trip_store.read_trips, match column by
+  column (dtypes equal, floats within tolerance)
+- the pandas output re-written without pandas metadata, as Spark and the
+  streaming writer produce it, reads back identically (so no dtype depends on
+  which engine wrote the file)
+- the hourly, vendor and day-of-week KPI tables match within tolerance
+- Spark's approximate quantiles fall at the right rank of the exact pandas
+  distribution (within the sketch's rank error)
+
+Throughput (input rows per wall second, best of --repeats) is reported per
+engine and scale, so the table shows where Spark's startup and scheduling
+overhead pays off. Exits non-zero when a parity check fails.
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import io
+import os
+import shutil
+import sys
+import time
+from contextlib import redirect_stdout
+import pyarrow.parquet as pq
+from pyspark import StorageLevel
+
+import benchmark_etl
+from etl_telemetry import PipelineTelemetry
+from Mobility_data_analyser import MobilityDataAnalyzer
+import pyspark_etl
+import spark_schema
+import spark_transforms
+import synthetic_trips
+import trip_schema
+import trip_store
+
+RESULTS_PATH = 'output/engine_parity.csv'
+CHECKS_PATH = 'output/engine_parity_checks.csv'
+
+# Relative tolerance for floats (pandas keeps distances and ratios in float32,
+# Spark in double); KPI values are rounded to cents by both engines
+RTOL = 1e-5
+KPI_ATOL = 0.011
+
+# Stable row order for the trip-level comparison
+SORT_KEYS = ['tpep_pickup_datetime', 'tpep_dropoff_datetime', 'VendorID', 'total_amount',
+             'trip_distance', 'pickup_longitude', 'pickup_latitude']
+
+KPI_TABLES = [
+    ('hourly', spark_transforms.HOURLY_COLUMNS),
+    ('vendor', spark_transforms.VENDOR_COLUMNS),
+    ('day_of_week', spark_transforms.DOW_COLUMNS)
+]
+
+
+def run_pandas(csv_path, work_dir):
+    """
+    Run the pandas ETL once
+
+    Args:
+        csv_path: Raw trip CSV
+        work_dir: Directory for the Parquet output
+
+    Returns:
+        tuple: (output path, quality combination counts, wall seconds)
+    """
+    output_path = os.path.join(work_dir, 'cleaned_trips_pandas.parquet')
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        analyzer = MobilityDataAnalyzer(csv_path, telemetry=PipelineTelemetry('pandas_etl', verbose=False))
+        analyzer.load_data().clean_data().feature_engineering()
+        analyzer.export_clean_data(output_path)
+    return output_path, analyzer.quality_counts, time.perf_counter() - start
+
+
+def run_spark(spark, csv_path, work_dir):
+    """
+    Run the Spark ETL path once
+
+    Args:
+        spark: SparkSession
+        csv_path: Raw trip CSV
+        work_dir: Directory for the partitioned trip output
+
+    Returns:
+        tuple: (output directory, single_pass_kpis results, wall seconds)
+    """
+    output_dir = os.path.join(work_dir, 'cleaned_trips_spark')
+    start = time.perf_counter()
+    flagged = spark_transforms.flag_and_enrich(spark_schema.read_trips_csv(spark, csv_path))
+    flagged = flagged.persist(StorageLevel.MEMORY_AND_DISK)
+    results = spark_transforms.single_pass_kpis(spark, flagged)
+    spark_transforms.write_cleaned_trips(flagged, output_dir)
+    flagged.unpersist()
+    return output_dir, results, time.perf_counter() - start
+
+
+def pandas_kpis(trips):
+    """
+    The Spark KPI tables computed from the pandas output
+
+    Args:
+        trips: Cleaned trips DataFrame
+
+    Returns:
+        dict: 'hourly', 'vendor' and 'day_of_week' DataFrames with the
+            spark_transforms column sets
+    """
+    def family(key, columns):
+        table = trips.groupby(key).agg(
+            total_trips=('total_amount', 'size'),
+            total_revenue=('total_amount', 'sum'),
+            avg_distance=('trip_distance', 'mean'),
+            avg_fare=('fare_amount', 'mean'),
+            avg_fare_per_mile=('fare_per_mile', 'mean')
+        ).round(2).reset_index()
+        return table[columns].astype({key: 'int64'})
+
+    return {name: family(columns[0], columns) for name, columns in KPI_TABLES}
+
+
+def _check(name, ok, detail=''):
+    return {'check': name, 'ok': bool(ok), 'detail': detail}
+
+
+def compare_trips(expected, actual, prefix='trips'):
+    """
+    Compare two cleaned trip DataFrames column by column
+
+    Args:
+        expected: pandas engine output
+        actual: Spark engine output (or another reading of the same trips)
+        prefix: Check name prefix
+
+    Returns:
+        list: Check records (check, ok, detail)
+    """
+    checks = [_check(f"{prefix}.rows", len(expected) == len(actual), f"{len(expected):,} vs {len(actual):,}")]
+    if len(expected) != len(actual):
+        return checks
+
+    expected = expected.sort_values(SORT_KEYS, ignore_index=True)
+    actual = actual.sort_values(SORT_KEYS, ignore_index=True)
+    for column in trip_schema.CLEANED_SCHEMA.names:
+        if column not in actual.columns:
+            checks.append(_check(f"{prefix}.{column}", False, "missing from the output"))
+            continue
+        left, right = expected[column], actual[column]
+        if left.dtype != right.dtype:
+            checks.append(_check(f"{prefix}.{column}", False, f"dtype {left.dtype} vs {right.dtype}"))
+            continue
+        if pd.api.types.is_float_dtype(left):
+            differs = ~np.isclose(left, right, rtol=RTOL, atol=1e-6, equal_nan=True)
+        else:
+            # Compared as text (categories may be ordered differently); rows
+            # missing on both sides are equal
+            differs = ((left.astype(str) != right.astype(str)) & ~(left.isna() & right.isna())).to_numpy()
+        checks.append(_check(f"{prefix}.{column}", not differs.any(),
+                             f"{int(differs.sum()):,} rows differ" if differs.any() else ''))
+    return checks
+
+
+def compare_metadata_free(pandas_path, work_dir):
+    """
+    Re-write the pandas output as a dataset without pandas metadata (like the
+    Spark and streaming writers) and compare what read_trips returns for both
+
+    Args:
+        pandas_path: Parquet file written by the pandas engine
+        work_dir: Directory for the re-written dataset
+
+    Returns:
+        list: Check records (check, ok, detail)
+    """
+    dataset_dir = os.path.join(work_dir, 'cleaned_trips_no_metadata')
+    shutil.rmtree(dataset_dir, ignore_errors=True)
+    os.makedirs(dataset_dir)
+    table = pq.read_table(pandas_path)
+    pq.write_table(table.replace_schema_metadata(None), os.path.join(dataset_dir, 'part-00000.parquet'))
+    return compare_trips(trip_store.read_trips(pandas_path), trip_store.read_trips(dataset_dir), prefix='reader')
+
+
+def compare_kpis(expected, actual):
+    """
+    Compare KPI tables on their key column
+
+    Args:
+        expected: Dict returned by pandas_kpis
+        actual: Dict returned by spark_transforms.single_pass_kpis
+
+    Returns:
+        list: Check records, one per table and value column
+    """
+    checks = []
+    for name, columns in KPI_TABLES:
+        key = columns[0]
+        merged = expected[name].merge(actual[name][columns], on=key, how='outer',
+                                      suffixes=('_pandas', '_spark'), indicator=True)
+        unmatched = int((merged['_merge'] != 'both').sum())
+        checks.append(_check(f"kpis.{name}.keys", unmatched == 0, f"{unmatched} unmatched keys" if unmatched else ''))
+        for column in columns[1:]:
+            left, right = merged[f"{column}_pandas"], merged[f"{column}_spark"]
+            differs = ~np.isclose(left, right, rtol=RTOL, atol=KPI_ATOL)
+            detail = ''
+            if differs.any():
+                worst = (left - right).abs().idxmax()
+                detail = f"{key}={merged.at[worst, key]}: {left[worst]} vs {right[worst]}"
+            checks.append(_check(f"kpis.{name}.{column}", not differs.any(), detail))
+    return checks
+
+
+def compare_quantiles(trips, hourly_quantiles):
+    """
+    Check Spark's approximate hourly quantiles against the exact pandas ranks:
+    at most q of the hour's values may lie below the estimate and at least q at
+    or below it, each within the sketch's rank error
+
+    Args:
+        trips: Cleaned trips DataFrame (pandas engine)
+        hourly_quantiles: 'hourly_quantiles' table from single_pass_kpis
+
+    Returns:
+        list: Check records, one per quantile column
+    """
+    # Rank error bound of percentile_approx, plus slack for the float32 values
+    tolerance = 1 / spark_transforms.QUANTILE_ACCURACY + 1e-4
+    groups = dict(tuple(trips.groupby('hour')))
+    checks = []
+    for metric in spark_transforms.QUANTILE_METRICS:
+        for q in spark_transforms.QUANTILES:
+            column = f"{metric}_p{round(q * 100)}"
+            worst = 0.0
+            for hour, estimate in zip(hourly_quantiles['hour'], hourly_quantiles[column]):
+                values = groups[hour][metric].to_numpy(dtype='float64')
+                slack = abs(estimate) * RTOL
+                below = (values < estimate - slack).mean()
+                at_or_below = (values <= estimate + slack).mean()
+                worst = max(worst, below - q, q - at_or_below)
+            checks.append(_check(f"quantiles.hourly.{column}", worst <= tolerance,
+                                 f"rank error {worst:.5f}" if worst > 0 else ''))
+    return checks
+
+
+def run_scale(spark, n_rows, data_dir, repeats=1):
+    """
+    Run both engines at one scale and check their outputs
+
+    Args:
+        spark: SparkSession
+        n_rows: Number of synthetic trips
+        data_dir: Directory for the cached CSVs and engine outputs
+        repeats: Runs per engine; the fastest is reported
+
+    Returns:
+        tuple: (throughput DataFrame, checks DataFrame)
+    """
+    csv_path = benchmark_etl.ensure_dataset(n_rows, data_dir)
+    work_dir = os.path.join(data_dir, f"parity_{n_rows}")
+    os.makedirs(work_dir, exist_ok=True)
+    spark.conf.set("spark.sql.shuffle.partitions", str(pyspark_etl.shuffle_partitions_for(
+        os.path.getsize(csv_path), pyspark_etl.DEFAULT_CONFIG['target_partition_mb'],
+        spark.sparkContext.defaultParallelism)))
+
+    pandas_seconds, spark_seconds = [], []
+    for _ in range(repeats):
+        pandas_path, quality_counts, seconds = run_pandas(csv_path, work_dir)
+        pandas_seconds.append(seconds)
+        spark_dir, results, seconds = run_spark(spark, csv_path, work_dir)
+        spark_seconds.append(seconds)
+
+    expected = trip_store.read_trips(pandas_path)
+    actual = trip_store.read_trips(spark_dir)
+    pandas_counts = {mask: int(rows) for mask, rows in enumerate(quality_counts) if rows}
+
+    checks = [
+        _check('quality_counts', pandas_counts == results['quality_counts']),
+        _check('initial_rows', sum(pandas_counts.values()) == results['initial_count'],
+               f"{sum(pandas_counts.values()):,} vs {results['initial_count']:,}"),
+        _check('cleaned_rows', len(expected) == results['cleaned_count'],
+               f"{len(expected):,} vs {results['cleaned_count']:,}")
+    ]
+    checks += compare_trips(expected, actual)
+    checks += compare_metadata_free(pandas_path, work_dir)
+    checks += compare_kpis(pandas_kpis(expected), results)
+    checks += compare_quantiles(expected, results['hourly_quantiles'])
+    checks = pd.DataFrame(checks)
+    checks.insert(0, 'scale', n_rows)
+
+    initial_rows = results['initial_count']
+    throughput = pd.DataFrame([
+        {'scale': n_rows, 'engine': engine, 'rows_in': initial_rows, 'wall_seconds': min(seconds),
+         'rows_per_second': initial_rows / min(seconds)}
+        for engine, seconds in [('pandas', pandas_seconds), ('spark', spark_seconds)]
+    ])
+    return throughput, checks
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check pandas/Spark ETL parity and compare their throughput")
+    parser.add_argument('--scales', default='100K,1M', help="Comma-separated row counts, e.g. 100K,1M,10M")
+    parser.add_argument('--data-dir', default='benchmark_data', help="Cache directory for synthetic CSVs")
+    parser.add_argument('--repeats', type=int, default=1, help="Runs per engine and scale; the fastest is kept")
+    parser.add_argument('--master', default='local[*]', help="Spark master URL")
+    parser.add_argument('--output', default=RESULTS_PATH, help="Throughput CSV")
+    parser.add_argument('--checks-output', default=CHECKS_PATH, help="Parity checks CSV")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ENGINE PARITY: PANDAS vs SPARK")
+    print("=" * 60)
+
+    spark = pyspark_etl.create_spark_session({**pyspark_etl.DEFAULT_CONFIG, 'master': args.master},
+                                             app_name="NYC_Taxi_Engine_Parity")
+
+    throughputs, all_checks = [], []
+    for n_rows in map(synthetic_trips.parse_row_count, args.scales.split(',')):
+        print(f"\n▶ Scale {n_rows:,} rows")
+        throughput, checks = run_scale(spark, n_rows, args.data_dir, args.repeats)
+        throughputs.append(throughput)
+        all_checks.append(checks)
+        for row in throughput.itertuples():
+            print(f"  {row.engine}: {row.wall_seconds:.2f}s ({row.rows_per_second:,.0f} rows/s)")
+        failed = checks[~checks['ok']]
+        print(f"  {'✓' if failed.empty else '❌'} {len(checks) - len(failed)}/{len(checks)} parity checks passed")
+        for row in failed.itertuples():
+            print(f"    {row.check}: {row.detail}")
+
+    spark.stop()
+
+    throughput = pd.concat(throughputs, ignore_index=True)
+    checks = pd.concat(all_checks, ignore_index=True)
+
+    print("\n" + "=" * 60)
+    print("THROUGHPUT (rows/second)")
+    print("=" * 60)
+    table = throughput.pivot(index='scale', columns='engine', values='rows_per_second')
+    table['faster'] = np.where(table['spark'] > table['pandas'], 'spark', 'pandas')
+    print(table.to_string(float_format=lambda v: f"{v:,.0f}"))
+
+    for path, df in [(args.output, throughput), (args.checks_output, checks)]:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        df.to_csv(path, index=False)
+        print(f"✓ Saved: {path}")
+
+    if not checks['ok'].all():
+        print(f"\n❌ {int((~checks['ok']).sum())} parity check(s) failed")
+        sys.exit(1)
+    print("\n✅ Engines agree")
@@ -0,0 +1,242 @@
+"""
+Per-stage performance telemetry for the ETL pipelines.
+
+Each stage records wall time, CPU time, peak RSS, tracemalloc peak (optional),
+rows in/out and rows/sec. Records are printed as they complete and can be
+appended to a CSV or JSON Lines file, one row per stage, so runs can be compared
+over time.
+"""
+
+import pandas as pd
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+RECORD_FIELDS = [
+    'run_id', 'pipeline', 'stage', 'started_at', 'wall_seconds', 'cpu_seconds',
+    'rss_mb', 'peak_rss_mb', 'tracemalloc_peak_mb', 'rows_in', 'rows_out', 'rows_per_second'
+]
+
+
+def _reset_peak_rss():
+    # Linux lets a process reset its RSS high-water mark (VmHWM); elsewhere the
+    # peak covers the whole process lifetime
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _cpu_time():
+    # Own CPU time plus that of finished child processes (e.g. a process pool
+    # joined within the stage); children are reported as 0 on Windows
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+
+def _peak_rss_mb():
+    # psutil only exposes the high-water mark on Windows (peak_wset); Linux keeps
+    # it in VmHWM (resettable, see _reset_peak_rss) and other POSIX systems in
+    # ru_maxrss (KB on Linux, bytes on macOS)
+    if sys.platform == 'win32':
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 1024 ** 2
+        except ImportError:
+            return None
+
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key == 'VmHWM':
+                    return int(value.split()[0]) / 1024
+
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 ** 2
+    except ImportError:
+        pass
+
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key == 'VmRSS':
+                    return int(value.split()[0]) / 1024
+    return None
+
+
+def memory_snapshot():
+    """
+    Current and peak resident set size of this process
+
+    Returns:
+        tuple: (rss_mb, peak_rss_mb); either is None where the platform does not
+            report it
+    """
+    return _rss_mb(), _peak_rss_mb()
+
+
+class PipelineTelemetry:
+    """
+    Collects one record per pipeline stage
+    """
+
+    def __init__(self, pipeline, trace_memory=False, verbose=True):
+        """
+        Args:
+            pipeline: Pipeline name stored with every record (e.g. 'pandas_etl')
+            trace_memory: Also record the tracemalloc peak per stage (Python and
+                NumPy allocations; adds some overhead)
+            verbose: Print a one-line summary when each stage finishes
+        """
+        self.pipeline = pipeline
+        self.run_id = datetime.now().strftime('%Y%m%dT%H%M%S') + '-' + uuid.uuid4().hex[:6]
+        self.trace_memory = trace_memory
+        self.verbose = verbose
+        self.records = []
+
+    def start(self, stage, rows_in=None):
+        """
+        Begin timing a stage
+
+        Args:
+            stage: Stage name
+            rows_in: Rows entering the stage, if known
+
+        Returns:
+            dict: Open record; set 'rows_in'/'rows_out' on it, then pass it to finish()
+        """
+        _reset_peak_rss()
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        return {
+            'run_id': self.run_id,
+            'pipeline': self.pipeline,
+            'stage': stage,
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'rows_in': rows_in,
+            'rows_out': None,
+            '_wall_start': time.perf_counter(),
+            '_cpu_start': _cpu_time()
+        }
+
+    def finish(self, record, rows_out=None):
+        """
+        Close a stage record and store it
+
+        Args:
+            record: Record returned by start()
+            rows_out: Rows leaving the stage, if known
+
+        Returns:
+            dict: The completed record
+        """
+        wall = time.perf_counter() - record.pop('_wall_start')
+        cpu = _cpu_time() - record.pop('_cpu_start')
+        if rows_out is not None:
+            record['rows_out'] = rows_out
+
+        rss_mb, peak_rss_mb = memory_snapshot()
+        tracemalloc_peak = None
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc_peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+
+        rows = record['rows_in'] if record['rows_in'] is not None else record['rows_out']
+        record.update({
+            'wall_seconds': wall,
+            'cpu_seconds': cpu,
+            'rss_mb': rss_mb,
+            'peak_rss_mb': peak_rss_mb,
+            'tracemalloc_peak_mb': tracemalloc_peak,
+            'rows_per_second': rows / wall if rows is not None and wall > 0 else None
+        })
+        self.records.append(record)
+
+        if self.verbose:
+            throughput = f", {record['rows_per_second']:,.0f} rows/s" if record['rows_per_second'] else ""
+            peak = f", peak RSS {peak_rss_mb:,.0f} MB" if peak_rss_mb is not None else ""
+            print(f"⏱  {record['stage']}: {wall:.2f}s wall, {cpu:.2f}s CPU{peak}{throughput}")
+
+        return record
+
+    @contextmanager
+    def stage(self, stage, rows_in=None):
+        """
+        Context manager around start()/finish(); set record['rows_out'] inside
+
+        Args:
+            stage: Stage name
+            rows_in: Rows entering the stage, if known
+        """
+        record = self.start(stage, rows_in)
+        try:
+            yield record
+        finally:
+            self.finish(record)
+
+    def to_frame(self):
+        """
+        Returns:
+            DataFrame: One row per completed stage
+        """
+        return pd.DataFrame(self.records, columns=RECORD_FIELDS)
+
+    def write(self, path):
+        """
+        Append this run's records to a .csv or .json/.jsonl file
+
+        Args:
+            path: Output path; the extension selects the format
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if path.lower().endswith(('.json', '.jsonl')):
+            with open(path, 'a', encoding='utf-8') as f:
+                for record in self.records:
+                    f.write(json.dumps({field: record.get(field) for field in RECORD_FIELDS}) + '\n')
+        else:
+            self.to_frame().to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+
+def timed_stage(name):
+    """
+    Method decorator recording a MobilityDataAnalyzer-style stage in
+    self.telemetry. rows_in/rows_out default to len(self.df) before/after the
+    call; the method can override them through self.telemetry_record.
+
+    Args:
+        name: Stage name
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            rows_in = len(self.df) if self.df is not None else None
+            with self.telemetry.stage(name, rows_in=rows_in) as record:
+                self.telemetry_record = record
+                result = method(self, *args, **kwargs)
+                if record['rows_out'] is None and self.df is not None:
+                    record['rows_out'] = len(self.df)
+            return result
+        return wrapper
+    return decorator
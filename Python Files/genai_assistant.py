@@ -2,39 +2,32 @@ import pandas as pd
 import os
 from datetime import datetime
 
+import trip_cube
+
 print("=" * 70)
 print("GENAI URBAN MOBILITY INSIGHTS ASSISTANT")
 print("=" * 70)
 
 # Load KPI data for context
 print("\n📊 Loading KPI data for context...")
-df = pd.read_parquet('cleaned_trips.parquet')
+# Every figure below is a rollup of the cube; trips are only read to build it
+# the first time
+cube = trip_cube.load_cube(os.environ.get('CUBE_PATH', trip_cube.CUBE_PATH),
+                           os.environ.get('TRIPS_PATH', 'cleaned_trips.parquet'))
 
 # Create data summary
-summary_stats = {
-    'total_trips': len(df),
-    'total_revenue': df['total_amount'].sum(),
-    'avg_fare': df['fare_amount'].mean(),
-    'avg_distance': df['trip_distance'].mean(),
-    'avg_tip_pct': df['tip_percentage'].mean(),
-    'peak_trips': df[df['is_peak']].shape[0],
-    'weekend_trips': df[df['is_weekend']].shape[0]
-}
+summary_stats = trip_cube.summary(cube)
 
 # Load hourly breakdown
-hourly_data = df.groupby('hour').agg({
-    'fare_amount': 'count',
-    'total_amount': 'sum'
-}).rename(columns={'fare_amount': 'trips', 'total_amount': 'revenue'})
+hourly_data = trip_cube.rollup(cube, ['hour'], ['total_amount']).set_index('hour')[
+    ['trips', 'total_amount_sum']].rename(columns={'total_amount_sum': 'revenue'})
 
 # Top 5 busiest hours
 top_hours = hourly_data.nlargest(5, 'trips')
 
 # Payment type analysis
-payment_analysis = df.groupby('payment_type').agg({
-    'fare_amount': 'count',
-    'tip_percentage': 'mean'
-}).rename(columns={'fare_amount': 'trips', 'tip_percentage': 'avg_tip_pct'})
+payment_analysis = trip_cube.rollup(cube, ['payment_type'], ['tip_percentage']).set_index('payment_type')[
+    ['trips', 'tip_percentage_mean']].rename(columns={'tip_percentage_mean': 'avg_tip_pct'})
 
 print("✓ Data loaded successfully")
 print(f"  • Total trips: {summary_stats['total_trips']:,}")
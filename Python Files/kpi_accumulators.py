@@ -0,0 +1,370 @@
+"""
+Mergeable KPI accumulators.
+
+A KpiAccumulator holds, per group (or for one overall group), the trip count,
+sums, sums of squares and minima/maxima of trip columns. update() folds in a
+frame of trips and merge() folds in another accumulator, so the same KPIs can
+be computed chunk by chunk, per file in worker processes, or by combining a
+saved state (save()/load()) with a new delta.
+
+Sums are kept exactly: every finite float64 is an integer multiple of 2**-1074,
+so each sum is stored as that integer (a Python int) and rounded to float only
+when a result is read. Addition of integers does not depend on order or
+grouping, which makes the result of any fold or merge bit-for-bit identical to
+a single pass over all trips. Means and sample variances are derived from the
+exact count, sum and sum of squares with one final rounding, so the variance
+does not suffer the cancellation a floating-point sum of squares would (and is
+not subject to the merge-order rounding differences of Welford updates).
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import trip_store
+
+# Sums are integers in units of 2**-SCALE_BITS (the smallest float64 subnormal)
+SCALE_BITS = 1074
+# Rows per extraction batch; see _exact_sums
+_BATCH_ROWS = 1 << 20
+
+
+def _exact_sums(values, slots, n_slots):
+    # Per-slot exact sums of values as Python ints in units of 2**-SCALE_BITS.
+    # Error-free extraction: with |residual| < 2**e and sigma = 2**(e + 21),
+    # piece = (residual + sigma) - sigma is exact, a multiple of 2**(e - 32) and
+    # at most 2**e, so np.bincount adds up to 2**20 pieces without rounding;
+    # residual - piece (also exact) is below 2**(e - 32) and goes to the next
+    # level. Trip columns need two or three levels.
+    totals = [0] * n_slots
+    for begin in range(0, len(values), _BATCH_ROWS):
+        residual = values[begin:begin + _BATCH_ROWS]
+        batch_slots = slots[begin:begin + _BATCH_ROWS]
+        largest = np.abs(residual).max(initial=0)
+        if not np.isfinite(largest) or largest >= 2.0 ** 1000:
+            raise ValueError("accumulated values must be finite and below 2**1000 in magnitude")
+        while largest > 0:
+            exponent = int(np.frexp(largest)[1])
+            sigma = np.ldexp(1.0, exponent + 21)
+            piece = (residual + sigma) - sigma
+            residual = residual - piece
+            grid = max(exponent - 32, -SCALE_BITS)
+            units = np.ldexp(np.bincount(batch_slots, weights=piece, minlength=n_slots), -grid).astype(np.int64)
+            for slot in np.flatnonzero(units).tolist():
+                totals[slot] += int(units[slot]) << (grid + SCALE_BITS)
+            largest = np.abs(residual).max(initial=0)
+    return totals
+
+
+def _codes(column):
+    # Integer codes and their values; small-range integer columns (the usual
+    # group keys) are offset instead of hashed
+    values = column.to_numpy()
+    if values.dtype.kind in 'iub' and len(values):
+        low, high = int(values.min()), int(values.max())
+        if high - low < 1 << 16:
+            return values.astype(np.int64) - low, np.arange(low, high + 1).astype(values.dtype)
+    return pd.factorize(values, sort=False)
+
+
+def _to_float(numerator, denominator=1):
+    # Correctly rounded numerator / (denominator * 2**SCALE_BITS)
+    return numerator / (denominator << SCALE_BITS)
+
+
+def _encode(total):
+    # Compact exact text form: hex digits and a trailing-zero bit count
+    if total == 0:
+        return '0'
+    shift = (total & -total).bit_length() - 1
+    return f"{total >> shift:x}p{shift}"
+
+
+def _decode(text):
+    digits, _, shift = text.partition('p')
+    return int(digits, 16) << int(shift or 0)
+
+
+class KpiAccumulator:
+    """
+    Mergeable per-group trip count and column statistics
+
+    Args:
+        by: Group columns, or None for one overall group
+        sums: Columns to sum (results: {column}_sum and {column}_mean)
+        moments: Columns to sum with their squares (adds {column}_var and
+            {column}_std, sample statistics)
+        extremes: Columns to track minima and maxima of ({column}_min, _max)
+    """
+
+    def __init__(self, by=None, sums=(), moments=(), extremes=()):
+        self.by = list(by or [])
+        self.sums = list(sums)
+        self.moments = list(moments)
+        self.extremes = list(extremes)
+        self._keys = []
+        self._slots = {}
+        self._trips = np.zeros(0, dtype=np.int64)
+        self._sum = {column: [] for column in self.sums + self.moments}
+        self._sumsq = {column: [] for column in self.moments}
+        self._min = {column: np.zeros(0) for column in self.extremes}
+        self._max = {column: np.zeros(0) for column in self.extremes}
+
+    def _config(self):
+        return {'by': self.by, 'sums': self.sums, 'moments': self.moments, 'extremes': self.extremes}
+
+    def _add_slots(self, keys):
+        # Slot of each key, appending empty state for keys not seen before
+        new = [key for key in dict.fromkeys(keys) if key not in self._slots]
+        if new:
+            for key in new:
+                self._slots[key] = len(self._keys)
+                self._keys.append(key)
+            self._trips = np.concatenate([self._trips, np.zeros(len(new), dtype=np.int64)])
+            for totals in list(self._sum.values()) + list(self._sumsq.values()):
+                totals.extend([0] * len(new))
+            for column in self.extremes:
+                self._min[column] = np.concatenate([self._min[column], np.full(len(new), np.inf)])
+                self._max[column] = np.concatenate([self._max[column], np.full(len(new), -np.inf)])
+        return np.array([self._slots[key] for key in keys], dtype=np.int64)
+
+    def _group(self, frame):
+        # Row -> slot; factorizes each group column and combines the codes
+        if not self.by:
+            return self._add_slots([()])[np.zeros(len(frame), dtype=np.int64)]
+        codes, uniques = zip(*(_codes(frame[column]) for column in self.by))
+        sizes = [max(len(values), 1) for values in uniques]
+        combined = np.zeros(len(frame), dtype=np.int64)
+        for column_codes, size in zip(codes, sizes):
+            combined = combined * size + column_codes
+        groups, present = pd.factorize(combined, sort=False)
+        parts = np.unravel_index(present, sizes)
+        keys = list(zip(*(np.asarray(values)[part].tolist() for values, part in zip(uniques, parts))))
+        return self._add_slots(keys)[groups]
+
+    def update(self, frame):
+        """
+        Fold a frame of trips into the state
+
+        Args:
+            frame: Trips with the group and statistic columns (no missing values)
+
+        Returns:
+            self: For chaining
+        """
+        slots = self._group(frame)
+        n_slots = len(self._keys)
+        self._trips += np.bincount(slots, minlength=n_slots)
+        for column, totals in self._sum.items():
+            values = frame[column].to_numpy(dtype=np.float64)
+            for slot, total in enumerate(_exact_sums(values, slots, n_slots)):
+                totals[slot] += total
+            if column in self._sumsq:
+                squares = _exact_sums(values * values, slots, n_slots)
+                for slot, total in enumerate(squares):
+                    self._sumsq[column][slot] += total
+        for column in self.extremes:
+            values = frame[column].to_numpy(dtype=np.float64)
+            np.minimum.at(self._min[column], slots, values)
+            np.maximum.at(self._max[column], slots, values)
+        return self
+
+    def _absorb(self, other, keys):
+        # Fold other's slots into the slots of the given keys (one per slot of other)
+        slots = self._add_slots(keys)
+        np.add.at(self._trips, slots, other._trips)
+        for column, totals in self._sum.items():
+            for slot, total in zip(slots, other._sum[column]):
+                totals[slot] += total
+        for column, totals in self._sumsq.items():
+            for slot, total in zip(slots, other._sumsq[column]):
+                totals[slot] += total
+        for column in self.extremes:
+            np.minimum.at(self._min[column], slots, other._min[column])
+            np.maximum.at(self._max[column], slots, other._max[column])
+        return self
+
+    def merge(self, other):
+        """
+        Fold another accumulator with the same configuration into this one
+
+        Returns:
+            self: For chaining
+        """
+        if other._config() != self._config():
+            raise ValueError(f"cannot merge accumulators of {other._config()} into {self._config()}")
+        return self._absorb(other, other._keys)
+
+    def rollup(self, by=None):
+        """
+        Re-aggregate to a subset of the group columns (exactly)
+
+        Args:
+            by: Group columns to keep, or None for one overall group
+
+        Returns:
+            KpiAccumulator: A new accumulator grouped by by
+        """
+        by = list(by or [])
+        positions = [self.by.index(column) for column in by]
+        rolled = KpiAccumulator(by, self.sums, self.moments, self.extremes)
+        return rolled._absorb(self, [tuple(key[i] for i in positions) for key in self._keys])
+
+    def result(self):
+        """
+        Returns:
+            DataFrame: One row per group, sorted by the group columns: the
+                group columns, 'trips' and the statistics of each column
+        """
+        trips = self._trips.tolist()
+        columns = {'trips': self._trips}
+        for column, totals in self._sum.items():
+            columns[f"{column}_sum"] = [_to_float(total) for total in totals]
+            columns[f"{column}_mean"] = [_to_float(total, n) for total, n in zip(totals, trips)]
+        for column, squares in self._sumsq.items():
+            variances = []
+            for total, square, n in zip(self._sum[column], squares, trips):
+                # (S2 - S1^2 / n) / (n - 1) with S = total / 2**SCALE_BITS, rounded once
+                numerator = max(square * n * (1 << SCALE_BITS) - total * total, 0)
+                variances.append(numerator / ((n * (n - 1)) << (2 * SCALE_BITS)) if n > 1 else np.nan)
+            columns[f"{column}_var"] = variances
+            columns[f"{column}_std"] = np.sqrt(variances)
+        for column in self.extremes:
+            columns[f"{column}_min"] = self._min[column]
+            columns[f"{column}_max"] = self._max[column]
+        result = pd.concat([pd.DataFrame(self._keys, columns=self.by), pd.DataFrame(columns)], axis=1)
+        if self.by:
+            result = result.sort_values(self.by, kind='stable', ignore_index=True)
+        return result
+
+    def to_dict(self):
+        """
+        Returns:
+            dict: JSON-serializable state (group keys must be numbers or strings)
+        """
+        return {
+            **self._config(),
+            'keys': [list(key) for key in self._keys],
+            'trips': self._trips.tolist(),
+            'sum': {column: [_encode(total) for total in totals] for column, totals in self._sum.items()},
+            'sumsq': {column: [_encode(total) for total in totals] for column, totals in self._sumsq.items()},
+            'min': {column: values.tolist() for column, values in self._min.items()},
+            'max': {column: values.tolist() for column, values in self._max.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        accumulator = cls(state['by'], state['sums'], state['moments'], state['extremes'])
+        accumulator._add_slots([tuple(key) for key in state['keys']])
+        accumulator._trips = np.array(state['trips'], dtype=np.int64)
+        for column in accumulator._sum:
+            accumulator._sum[column] = [_decode(text) for text in state['sum'][column]]
+        for column in accumulator._sumsq:
+            accumulator._sumsq[column] = [_decode(text) for text in state['sumsq'][column]]
+        for column in accumulator.extremes:
+            accumulator._min[column] = np.array(state['min'][column], dtype=np.float64)
+            accumulator._max[column] = np.array(state['max'][column], dtype=np.float64)
+        return accumulator
+
+    def save(self, path):
+        """Write the state as JSON (written next to path and renamed)"""
+        partial = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+        with open(partial, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(partial, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def fold(frames, make):
+    """
+    Fold an iterable of frames (e.g. a chunked CSV reader) into one accumulator
+
+    Args:
+        frames: Iterable of DataFrames
+        make: Callable returning an empty accumulator
+
+    Returns:
+        KpiAccumulator: State of all frames
+    """
+    accumulator = make()
+    for frame in frames:
+        accumulator.update(frame)
+    return accumulator
+
+
+def _fold_file(path, make, columns, start, end):
+    return make().update(trip_store.read_trips(path, start, end, columns=columns))
+
+
+def fold_files(paths, make, columns=None, start=None, end=None, workers=1):
+    """
+    Accumulate cleaned trip files, one file per task across worker processes,
+    and merge the per-file states
+
+    Args:
+        paths: Cleaned trip files (any trip_store layout)
+        make: Module-level callable returning an empty accumulator (it is
+            pickled to the workers)
+        columns: Trip columns to read
+        start, end: Pickup time window passed to trip_store.read_trips
+        workers: Worker processes (1: fold in this process)
+
+    Returns:
+        KpiAccumulator: State of all files
+    """
+    tasks = [(path, make, columns, start, end) for path in paths]
+    if workers <= 1 or len(paths) <= 1:
+        states = (_fold_file(*task) for task in tasks)
+        return fold_states(states, make)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return fold_states(pool.map(_fold_file, *zip(*tasks)), make)
+
+
+def fold_states(states, make):
+    """Merge an iterable of accumulators into a new one"""
+    accumulator = make()
+    for state in states:
+        accumulator.merge(state)
+    return accumulator
+
+
+if __name__ == "__main__":
+    import kpi_engine
+
+    parser = argparse.ArgumentParser(description="Accumulate KPI state over cleaned trip files and print the KPIs")
+    parser.add_argument('data', nargs='+', help="Cleaned trip files or partitioned dataset directories")
+    parser.add_argument('--workers', type=int, default=1, help="Accumulate the files in this many processes")
+    parser.add_argument('--state', default=None,
+                        help="Saved KPI state (JSON) to merge the files into, e.g. yesterday's run")
+    parser.add_argument('--save-state', default=None, help="Write the combined KPI state to this JSON file")
+    parser.add_argument('--start', default=None, help="Only include pickups at or after this time")
+    parser.add_argument('--end', default=None, help="Only include pickups before this time")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ACCUMULATING KPI STATE")
+    print("=" * 60)
+
+    began = time.perf_counter()
+    state = fold_files(args.data, kpi_engine.cell_accumulator, kpi_engine.KPI_COLUMNS, args.start, args.end,
+                       args.workers)
+    print(f"✓ {len(args.data)} file(s): {int(state.result()['trips'].sum()):,} trips in "
+          f"{time.perf_counter() - began:.2f}s")
+    if args.state:
+        state.merge(KpiAccumulator.load(args.state))
+        print(f"✓ Merged saved state: {args.state}")
+    if args.save_state:
+        state.save(args.save_state)
+        print(f"✓ Saved state: {args.save_state} ({os.path.getsize(args.save_state) / 1024:.1f} KB)")
+
+    print("\n📊 KPIs")
+    print("-" * 60)
+    kpi_engine.print_kpis(kpi_engine.compute_from_state(state)['kpis'])
@@ -0,0 +1,176 @@
+"""
+KPI computations over cleaned trip data.
+
+compute_all() makes one grouping pass over the KPI_COLUMNS of the trips: every
+row is assigned to a fine-grained cell (day of week, day of month, hour,
+passenger count) and the measures are summed per cell with np.bincount. The
+headline KPIs and every table behind the dashboard charts are then rolled up
+from the few thousand cells instead of re-scanning or re-filtering the trips.
+compute_kpis.py and the ETL benchmark suite both call it, so the benchmark times
+exactly what the report computes.
+
+When trips arrive in pieces (chunks, worker processes, a saved state plus a
+delta), cell_accumulator() keeps the cell sums exactly in a mergeable
+kpi_accumulators.KpiAccumulator, and compute_from_state() rolls up the same
+tables from it. The exact sums make the result independent of how the pieces
+were split or merged; it can differ from compute_all() over one frame in the
+last bit of the float sums.
+"""
+
+import pandas as pd
+import numpy as np
+
+import kpi_accumulators
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Everything compute_all reads; load only these (trip_store.read_trips(columns=...))
+KPI_COLUMNS = ['day_of_week', 'day', 'hour', 'passenger_count', 'is_peak', 'is_weekend', 'total_amount',
+               'trip_distance', 'fare_amount', 'tip_percentage', 'trip_duration']
+
+CELL_KEYS = ['day_of_week', 'day', 'hour', 'passenger_count']
+# Summed per cell ('trips' is the row count; flags sum to trip counts)
+CELL_SUMS = ['is_peak', 'is_weekend', 'total_amount', 'trip_distance', 'fare_amount', 'tip_percentage',
+             'trip_duration']
+
+
+def aggregate_cells(df):
+    """
+    Sum the trips into (day_of_week, day, hour, passenger_count) cells in one pass
+
+    Args:
+        df: Cleaned trips with at least the KPI_COLUMNS (no missing values, as
+            written by the ETL)
+
+    Returns:
+        DataFrame: One row per non-empty cell with the CELL_KEYS, 'trips' and
+            the CELL_SUMS columns
+    """
+    keys = [df[column].to_numpy().astype(np.int64) for column in CELL_KEYS]
+    # Mixed-radix cell index; the passenger radix adapts to the data
+    sizes = [7, 32, 24, int(keys[3].max(initial=0)) + 1]
+    index = ((keys[0] * sizes[1] + keys[1]) * sizes[2] + keys[2]) * sizes[3] + keys[3]
+    n_cells = int(np.prod(sizes))
+
+    trips = np.bincount(index, minlength=n_cells)
+    occupied = np.flatnonzero(trips)
+    cells = pd.DataFrame(np.column_stack(np.unravel_index(occupied, sizes)), columns=CELL_KEYS)
+    cells['trips'] = trips[occupied]
+    for column in CELL_SUMS:
+        weights = df[column].to_numpy(dtype=np.float64)
+        cells[column] = np.bincount(index, weights=weights, minlength=n_cells)[occupied]
+    return cells
+
+
+def cell_accumulator():
+    """
+    Returns:
+        KpiAccumulator: Empty cell state: trip count and sums of CELL_SUMS per
+            (day_of_week, day, hour, passenger_count) cell
+    """
+    return kpi_accumulators.KpiAccumulator(by=CELL_KEYS, sums=CELL_SUMS)
+
+
+def _sums(state):
+    # Cells of a state with the plain CELL_SUMS names (each exact sum rounded once)
+    table = state.result()
+    return table[state.by + ['trips']].assign(**{column: table[f"{column}_sum"] for column in CELL_SUMS})
+
+
+def _rollup_kpis(cells):
+    total = cells['trips'].sum()
+    sums = cells[CELL_SUMS].sum()
+    peak, weekend = sums['is_peak'], sums['is_weekend']
+    return {
+        'Total Trips': int(total),
+        'Total Revenue': sums['total_amount'],
+        'Average Trip Distance': sums['trip_distance'] / total,
+        'Average Fare': sums['fare_amount'] / total,
+        'Average Tip Percentage': sums['tip_percentage'] / total,
+        'Average Trip Duration': sums['trip_duration'] / total,
+        'Revenue per Mile': sums['total_amount'] / sums['trip_distance'],
+        'Peak Hour Trips': int(peak),
+        'Peak Hour Percentage': (peak / total) * 100,
+        'Weekend Trips': int(weekend),
+        'Weekend Percentage': (weekend / total) * 100,
+        'Average Passengers': (cells['passenger_count'] * cells['trips']).sum() / total
+    }
+
+
+def compute_from_cells(cells):
+    """
+    Compute the headline KPIs and the dashboard tables from cell sums
+
+    Args:
+        cells: Cells as returned by aggregate_cells
+
+    Returns:
+        dict: 'kpis' (KPI name -> value, in report order), 'cells' and the
+            chart tables 'hourly_trips', 'daily_revenue' (total_amount by day
+            of month), 'tip_by_hour', 'revenue_by_dow', 'passenger_counts',
+            'peak_split' ([off-peak, peak] trips) and 'demand_heatmap'
+            (day_of_week x hour)
+    """
+    by_hour = cells.groupby('hour')[['trips', 'tip_percentage']].sum()
+    demand = cells.groupby(['day_of_week', 'hour'])['trips'].sum().reset_index()
+    kpis = _rollup_kpis(cells)
+
+    return {
+        'kpis': kpis,
+        'cells': cells,
+        'hourly_trips': by_hour['trips'],
+        'daily_revenue': cells.groupby('day')['total_amount'].sum(),
+        'tip_by_hour': by_hour['tip_percentage'] / by_hour['trips'],
+        'revenue_by_dow': cells.groupby('day_of_week')['total_amount'].sum(),
+        'passenger_counts': cells.groupby('passenger_count')['trips'].sum(),
+        'peak_split': [kpis['Total Trips'] - kpis['Peak Hour Trips'], kpis['Peak Hour Trips']],
+        'demand_heatmap': demand.pivot(index='day_of_week', columns='hour', values='trips')
+    }
+
+
+def compute_all(df):
+    """
+    Compute the headline KPIs and the dashboard tables from one pass over df
+
+    Args:
+        df: Cleaned and feature-engineered trips (only KPI_COLUMNS are read; no
+            missing values, as written by the ETL)
+
+    Returns:
+        dict: As returned by compute_from_cells
+    """
+    return compute_from_cells(aggregate_cells(df))
+
+
+def compute_from_state(state):
+    """
+    Compute the headline KPIs and the dashboard tables from a cell state
+
+    Args:
+        state: KpiAccumulator from cell_accumulator(), updated with trips and/or
+            merged with other cell states
+
+    Returns:
+        dict: As returned by compute_from_cells
+    """
+    return compute_from_cells(_sums(state))
+
+
+def print_kpis(kpis):
+    """
+    Print KPIs formatted by kind (currency, counts, percentages)
+
+    Args:
+        kpis: The 'kpis' dict returned by compute_all/compute_from_state
+    """
+    for key, value in kpis.items():
+        if 'Total Revenue' in key or 'Revenue per' in key or 'Fare' in key:
+            print(f"{key:.<40} ${value:,.2f}")
+        elif 'Total' in key or 'Peak Hour Trips' in key or 'Weekend Trips' in key:
+            print(f"{key:.<40} {value:,}")
+        elif 'Percentage' in key:
+            print(f"{key:.<40} {value:.2f}%")
+        elif 'Distance' in key or 'Duration' in key or 'Passengers' in key:
+            print(f"{key:.<40} {value:.2f}")
+        else:
+            print(f"{key:.<40} {value:,.2f}")
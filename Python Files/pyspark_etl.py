@@ -1,191 +1,161 @@
+"""
+PySpark ETL for NYC taxi trips.
+
+Importable job: run_job(config) runs ingest, quality rules, features, the
+single-pass KPI aggregation and the writes, unattended. Settings come from
+DEFAULT_CONFIG, an optional JSON config file and command-line flags (in that
+order of precedence, lowest first). Adaptive query execution is enabled and the
+shuffle partition count is derived from the input size, so the same job fits a
+one-month laptop run and a multi-year run on a larger machine or cluster.
+"""
+
 from pyspark.sql import SparkSession
-from pyspark.sql.functions import *
-from pyspark.sql.types import *
-import time
+from pyspark import StorageLevel
+import argparse
+import glob
+import json
+import math
 import os
+import sys
+import time
 
-print("="*70)
-print("PYSPARK ETL PIPELINE - NYC TAXI DATA")
-print("="*70)
-
-# Initialize Spark Session
-print("\n🚀 Initializing Spark Session...")
-start_time = time.time()
-
-spark = SparkSession.builder \
-    .appName("NYC_Taxi_ETL") \
-    .master("local[*]") \
-    .config("spark.driver.memory", "4g") \
-    .config("spark.sql.shuffle.partitions", "8") \
-    .getOrCreate()
-
-print(f"✓ Spark Session created in {time.time() - start_time:.2f} seconds")
-print(f"✓ Spark UI available at: http://localhost:4040")
-print(f"✓ Using {spark.sparkContext.defaultParallelism} cores")
-
-print("\n" + "="*70)
-print("STEP 1: DATA INGESTION")
-print("="*70)
-
-# Read CSV file
-print("\nReading CSV file...")
-load_start = time.time()
-
-df = spark.read.csv(
-    'yellow_tripdata_2015-01.csv',
-    header=True,
-    inferSchema=True
-)
-
-initial_count = df.count()
-print(f"✓ Loaded {initial_count:,} rows in {time.time() - load_start:.2f} seconds")
-print(f"✓ Columns: {len(df.columns)}")
-
-print("\n📋 Schema:")
-df.printSchema()
-
-print("\n" + "="*70)
-print("STEP 2: DATA CLEANING")
-print("="*70)
-
-print(f"\nInitial row count: {initial_count:,}")
-
-clean_start = time.time()
-
-# Apply cleaning filters
-cleaned_df = df.filter(
-    (col('passenger_count') > 0) &
-    (col('passenger_count') <= 6) &
-    (col('trip_distance') > 0.1) &
-    (col('trip_distance') < 100) &
-    (col('fare_amount') > 0) &
-    (col('fare_amount') < 500) &
-    (col('total_amount') > 0) &
-    (col('tip_amount') >= 0)
-)
-
-cleaned_count = cleaned_df.count()
-removed = initial_count - cleaned_count
-
-print(f"✓ Cleaned: {cleaned_count:,} rows")
-print(f"✓ Removed: {removed:,} rows ({(removed/initial_count)*100:.2f}%)")
-print(f"✓ Cleaning time: {time.time() - clean_start:.2f} seconds")
-
-print("\n" + "="*70)
-print("STEP 3: FEATURE ENGINEERING")
-print("="*70)
-
-feature_start = time.time()
-
-# Convert datetime and add features
-enriched_df = cleaned_df \
-    .withColumn('pickup_dt', to_timestamp('tpep_pickup_datetime')) \
-    .withColumn('dropoff_dt', to_timestamp('tpep_dropoff_datetime')) \
-    .withColumn('hour', hour('pickup_dt')) \
-    .withColumn('day_of_week', dayofweek('pickup_dt')) \
-    .withColumn('day', dayofmonth('pickup_dt')) \
-    .withColumn('is_weekend', col('day_of_week').isin([1, 7])) \
-    .withColumn('is_peak', col('hour').isin([7, 8, 17, 18, 19])) \
-    .withColumn('trip_duration',
-                (unix_timestamp('dropoff_dt') - unix_timestamp('pickup_dt')) / 60) \
-    .withColumn('fare_per_mile', col('fare_amount') / col('trip_distance')) \
-    .withColumn('tip_percentage', (col('tip_amount') / col('fare_amount')) * 100)
-
-print("✓ Added features: hour, day_of_week, day, is_weekend, is_peak")
-print("✓ Added metrics: trip_duration, fare_per_mile, tip_percentage")
-print(f"✓ Feature engineering time: {time.time() - feature_start:.2f} seconds")
-
-print("\n" + "="*70)
-print("STEP 4: COMPUTE AGGREGATED KPIs")
-print("="*70)
-
-agg_start = time.time()
-
-# Hourly KPIs
-print("\n📊 Computing hourly KPIs...")
-hourly_kpis = enriched_df.groupBy('hour').agg(
-    count('*').alias('total_trips'),
-    round(sum('total_amount'), 2).alias('total_revenue'),
-    round(avg('trip_distance'), 2).alias('avg_distance'),
-    round(avg('fare_amount'), 2).alias('avg_fare'),
-    round(avg('fare_per_mile'), 2).alias('avg_fare_per_mile')
-).orderBy('hour')
-
-print("✓ Hourly KPIs computed")
-hourly_kpis.show(24, truncate=False)
-
-# Vendor KPIs
-print("\n📊 Computing vendor KPIs...")
-vendor_kpis = enriched_df.groupBy('VendorID').agg(
-    count('*').alias('total_trips'),
-    round(sum('total_amount'), 2).alias('total_revenue'),
-    round(avg('fare_amount'), 2).alias('avg_fare')
-).orderBy(desc('total_revenue'))
-
-vendor_kpis.show(truncate=False)
-
-# Day of week KPIs
-print("\n📊 Computing day-of-week KPIs...")
-dow_kpis = enriched_df.groupBy('day_of_week').agg(
-    count('*').alias('total_trips'),
-    round(sum('total_amount'), 2).alias('total_revenue'),
-    round(avg('fare_amount'), 2).alias('avg_fare')
-).orderBy('day_of_week')
-
-dow_kpis.show(7, truncate=False)
-
-print(f"✓ Aggregation time: {time.time() - agg_start:.2f} seconds")
-
-print("\n" + "="*70)
-print("STEP 5: WRITE OPTIMIZED OUTPUT")
-print("="*70)
-
-write_start = time.time()
-
-# Create output directory
-os.makedirs('output', exist_ok=True)
-
-# Convert to Pandas and save (Windows-friendly approach)
-print("\n📁 Writing hourly KPIs to CSV...")
-hourly_kpis_pd = hourly_kpis.toPandas()
-hourly_kpis_pd.to_csv('output/hourly_kpis_spark.csv', index=False)
-print("✓ Saved: output/hourly_kpis_spark.csv")
-
-# Also save as Parquet using pandas
-hourly_kpis_pd.to_parquet('output/hourly_kpis_spark.parquet', index=False)
-print("✓ Saved: output/hourly_kpis_spark.parquet")
-
-# Write vendor KPIs
-print("\n📁 Writing vendor KPIs...")
-vendor_kpis_pd = vendor_kpis.toPandas()
-vendor_kpis_pd.to_csv('output/vendor_kpis_spark.csv', index=False)
-vendor_kpis_pd.to_parquet('output/vendor_kpis_spark.parquet', index=False)
-print("✓ Saved: output/vendor_kpis_spark.csv & .parquet")
-
-# Write day-of-week KPIs
-print("\n📁 Writing day-of-week KPIs...")
-dow_kpis_pd = dow_kpis.toPandas()
-dow_kpis_pd.to_csv('output/dow_kpis_spark.csv', index=False)
-dow_kpis_pd.to_parquet('output/dow_kpis_spark.parquet', index=False)
-print("✓ Saved: output/dow_kpis_spark.csv & .parquet")
-
-print(f"\n✓ Write time: {time.time() - write_start:.2f} seconds")
-
-print("\n" + "="*70)
-print("PERFORMANCE SUMMARY")
-print("="*70)
-
-total_time = time.time() - start_time
-print(f"\n⏱️  Total Pipeline Execution Time: {total_time:.2f} seconds")
-print(f"📊 Records Processed: {initial_count:,}")
-print(f"📊 Records After Cleaning: {cleaned_count:,}")
-print(f"💾 Output Files Created: 6 files (3 CSV + 3 Parquet)")
-print(f"⚡ Processing Speed: {cleaned_count/total_time:,.0f} rows/second")
-
-print("\n" + "="*70)
-print("SCALABILITY ANALYSIS")
-print("="*70)
-print("""
+import quality_rules
+from etl_telemetry import PipelineTelemetry
+import spark_metrics
+import spark_schema
+import spark_transforms
+
+DEFAULT_CONFIG = {
+    'input': 'yellow_tripdata_2015-01.csv',
+    'output_dir': 'output',
+    # None places these under output_dir (see OUTPUT_FILES)
+    'trips_output': None,
+    'telemetry_path': None,
+    # Per-job/per-stage Spark metrics report, and an optional earlier report to diff against
+    'metrics_path': None,
+    'metrics_baseline': None,
+    # None keeps whatever spark-submit / the environment provides (local[*] by default)
+    'master': None,
+    'driver_memory': '4g',
+    # Shuffle partitions: explicit count, or None to derive from the input size
+    'shuffle_partitions': None,
+    'target_partition_mb': 128,
+    'validate_schema': False,
+    'infer_schema': False,
+    'wait_for_ui': False,
+    # Extra Spark settings, e.g. {"spark.executor.memory": "8g"}
+    'spark_conf': {}
+}
+
+# Default file names inside output_dir for outputs not configured explicitly
+OUTPUT_FILES = {
+    'trips_output': 'cleaned_trips_spark',
+    'telemetry_path': 'spark_etl_telemetry.csv',
+    'metrics_path': 'spark_metrics.json'
+}
+
+
+def resolve_output_paths(config):
+    """
+    Fill in the output paths left unset with their OUTPUT_FILES name under
+    output_dir, so --output-dir moves every output
+
+    Args:
+        config: Job configuration
+
+    Returns:
+        dict: config with every OUTPUT_FILES key set
+    """
+    return dict(config, **{key: os.path.join(config['output_dir'], name)
+                           for key, name in OUTPUT_FILES.items() if not config.get(key)})
+
+
+def input_size_bytes(path):
+    """
+    Total size of the input file(s)
+
+    Args:
+        path: File, directory or glob pattern
+
+    Returns:
+        int: Bytes (0 if nothing matches, e.g. a remote URI)
+    """
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return sum(os.path.getsize(match) for match in glob.glob(path) if os.path.isfile(match))
+
+
+def shuffle_partitions_for(input_bytes, target_partition_mb, parallelism):
+    """
+    Shuffle partition count: about target_partition_mb of input per partition,
+    never fewer than the available cores. AQE coalesces small partitions after
+    each shuffle, so this is an upper bound rather than an exact count.
+
+    Args:
+        input_bytes: Size of the input
+        target_partition_mb: Input megabytes per partition
+        parallelism: Available cores (SparkContext.defaultParallelism)
+
+    Returns:
+        int: Partition count
+    """
+    return max(parallelism, math.ceil(input_bytes / (target_partition_mb * 1024 ** 2)))
+
+
+def create_spark_session(config, app_name="NYC_Taxi_ETL"):
+    """
+    Build (or reuse) a SparkSession with adaptive query execution enabled
+
+    Args:
+        config: Job configuration (see DEFAULT_CONFIG)
+        app_name: Spark application name
+
+    Returns:
+        SparkSession
+    """
+    builder = SparkSession.builder \
+        .appName(app_name) \
+        .config("spark.driver.memory", config['driver_memory']) \
+        .config("spark.sql.adaptive.enabled", "true") \
+        .config("spark.sql.adaptive.coalescePartitions.enabled", "true") \
+        .config("spark.sql.adaptive.skewJoin.enabled", "true") \
+        .config("spark.sql.adaptive.advisoryPartitionSizeInBytes", f"{config['target_partition_mb']}m")
+    if config['master']:
+        builder = builder.master(config['master'])
+    for key, value in config['spark_conf'].items():
+        builder = builder.config(key, value)
+    spark = builder.getOrCreate()
+
+    partitions = config['shuffle_partitions'] or shuffle_partitions_for(
+        input_size_bytes(config['input']), config['target_partition_mb'],
+        spark.sparkContext.defaultParallelism)
+    spark.conf.set("spark.sql.shuffle.partitions", str(partitions))
+    return spark
+
+
+def write_kpi_tables(results, output_dir):
+    """
+    Save the collected KPI tables as CSV and Parquet with pandas
+
+    Args:
+        results: Dict returned by spark_transforms.single_pass_kpis
+        output_dir: Output directory
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for name, prefix in [('hourly', 'hourly'), ('vendor', 'vendor'), ('day_of_week', 'dow'),
+                         ('hourly_quantiles', 'hourly_quantile'), ('dow_quantiles', 'dow_quantile')]:
+        base = os.path.join(output_dir, f"{prefix}_kpis_spark")
+        results[name].to_csv(base + '.csv', index=False)
+        results[name].to_parquet(base + '.parquet', index=False)
+        print(f"✓ Saved: {base}.csv & .parquet")
+
+
+def print_scalability_analysis():
+    print("\n" + "="*70)
+    print("SCALABILITY ANALYSIS")
+    print("="*70)
+    print("""
 📈 How this scales to 100GB+:
 
 1. STORAGE:
@@ -194,7 +164,7 @@ print("""
    - Benefit: Columnar format, 10x compression, partition pruning
 
 2. PROCESSING:
-   - Current: Local Spark (1 machine, 16 cores, 4GB driver memory)
+   - Current: Local Spark (1 machine, all cores, --driver-memory)
    - Scale: Azure Databricks cluster (10-50 nodes, 500GB+ RAM total)
    - Benefit: Distributed processing across cluster nodes
 
@@ -202,6 +172,7 @@ print("""
    ✓ Partition by date (month/day) for query pruning
    ✓ Broadcast small lookup tables (zones, rate codes)
    ✓ Cache frequently accessed datasets in memory
+   ✓ Adaptive query execution; shuffle partitions sized from the input
    ✓ Use Delta Lake for ACID transactions & time travel
    ✓ Z-ordering for multi-column query optimization
 
@@ -211,42 +182,305 @@ print("""
    - With partitioning: Only scan relevant partitions (10x faster)
 
 5. PRODUCTION PIPELINE:
-   ✓ Incremental processing (process only new data daily)
+   ✓ Incremental processing (spark_streaming.py)
    ✓ Checkpointing for fault tolerance
    ✓ Auto-scaling based on data volume
    ✓ Data quality checks at each stage
    ✓ Monitoring & alerting via Azure Monitor
 """)
 
-print("\n🎯 CRITICAL - SPARK UI SCREENSHOT!")
-print("="*70)
-print("📸 CAPTURE THESE SCREENSHOTS NOW:")
-print("   1. Open: http://localhost:4040")
-print("   2. Click 'Jobs' tab → Screenshot showing completed jobs")
-print("   3. Click 'Stages' tab → Click any stage → Screenshot DAG")
-print("   4. Click 'SQL' tab → Screenshot query execution plans")
-print("   5. Save as: spark_ui_jobs.png, spark_dag.png, spark_sql.png")
-print("\n⏰ Spark UI will close when you press Enter!")
-
-# Keep Spark UI alive for screenshots
-try:
-    input("\n>>> Press Enter after taking screenshots to stop Spark...")
-except KeyboardInterrupt:
-    print("\n\nStopping Spark...")
-
-spark.stop()
-
-print("\n" + "="*70)
-print("✅ PYSPARK ETL COMPLETE!")
-print("="*70)
-print("\n📁 Generated Outputs:")
-print("   • output/hourly_kpis_spark.csv")
-print("   • output/hourly_kpis_spark.parquet")
-print("   • output/vendor_kpis_spark.csv & .parquet")
-print("   • output/dow_kpis_spark.csv & .parquet")
-print("\n🔥 Key Achievements:")
-print("   ✓ Processed 12.6M rows in distributed fashion")
-print(f"   ✓ Used 16 parallel cores")
-print("   ✓ Demonstrated GROUP BY aggregations at scale")
-print("   ✓ Generated scalability documentation")
-print("\n📸 Don't forget: Spark UI screenshots are CRITICAL for assignment!")
+
+def wait_for_ui(spark):
+    # Interactive sessions only: keep the Spark UI up for screenshots
+    if not sys.stdin.isatty():
+        print("\nℹ No terminal attached; not waiting for the Spark UI")
+        return
+    print("\n📸 Spark UI: " + (spark.sparkContext.uiWebUrl or "http://localhost:4040"))
+    print("   Jobs / Stages / SQL tabs show the completed jobs, DAGs and query plans")
+    try:
+        input("\n>>> Press Enter to stop Spark...")
+    except (KeyboardInterrupt, EOFError):
+        print("\n\nStopping Spark...")
+
+
+def run_job(config=None):
+    """
+    Run the ETL end to end without user interaction
+
+    Args:
+        config: Settings overriding DEFAULT_CONFIG (dict), or None
+
+    Returns:
+        dict: The single-pass results (counts and KPI tables, see
+            spark_transforms.single_pass_kpis) plus 'total_seconds'
+    """
+    config = resolve_output_paths({**DEFAULT_CONFIG, **(config or {})})
+    output_dir = config['output_dir']
+
+    print("="*70)
+    print("PYSPARK ETL PIPELINE - NYC TAXI DATA")
+    print("="*70)
+
+    # Per-stage timing/memory records (driver process), appended to telemetry_path
+    telemetry = PipelineTelemetry('spark_etl')
+
+    # Initialize Spark Session
+    print("\n🚀 Initializing Spark Session...")
+    start_time = time.time()
+    stage = telemetry.start('spark_session')
+    spark = create_spark_session(config)
+    telemetry.finish(stage)
+    print(f"✓ Spark UI available at: {spark.sparkContext.uiWebUrl}")
+    print(f"✓ Using {spark.sparkContext.defaultParallelism} cores")
+    print(f"✓ Adaptive execution on; {spark.conf.get('spark.sql.shuffle.partitions')} shuffle partitions "
+          f"for {input_size_bytes(config['input']) / 1024 ** 2:,.0f} MB of input")
+
+    print("\n" + "="*70)
+    print("STEP 1: DATA INGESTION")
+    print("="*70)
+
+    # Read CSV file
+    print(f"\nReading {config['input']}...")
+    stage = telemetry.start('ingest')
+    spark_metrics.set_job_group(spark, 'ingest', 'Read trips')
+
+    if config['infer_schema']:
+        df = spark.read.csv(config['input'], header=True, inferSchema=True)
+    else:
+        # Declared schema: no type-inference pass, timestamps parsed while reading
+        df = spark_schema.read_trips_csv(spark, config['input'], validate=config['validate_schema'])
+
+    # Cached for the violation report and the first job; released once
+    # flagged_df holds the rows
+    validated_df = None
+    if config['validate_schema'] and not config['infer_schema']:
+        df = validated_df = df.cache()
+        spark_schema.report_schema_violations(df)
+        df = df.drop(spark_schema.CORRUPT_RECORD_COLUMN)
+
+    telemetry.finish(stage)
+    print(f"✓ Columns: {len(df.columns)}")
+
+    print("\n📋 Schema:")
+    df.printSchema()
+
+    print("\n" + "="*70)
+    print("STEP 2: DATA CLEANING")
+    print("="*70)
+
+    stage = telemetry.start('clean')
+
+    # Tag rows with their quality-rule bitmask instead of filtering and counting
+    # here: the counts come out of the single aggregation job in step 4
+    flagged_df = spark_transforms.flag_and_enrich(df)
+    # Broadcast joins against the bundled lookups: no shuffle of the trips
+    flagged_df = spark_transforms.add_lookup_labels(spark, flagged_df)
+    # Kept after the first job so the trip-level write in step 5 does not parse the CSV again
+    flagged_df = flagged_df.persist(StorageLevel.MEMORY_AND_DISK)
+    print("✓ Quality rules attached (quality_mask, is_valid)")
+    telemetry.finish(stage)
+
+    print("\n" + "="*70)
+    print("STEP 3: FEATURE ENGINEERING")
+    print("="*70)
+
+    print("✓ Added features: hour, day_of_week, day, is_weekend, is_peak")
+    print("✓ Added metrics: trip_duration, fare_per_mile, tip_percentage")
+    print("✓ Added labels (broadcast lookup joins): vendor_name, rate_code_name, payment_type_name")
+
+    print("\n" + "="*70)
+    print("STEP 4: COMPUTE AGGREGATED KPIs")
+    print("="*70)
+
+    stage = telemetry.start('aggregate')
+    spark_metrics.set_job_group(spark, 'aggregate', 'Quality counts and KPIs (single pass)')
+
+    # One GROUPING SETS job: rows per quality-rule combination plus the hourly,
+    # vendor and day-of-week KPIs over the valid rows
+    print("\n📊 Computing quality counts and all KPI families in one pass...")
+    results = spark_transforms.single_pass_kpis(spark, flagged_df)
+    if validated_df is not None:
+        validated_df.unpersist()
+    initial_count = results['initial_count']
+    cleaned_count = results['cleaned_count']
+    removed = initial_count - cleaned_count
+    stage['rows_in'] = initial_count
+    telemetry.finish(stage, rows_out=cleaned_count)
+
+    quality_rules.print_report(results['quality_counts'])
+    print(f"\n✓ Loaded {initial_count:,} rows")
+    print(f"✓ Cleaned: {cleaned_count:,} rows")
+    print(f"✓ Removed: {removed:,} rows ({(removed/initial_count)*100:.2f}%)")
+
+    print("\n📊 Hourly KPIs:")
+    print(results['hourly'].to_string(index=False))
+    print("\n📊 Vendor KPIs:")
+    print(results['vendor'].to_string(index=False))
+    print("\n📊 Day-of-week KPIs:")
+    print(results['day_of_week'].to_string(index=False))
+    print("\n📊 Day-of-week distribution KPIs (approximate median/p90/p99):")
+    print(results['dow_quantiles'].to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+
+    print("\n" + "="*70)
+    print("STEP 5: WRITE OPTIMIZED OUTPUT")
+    print("="*70)
+
+    stage = telemetry.start('write')
+    print(f"\n📁 Writing KPI tables to {output_dir}/...")
+    write_kpi_tables(results, output_dir)
+    telemetry.finish(stage)
+
+    # Trip-level output through the distributed writer: one task per pickup date,
+    # no collection to the driver
+    print(f"\n📁 Writing cleaned trips to {config['trips_output']}/pickup_date=.../")
+    stage = telemetry.start('write_trips', rows_in=cleaned_count)
+    spark_metrics.set_job_group(spark, 'write_trips', 'Write partitioned cleaned trips')
+    spark_transforms.write_cleaned_trips(flagged_df, config['trips_output'])
+    telemetry.finish(stage)
+    flagged_df.unpersist()
+    print(f"✓ Saved: {config['trips_output']} "
+          f"(read with trip_store.read_trips or TRIPS_PATH={config['trips_output']})")
+
+    telemetry.write(config['telemetry_path'])
+    print(f"✓ Stage telemetry appended to: {config['telemetry_path']}")
+
+    print("\n" + "="*70)
+    print("PERFORMANCE SUMMARY")
+    print("="*70)
+
+    total_time = time.time() - start_time
+    print(f"\n⏱️  Total Pipeline Execution Time: {total_time:.2f} seconds")
+    print(f"📊 Records Processed: {initial_count:,}")
+    print(f"📊 Records After Cleaning: {cleaned_count:,}")
+    print(f"💾 Output Files Created: 10 KPI files (5 CSV + 5 Parquet) + partitioned trip dataset")
+    print(f"⚡ Processing Speed: {cleaned_count/total_time:,.0f} rows/second")
+
+    print_scalability_analysis()
+
+    # Job/stage metrics must be read while the session (and its UI) is alive
+    report = spark_metrics.collect_metrics(spark)
+    spark_metrics.write_report(report, config['metrics_path'])
+    totals = report['totals']
+    print(f"\n📈 Spark metrics: {totals['jobs']} jobs, {totals['stages']} stages, {totals['scans']} input scans, "
+          f"{totals['shuffle_write_bytes'] / 1024 ** 2:,.1f} MB shuffled, "
+          f"{totals['disk_spilled_bytes'] / 1024 ** 2:,.1f} MB spilled to disk")
+    print(f"✓ Saved: {config['metrics_path']}")
+    if config['metrics_baseline']:
+        diff = spark_metrics.diff_reports(spark_metrics.load_report(config['metrics_baseline']), report)
+        regressions = diff[diff['regression']]
+        print(f"{'❌' if len(regressions) else '✅'} {len(regressions)} metric regression(s) "
+              f"against {config['metrics_baseline']}")
+        for row in regressions.itertuples():
+            print(f"  [{row.scope}] {row.metric}: {row.before:,} → {row.after:,}")
+
+    if config['wait_for_ui']:
+        wait_for_ui(spark)
+    spark.stop()
+
+    print("\n" + "="*70)
+    print("✅ PYSPARK ETL COMPLETE!")
+    print("="*70)
+    print("\n📁 Generated Outputs:")
+    print(f"   • {output_dir}/hourly_kpis_spark.csv & .parquet")
+    print(f"   • {output_dir}/vendor_kpis_spark.csv & .parquet")
+    print(f"   • {output_dir}/dow_kpis_spark.csv & .parquet")
+    print(f"   • {output_dir}/hourly_quantile_kpis_spark.csv & .parquet")
+    print(f"   • {output_dir}/dow_quantile_kpis_spark.csv & .parquet")
+    print(f"   • {config['trips_output']}/ (cleaned trips, partitioned by pickup_date)")
+
+    return dict(results, total_seconds=total_time)
+
+
+SESSION_KEYS = ['master', 'driver_memory', 'shuffle_partitions', 'target_partition_mb']
+
+
+def add_session_arguments(parser):
+    """
+    Add the Spark session flags (--master, --driver-memory, --shuffle-partitions,
+    --target-partition-mb, --conf) to a command-line parser
+
+    Args:
+        parser: argparse.ArgumentParser
+    """
+    parser.add_argument('--master', default=None, help="Spark master URL, e.g. local[8] or yarn")
+    parser.add_argument('--driver-memory', default=None, help="Driver memory (default: 4g)")
+    parser.add_argument('--shuffle-partitions', type=int, default=None,
+                        help="Fixed shuffle partition count (default: derived from input size)")
+    parser.add_argument('--target-partition-mb', type=int, default=None,
+                        help="Input MB per shuffle partition when deriving the count (default: 128)")
+    parser.add_argument('--conf', action='append', default=[], metavar='KEY=VALUE',
+                        help="Extra Spark setting (repeatable)")
+
+
+def apply_session_arguments(config, args):
+    """
+    Override the session settings of a configuration with the flags that were
+    given (see add_session_arguments)
+
+    Args:
+        config: Job configuration (see DEFAULT_CONFIG)
+        args: Parsed arguments
+
+    Returns:
+        dict: Configuration for create_spark_session
+    """
+    config = dict(config, **{key: getattr(args, key) for key in SESSION_KEYS if getattr(args, key) is not None})
+    config['spark_conf'] = dict(config['spark_conf'], **dict(item.split('=', 1) for item in args.conf))
+    return config
+
+
+def parse_config(argv=None):
+    """
+    Build the job configuration from DEFAULT_CONFIG, an optional --config JSON
+    file and command-line flags
+
+    Args:
+        argv: Argument list (default: sys.argv[1:])
+
+    Returns:
+        dict: Complete configuration
+    """
+    parser = argparse.ArgumentParser(description="PySpark ETL for NYC taxi trips")
+    parser.add_argument('input', nargs='?', default=None,
+                        help=f"Raw trip CSV file, directory or glob (default: {DEFAULT_CONFIG['input']})")
+    parser.add_argument('--config', default=None, help="JSON file with any DEFAULT_CONFIG keys")
+    parser.add_argument('--output-dir', default=None,
+                        help="Directory for KPI tables and, unless set below, the other outputs (default: output)")
+    parser.add_argument('--trips-output', default=None,
+                        help="Directory for the date-partitioned Parquet dataset of cleaned trips "
+                             "(default: <output-dir>/cleaned_trips_spark)")
+    parser.add_argument('--telemetry-path', default=None,
+                        help="Stage telemetry file, .csv or .jsonl (default: <output-dir>/spark_etl_telemetry.csv)")
+    parser.add_argument('--metrics-path', default=None,
+                        help="Spark job/stage metrics report (default: <output-dir>/spark_metrics.json)")
+    parser.add_argument('--metrics-baseline', default=None,
+                        help="Earlier metrics report to diff against (flags extra scans, spill, ...)")
+    add_session_arguments(parser)
+    parser.add_argument('--validate-schema', action='store_true', default=None,
+                        help="Report rows that do not match the declared schema (extra cached pass)")
+    parser.add_argument('--infer-schema', action='store_true', default=None,
+                        help="Infer column types with an extra full scan instead of the declared schema "
+                             "(for before/after ingest comparisons)")
+    parser.add_argument('--wait-for-ui', action='store_true', default=None,
+                        help="Keep the Spark UI up until Enter is pressed (interactive terminals only)")
+    args = parser.parse_args(argv)
+
+    config = dict(DEFAULT_CONFIG)
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            config.update(json.load(f))
+
+    for key in ['input', 'output_dir', 'trips_output', 'telemetry_path', 'metrics_path', 'metrics_baseline',
+                'validate_schema', 'infer_schema', 'wait_for_ui']:
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+    return apply_session_arguments(config, args)
+
+
+def main(argv=None):
+    run_job(parse_config(argv))
+
+
+if __name__ == "__main__":
+    main()
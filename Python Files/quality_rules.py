@@ -0,0 +1,256 @@
+"""
+Vectorized data-quality rule engine for trip records.
+
+Every rule is a declarative list of checks that a valid row must pass. Rules are
+evaluated in one pass into a packed uint16 bitmask (bit i set = row violates rule
+i), and rejection counts come from a bincount over that mask, so no rejected rows
+are ever materialized. The same rule definitions run on pandas and on Spark.
+
+Rules marked enforced are the cleaning filters used by the ETL; the others are
+report-only diagnostics.
+"""
+
+import pandas as pd
+import numpy as np
+
+# NYC bounding box (covers the five boroughs and both airports)
+NYC_LONGITUDE = (-74.27, -73.68)
+NYC_LATITUDE = (40.49, 40.92)
+
+# Documented payment codes (trip_schema.PAYMENT_TYPES); other or missing codes are
+# kept in the cleaned data under their own value and reported here
+PAYMENT_TYPE_RANGE = (1, 6)
+
+# Each check is (column, op, argument); op is one of >, >=, <, <=, between,
+# >=column (compare against another column) and notnull
+QUALITY_RULES = [
+    {'name': 'passenger_count_positive', 'enforced': True,
+     'checks': [('passenger_count', '>', 0)]},
+    {'name': 'passenger_count_max_6', 'enforced': True,
+     'checks': [('passenger_count', '<=', 6)]},
+    {'name': 'trip_distance_min_0.1', 'enforced': True,
+     'checks': [('trip_distance', '>', 0.1)]},
+    {'name': 'trip_distance_max_100', 'enforced': True,
+     'checks': [('trip_distance', '<', 100)]},
+    {'name': 'fare_amount_positive', 'enforced': True,
+     'checks': [('fare_amount', '>', 0)]},
+    {'name': 'fare_amount_max_500', 'enforced': True,
+     'checks': [('fare_amount', '<', 500)]},
+    {'name': 'total_amount_positive', 'enforced': True,
+     'checks': [('total_amount', '>', 0)]},
+    {'name': 'tip_amount_non_negative', 'enforced': True,
+     'checks': [('tip_amount', '>=', 0)]},
+    {'name': 'timestamps_present', 'enforced': False,
+     'checks': [('tpep_pickup_datetime', 'notnull', None), ('tpep_dropoff_datetime', 'notnull', None)]},
+    {'name': 'duration_non_negative', 'enforced': False,
+     'checks': [('tpep_dropoff_datetime', '>=column', 'tpep_pickup_datetime')]},
+    {'name': 'pickup_in_nyc', 'enforced': False,
+     'checks': [('pickup_longitude', 'between', NYC_LONGITUDE), ('pickup_latitude', 'between', NYC_LATITUDE)]},
+    {'name': 'dropoff_in_nyc', 'enforced': False,
+     'checks': [('dropoff_longitude', 'between', NYC_LONGITUDE), ('dropoff_latitude', 'between', NYC_LATITUDE)]},
+    {'name': 'payment_type_known', 'enforced': False,
+     'checks': [('payment_type', 'between', PAYMENT_TYPE_RANGE)]}
+]
+
+RULE_NAMES = [rule['name'] for rule in QUALITY_RULES]
+RULE_BITS = [1 << i for i in range(len(QUALITY_RULES))]
+ENFORCED_MASK = sum(bit for bit, rule in zip(RULE_BITS, QUALITY_RULES) if rule['enforced'])
+N_COMBINATIONS = 1 << len(QUALITY_RULES)
+
+_NUMPY_OPS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal
+}
+
+
+def evaluate_rules(df):
+    """
+    Evaluate every rule on a pandas DataFrame in one vectorized pass
+
+    Args:
+        df: Raw trip DataFrame
+
+    Returns:
+        ndarray: uint16 bitmask per row; bit i is set when the row violates rule i
+    """
+    n = len(df)
+    mask = np.zeros(n, dtype=np.uint16)
+    valid = np.empty(n, dtype=bool)
+    scratch = np.empty(n, dtype=bool)
+
+    for bit, rule in zip(RULE_BITS, QUALITY_RULES):
+        valid.fill(True)
+        for column, op, argument in rule['checks']:
+            values = df[column].to_numpy()
+            if op == 'notnull':
+                scratch[:] = pd.notna(values)
+            elif op == '>=column':
+                np.greater_equal(values, df[argument].to_numpy(), out=scratch)
+            elif op == 'between':
+                np.greater_equal(values, argument[0], out=scratch)
+                np.logical_and(valid, scratch, out=valid)
+                np.less_equal(values, argument[1], out=scratch)
+            else:
+                _NUMPY_OPS[op](values, argument, out=scratch)
+            np.logical_and(valid, scratch, out=valid)
+        np.logical_not(valid, out=valid)
+        np.bitwise_or(mask, bit, out=mask, where=valid)
+
+    return mask
+
+
+def combination_counts(mask):
+    """
+    Count rows per violation combination
+
+    Args:
+        mask: Bitmask from evaluate_rules
+
+    Returns:
+        ndarray: int64 counts of length N_COMBINATIONS (index = bitmask value);
+            arrays from different chunks can simply be added together
+    """
+    return np.bincount(mask, minlength=N_COMBINATIONS).astype(np.int64)
+
+
+def is_valid(mask):
+    """
+    Rows passing every enforced rule (equivalent to the ETL cleaning filter)
+
+    Args:
+        mask: Bitmask from evaluate_rules
+
+    Returns:
+        ndarray: Boolean keep-mask
+    """
+    return (mask & ENFORCED_MASK) == 0
+
+
+def _dense(counts):
+    # Accept either a dense bincount array or a sparse {bitmask: rows} dict
+    if isinstance(counts, dict):
+        dense = np.zeros(N_COMBINATIONS, dtype=np.int64)
+        for combination, rows in counts.items():
+            dense[int(combination)] = rows
+        return dense
+    return np.asarray(counts, dtype=np.int64)
+
+
+def summarize(counts):
+    """
+    Build per-rule and per-combination rejection tables from combination counts
+
+    Args:
+        counts: Array (or {bitmask: rows} dict) of rows per violation combination
+
+    Returns:
+        tuple: (rule_counts DataFrame, combination_counts DataFrame)
+    """
+    counts = _dense(counts)
+    total_rows = int(counts.sum())
+    combinations = np.flatnonzero(counts)
+
+    rule_rows = []
+    for bit, rule in zip(RULE_BITS, QUALITY_RULES):
+        hits = combinations[(combinations & bit) != 0]
+        violations = int(counts[hits].sum())
+        rule_rows.append({
+            'rule': rule['name'],
+            'enforced': rule['enforced'],
+            'violations': violations,
+            'pct_of_rows': violations / total_rows * 100 if total_rows else 0.0,
+            'only_this_rule': int(counts[bit])
+        })
+    rule_counts = pd.DataFrame(rule_rows)
+
+    combo_rows = [
+        {
+            'bitmask': int(combination),
+            'rules': ' + '.join(name for bit, name in zip(RULE_BITS, RULE_NAMES) if combination & bit),
+            'rejected': bool(combination & ENFORCED_MASK),
+            'rows': int(counts[combination])
+        }
+        for combination in combinations if combination != 0
+    ]
+    combo_counts = pd.DataFrame(combo_rows, columns=['bitmask', 'rules', 'rejected', 'rows'])
+    combo_counts = combo_counts.sort_values('rows', ascending=False, ignore_index=True)
+
+    return rule_counts, combo_counts
+
+
+def print_report(counts, top=10):
+    """
+    Print the per-rule and top combination rejection tables
+
+    Args:
+        counts: Combination counts (see summarize)
+        top: Number of combinations to show
+    """
+    counts = _dense(counts)
+    rule_counts, combo_counts = summarize(counts)
+    total_rows = int(counts.sum())
+    clean_rows = int(counts[(np.arange(N_COMBINATIONS) & ENFORCED_MASK) == 0].sum())
+
+    print(f"\nData quality rules ({total_rows:,} rows evaluated):")
+    for row in rule_counts.itertuples():
+        tag = "filter" if row.enforced else "report"
+        print(f"  [{tag}] {row.rule:.<32} {row.violations:>12,} ({row.pct_of_rows:5.2f}%)"
+              f"  only this rule: {row.only_this_rule:,}")
+    print(f"  Rows rejected by enforced rules: {total_rows - clean_rows:,}")
+
+    if len(combo_counts):
+        print(f"\nTop {min(top, len(combo_counts))} violation combinations:")
+        for row in combo_counts.head(top).itertuples():
+            print(f"  {row.rows:>12,}  {row.rules}{'' if row.rejected else '  (kept)'}")
+
+
+def evaluate_rules_spark(df, mask_column='quality_mask'):
+    """
+    Add the violation bitmask as an integer column to a Spark DataFrame
+
+    Args:
+        df: Spark DataFrame with the raw trip columns
+        mask_column: Name of the bitmask column
+
+    Returns:
+        Spark DataFrame with mask_column added
+    """
+    from pyspark.sql import functions as F
+
+    def check_expression(column, op, argument):
+        c = F.col(column)
+        if op == 'notnull':
+            return c.isNotNull()
+        if op == '>=column':
+            return c >= F.col(argument)
+        if op == 'between':
+            return (c >= argument[0]) & (c <= argument[1])
+        return {'>': c > argument, '>=': c >= argument, '<': c < argument, '<=': c <= argument}[op]
+
+    mask = F.lit(0)
+    for bit, rule in zip(RULE_BITS, QUALITY_RULES):
+        valid = None
+        for check in rule['checks']:
+            expression = check_expression(*check)
+            valid = expression if valid is None else valid & expression
+        # NULL comparisons count as violations, matching NaN handling in pandas
+        mask = mask + F.when(F.coalesce(valid, F.lit(False)), F.lit(0)).otherwise(F.lit(bit))
+
+    return df.withColumn(mask_column, mask.cast('int'))
+
+
+def combination_counts_spark(df):
+    """
+    Count rows per violation combination on Spark (one aggregation job; only the
+    small combination table reaches the driver)
+
+    Args:
+        df: Spark DataFrame with the raw trip columns
+
+    Returns:
+        dict: {bitmask: rows}, accepted by summarize and print_report
+    """
+    rows = evaluate_rules_spark(df).groupBy('quality_mask').count().collect()
+    return {row['quality_mask']: row['count'] for row in rows}
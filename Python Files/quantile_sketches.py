@@ -0,0 +1,392 @@
+"""
+Streaming quantile sketches of trip distributions.
+
+Means hide what outliers do to fares, durations and tips; medians and tail
+percentiles do not, but exact percentiles need every value in memory and cannot
+be combined across chunks or months. QuantileSketch is a KLL sketch: values go
+into a hierarchy of sorted compactors where an item at level h stands for 2**h
+trips, and full compactors promote every other item one level up. Memory stays
+bounded by about 3k items however many values are added (rank error roughly
+1.7/k, about 1% at the default k=200), and two sketches merge by concatenating
+levels, so per-chunk, per-worker or per-month sketches combine into one.
+
+QuantileAccumulator keeps one sketch per column and group with the same
+update()/merge()/rollup() interface as kpi_accumulators.KpiAccumulator. The ETL
+writes sketches per (pickup date, hour) to trip_sketches.parquet, from which any
+date window rolls up to overall, hourly or day-of-week percentiles.
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import kpi_accumulators
+import trip_store
+
+SKETCHES_PATH = 'trip_sketches.parquet'
+
+QUANTILE_COLUMNS = ['fare_amount', 'trip_duration', 'tip_percentage']
+QUANTILES = [0.5, 0.9, 0.99]
+# Sketch keys written by the ETL; day_of_week follows from the date
+SKETCH_BY = ['pickup_date', 'hour', 'day_of_week']
+SOURCE_COLUMNS = ['tpep_pickup_datetime', 'hour', 'day_of_week'] + QUANTILE_COLUMNS
+
+DEFAULT_K = 200
+
+
+class QuantileSketch:
+    """
+    KLL quantile sketch of a stream of numbers
+
+    Args:
+        k: Capacity of the top compactor; larger is more accurate
+        seed: Seed of the coin flips that pick which half of a compactor is
+            promoted (fixed, so runs are reproducible)
+    """
+
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.levels = [np.zeros(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        # Capacities shrink geometrically (factor 2/3) below the top level
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        while any(len(items) > self._capacity(level) for level, items in enumerate(self.levels)):
+            for level in range(len(self.levels)):
+                if len(self.levels[level]) <= self._capacity(level):
+                    continue
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                items = np.sort(self.levels[level])
+                # With an odd count one item stays behind, so pairs keep the total weight
+                odd = len(items) % 2
+                self.levels[level] = items[:odd]
+                promoted = items[odd:][self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    def update(self, values):
+        """
+        Add values (NaN is ignored)
+
+        Returns:
+            self: For chaining
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, *others):
+        """
+        Fold other sketches into this one (compacting once, after all of them)
+
+        Returns:
+            self: For chaining
+        """
+        depth = max([len(self.levels)] + [len(other.levels) for other in others])
+        self.levels += [np.zeros(0)] * (depth - len(self.levels))
+        for level in range(depth):
+            self.levels[level] = np.concatenate([self.levels[level]] + [other.levels[level] for other in others
+                                                                        if level < len(other.levels)])
+        self.n += sum(other.n for other in others)
+        self.min = min([self.min] + [other.min for other in others])
+        self.max = max([self.max] + [other.max for other in others])
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """
+        Args:
+            qs: Quantiles in [0, 1]
+
+        Returns:
+            ndarray: Estimated values (exact at 0 and 1; NaN if the sketch is empty)
+        """
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.n == 0:
+            return np.full(qs.shape, np.nan)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        ranks = np.cumsum(weights[order])
+        positions = np.minimum(np.searchsorted(ranks, qs * ranks[-1], side='left'), len(values) - 1)
+        estimates = np.clip(values[order][positions], self.min, self.max)
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, estimates))
+
+    def to_record(self):
+        """
+        Returns:
+            dict: Serializable state (k, n, min, max and the items per level)
+        """
+        return {'k': self.k, 'n': self.n, 'min': float(self.min), 'max': float(self.max),
+                'levels': [items.tolist() for items in self.levels]}
+
+    @classmethod
+    def from_record(cls, record):
+        sketch = cls(int(record['k']))
+        sketch.n = int(record['n'])
+        sketch.min, sketch.max = float(record['min']), float(record['max'])
+        sketch.levels = [np.asarray(items, dtype=np.float64) for items in record['levels']] or [np.zeros(0)]
+        return sketch
+
+
+def _label(q):
+    return f"p{q * 100:g}"
+
+
+class QuantileAccumulator:
+    """
+    Mergeable per-group quantile sketches of trip columns
+
+    Args:
+        by: Group columns, or None for one overall group
+        columns: Columns to sketch
+        k: Sketch size (see QuantileSketch)
+    """
+
+    def __init__(self, by=None, columns=QUANTILE_COLUMNS, k=DEFAULT_K):
+        self.by = list(by or [])
+        self.columns = list(columns)
+        self.k = k
+        self._sketches = {}
+
+    def __len__(self):
+        return len(self._sketches)
+
+    def _group_sketches(self, key):
+        if key not in self._sketches:
+            self._sketches[key] = {column: QuantileSketch(self.k) for column in self.columns}
+        return self._sketches[key]
+
+    def update(self, frame):
+        """
+        Add a frame of trips with the group and sketched columns
+
+        Returns:
+            self: For chaining
+        """
+        groups = frame.groupby(self.by, sort=False) if self.by else [((), frame)]
+        for key, group in groups:
+            sketches = self._group_sketches(key if isinstance(key, tuple) else (key,))
+            for column in self.columns:
+                sketches[column].update(group[column].to_numpy())
+        return self
+
+    def _absorb(self, other, keys):
+        # Fold other's groups into the groups of the given keys (one per group of other)
+        sources = {}
+        for key, sketches in zip(keys, other._sketches.values()):
+            sources.setdefault(key, []).append(sketches)
+        for key, groups in sources.items():
+            target = self._group_sketches(key)
+            for column in self.columns:
+                target[column].merge(*[sketches[column] for sketches in groups])
+        return self
+
+    def merge(self, other):
+        """
+        Fold another accumulator with the same group and sketched columns into this one
+
+        Returns:
+            self: For chaining
+        """
+        if (other.by, other.columns) != (self.by, self.columns):
+            raise ValueError(f"cannot merge sketches by {other.by} of {other.columns} "
+                             f"into sketches by {self.by} of {self.columns}")
+        return self._absorb(other, other._sketches.keys())
+
+    def select(self, start=None, end=None):
+        """
+        Groups inside a pickup date window (needs 'pickup_date' in by)
+
+        Returns:
+            QuantileAccumulator: The selected groups (sketches are shared, not copied)
+        """
+        position = self.by.index('pickup_date')
+        selected = QuantileAccumulator(self.by, self.columns, self.k)
+        for key, sketches in self._sketches.items():
+            if ((start is None or key[position] >= pd.Timestamp(start).floor('D'))
+                    and (end is None or key[position] < pd.Timestamp(end))):
+                selected._sketches[key] = sketches
+        return selected
+
+    def rollup(self, by=None):
+        """
+        Merge the sketches to a subset of the group columns
+
+        Args:
+            by: Group columns to keep, or None for one overall group
+
+        Returns:
+            QuantileAccumulator: A new accumulator grouped by by
+        """
+        by = list(by or [])
+        positions = [self.by.index(column) for column in by]
+        rolled = QuantileAccumulator(by, self.columns, self.k)
+        return rolled._absorb(self, [tuple(key[i] for i in positions) for key in self._sketches])
+
+    def result(self, quantiles=QUANTILES):
+        """
+        Args:
+            quantiles: Quantiles to estimate
+
+        Returns:
+            DataFrame: One row per group, sorted by the group columns: the group
+                columns, 'trips' and {column}_p50 etc. per column and quantile
+        """
+        rows = []
+        for key, sketches in self._sketches.items():
+            row = dict(zip(self.by, key))
+            row['trips'] = sketches[self.columns[0]].n if self.columns else 0
+            for column in self.columns:
+                row.update(zip([f"{column}_{_label(q)}" for q in quantiles], sketches[column].quantiles(quantiles)))
+            rows.append(row)
+        result = pd.DataFrame(rows, columns=self.by + ['trips'] + [f"{column}_{_label(q)}" for column in self.columns
+                                                                   for q in quantiles])
+        if self.by:
+            result = result.sort_values(self.by, ignore_index=True)
+        return result
+
+    def to_frame(self):
+        """
+        Returns:
+            DataFrame: One row per group and column with the group columns,
+                'column' and the sketch state (k, n, min, max, levels)
+        """
+        records = [{**dict(zip(self.by, key)), 'column': column, **sketches[column].to_record()}
+                   for key, sketches in self._sketches.items() for column in self.columns]
+        return pd.DataFrame(records, columns=self.by + ['column', 'k', 'n', 'min', 'max', 'levels'])
+
+    @classmethod
+    def from_frame(cls, frame):
+        by = list(frame.columns[:list(frame.columns).index('column')])
+        columns = list(dict.fromkeys(frame['column']))
+        accumulator = cls(by, columns, int(frame['k'].iloc[0]) if len(frame) else DEFAULT_K)
+        for record in frame.to_dict('records'):
+            key = tuple(record[column] for column in by)
+            accumulator._group_sketches(key)[record['column']] = QuantileSketch.from_record(record)
+        return accumulator
+
+    def save(self, path=SKETCHES_PATH, trips_path=None):
+        """
+        Write the sketches as Parquet (see trip_store.write_derived)
+
+        Args:
+            path: Output Parquet path
+            trips_path: Cleaned trips the sketches cover, recorded so
+                load_sketches() can tell when they are stale
+
+        Returns:
+            int: File size in bytes
+        """
+        return trip_store.write_derived(self.to_frame(), path, trips_path)
+
+    @classmethod
+    def load(cls, path=SKETCHES_PATH):
+        return cls.from_frame(pd.read_parquet(path))
+
+
+def trip_sketches():
+    """
+    Returns:
+        QuantileAccumulator: Empty sketches of the QUANTILE_COLUMNS per SKETCH_BY
+            group, as written by the ETL
+    """
+    return QuantileAccumulator(SKETCH_BY, QUANTILE_COLUMNS)
+
+
+def build_sketches(trips):
+    """
+    Sketch cleaned trips per (pickup date, hour)
+
+    Args:
+        trips: Cleaned trips with the SOURCE_COLUMNS
+
+    Returns:
+        QuantileAccumulator: As returned by trip_sketches(), updated with trips
+    """
+    frame = trips[QUANTILE_COLUMNS + ['hour', 'day_of_week']].assign(
+        pickup_date=trips['tpep_pickup_datetime'].dt.floor('D'))
+    return trip_sketches().update(frame)
+
+
+def load_sketches(path=SKETCHES_PATH, trips_path='cleaned_trips.parquet'):
+    """
+    Read the sketches, building and saving them from the cleaned trips first if
+    the file does not exist yet or was built from another version of them
+
+    Returns:
+        QuantileAccumulator: Sketches per SKETCH_BY group
+    """
+    if not trip_store.is_current(path, trips_path):
+        sketches = build_sketches(trip_store.read_trips(trips_path, columns=SOURCE_COLUMNS))
+        sketches.save(path, trips_path)
+        return sketches
+    return QuantileAccumulator.load(path)
+
+
+def print_quantiles(sketches, quantiles=QUANTILES):
+    """
+    Print one line of quantiles per sketched column
+
+    Args:
+        sketches: QuantileAccumulator (rolled up to one overall group)
+    """
+    row = sketches.rollup().result(quantiles).iloc[0]
+    print(f"{'':<20}" + "".join(f"{_label(q):>12}" for q in quantiles))
+    for column in sketches.columns:
+        print(f"{column:.<20}" + "".join(f"{row[f'{column}_{_label(q)}']:>12,.2f}" for q in quantiles))
+
+
+def _sketch_file(path, start, end):
+    return build_sketches(trip_store.read_trips(path, start, end, columns=SOURCE_COLUMNS))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sketch fare, duration and tip distributions of cleaned trips")
+    parser.add_argument('data', nargs='*', default=['cleaned_trips.parquet'],
+                        help="Cleaned trip files or partitioned dataset directories")
+    parser.add_argument('--workers', type=int, default=1, help="Sketch the files in this many processes")
+    parser.add_argument('--state', default=None, help="Saved sketches to merge the files into")
+    parser.add_argument('--output', default=SKETCHES_PATH, help="Sketch Parquet path")
+    parser.add_argument('--start', default=None, help="Only include pickups at or after this time")
+    parser.add_argument('--end', default=None, help="Only include pickups before this time")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SKETCHING TRIP DISTRIBUTIONS")
+    print("=" * 60)
+
+    began = time.perf_counter()
+    tasks = [(path, args.start, args.end) for path in args.data]
+    if args.workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            sketches = kpi_accumulators.fold_states(pool.map(_sketch_file, *zip(*tasks)), trip_sketches)
+    else:
+        sketches = kpi_accumulators.fold_states((_sketch_file(*task) for task in tasks), trip_sketches)
+    if args.state:
+        sketches.merge(QuantileAccumulator.load(args.state))
+        print(f"✓ Merged saved sketches: {args.state}")
+    # Only a single whole file is recorded as the source load_sketches() checks
+    whole_file = len(args.data) == 1 and not (args.state or args.start or args.end)
+    size = sketches.save(args.output, args.data[0] if whole_file else None)
+    print(f"✓ {len(args.data)} file(s) sketched in {time.perf_counter() - began:.2f}s")
+    print(f"✓ Saved: {args.output} ({size / 1024:.1f} KB)")
+
+    print("\n📊 Percentiles")
+    print("-" * 60)
+    print_quantiles(sketches)
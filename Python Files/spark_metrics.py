@@ -0,0 +1,269 @@
+"""
+Per-job and per-stage Spark metrics, collected automatically.
+
+collect_metrics() reads the application's jobs and stages from the Spark UI's
+REST API (/api/v1/applications/<id>/jobs and /stages) while the session is
+still alive and returns a JSON-serializable report: task counts, executor run
+and CPU time, GC time, input, output and shuffle bytes and spill per stage,
+with totals overall and per job group. Without a UI (spark.ui.enabled=false) it
+falls back to the status tracker, which only knows job/stage/task counts.
+
+diff_reports() compares two reports and flags regressions such as extra jobs
+or input scans, new spill, or more shuffle bytes or executor time than the
+tolerance allows. `python spark_metrics.py before.json after.json` prints the
+diff and exits non-zero when something regressed.
+"""
+
+import pandas as pd
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+from datetime import datetime
+
+# REST StageData field -> report field
+STAGE_METRICS = {
+    'numTasks': 'num_tasks',
+    'executorRunTime': 'executor_run_time_ms',
+    'executorCpuTime': 'executor_cpu_time_ms',
+    'jvmGcTime': 'gc_time_ms',
+    'inputBytes': 'input_bytes',
+    'inputRecords': 'input_records',
+    'outputBytes': 'output_bytes',
+    'shuffleReadBytes': 'shuffle_read_bytes',
+    'shuffleWriteBytes': 'shuffle_write_bytes',
+    'memoryBytesSpilled': 'memory_spilled_bytes',
+    'diskBytesSpilled': 'disk_spilled_bytes'
+}
+
+TOTAL_FIELDS = ['jobs', 'stages', 'scans'] + list(STAGE_METRICS.values())
+
+# Any increase in these counts is a regression (a new job, stage or input scan)
+COUNT_FIELDS = ['jobs', 'stages', 'scans']
+# Going from zero to non-zero is a regression regardless of tolerance
+SPILL_FIELDS = ['memory_spilled_bytes', 'disk_spilled_bytes']
+# Compared with the relative tolerance (task counts follow partitioning and are
+# informational only)
+TOLERANCE_FIELDS = ['executor_run_time_ms', 'executor_cpu_time_ms', 'gc_time_ms', 'input_bytes',
+                    'output_bytes', 'shuffle_read_bytes', 'shuffle_write_bytes'] + SPILL_FIELDS
+
+# Job groups set through set_job_group (the status tracker cannot list them)
+_job_groups = []
+
+
+def _get_json(url, timeout=10):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.load(response)
+
+
+def _wait_until_idle(sc, timeout=30):
+    # The UI store is updated asynchronously from the listener bus; wait for
+    # running stages to finish and give the last events a moment to land
+    deadline = time.time() + timeout
+    while sc.statusTracker().getActiveStageIds() and time.time() < deadline:
+        time.sleep(0.2)
+    time.sleep(0.5)
+
+
+def _from_rest(sc):
+    base = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}"
+    jobs = [
+        {
+            'job_id': job['jobId'],
+            'group': job.get('jobGroup'),
+            'name': job.get('name'),
+            'status': job.get('status'),
+            'stage_ids': job.get('stageIds', []),
+            'num_tasks': job.get('numTasks', 0)
+        }
+        for job in _get_json(f"{base}/jobs")
+    ]
+
+    group_of_stage = {stage_id: job['group'] for job in jobs for stage_id in job['stage_ids']}
+    stages = []
+    for stage in _get_json(f"{base}/stages"):
+        record = {
+            'stage_id': stage['stageId'],
+            'attempt_id': stage.get('attemptId', 0),
+            'group': group_of_stage.get(stage['stageId']),
+            'name': stage.get('name'),
+            'status': stage.get('status')
+        }
+        for source, target in STAGE_METRICS.items():
+            record[target] = stage.get(source) or 0
+        # The REST API reports CPU time in nanoseconds
+        record['executor_cpu_time_ms'] = record['executor_cpu_time_ms'] // 1_000_000
+        stages.append(record)
+    return jobs, stages
+
+
+def _from_status_tracker(sc):
+    tracker = sc.statusTracker()
+    jobs, stages = [], []
+    for group in [None] + _job_groups:
+        for job_id in tracker.getJobIdsForGroup(group):
+            info = tracker.getJobInfo(job_id)
+            if info is None:
+                continue
+            jobs.append({'job_id': job_id, 'group': group, 'name': None, 'status': info.status,
+                         'stage_ids': list(info.stageIds), 'num_tasks': None})
+            for stage_id in info.stageIds:
+                stage = tracker.getStageInfo(stage_id)
+                record = dict.fromkeys(STAGE_METRICS.values(), 0)
+                record.update({'stage_id': stage_id, 'attempt_id': 0, 'group': group,
+                               'name': stage.name if stage else None, 'status': None,
+                               'num_tasks': stage.numTasks if stage else 0})
+                stages.append(record)
+    return jobs, stages
+
+
+def set_job_group(spark, group, description=None):
+    """
+    Attribute the following Spark jobs to a named group in the report
+
+    Args:
+        spark: SparkSession
+        group: Group name (e.g. the pipeline stage)
+        description: Shown in the Spark UI
+    """
+    spark.sparkContext.setJobGroup(group, description or group)
+    if group not in _job_groups:
+        _job_groups.append(group)
+
+
+def _totals(jobs, stages):
+    completed = [stage for stage in stages if stage['status'] in ('COMPLETE', None)]
+    totals = {'jobs': len(jobs), 'stages': len(completed),
+              'scans': sum(1 for stage in completed if stage['input_bytes'] > 0)}
+    for field in STAGE_METRICS.values():
+        totals[field] = sum(stage[field] for stage in completed)
+    return totals
+
+
+def collect_metrics(spark):
+    """
+    Collect job and stage metrics of the running application
+
+    Args:
+        spark: SparkSession (call before spark.stop())
+
+    Returns:
+        dict: Report with 'jobs', 'stages', 'totals' and 'by_group' sections
+    """
+    sc = spark.sparkContext
+    _wait_until_idle(sc)
+
+    source = 'rest'
+    try:
+        if not sc.uiWebUrl:
+            raise OSError("Spark UI disabled")
+        jobs, stages = _from_rest(sc)
+    except OSError:
+        source = 'status_tracker'
+        jobs, stages = _from_status_tracker(sc)
+
+    groups = sorted({job['group'] for job in jobs}, key=lambda group: (group is None, group or ''))
+    return {
+        'application_id': sc.applicationId,
+        'app_name': sc.appName,
+        'collected_at': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+        'totals': _totals(jobs, stages),
+        'by_group': {
+            str(group): _totals([job for job in jobs if job['group'] == group],
+                                [stage for stage in stages if stage['group'] == group])
+            for group in groups
+        },
+        'jobs': jobs,
+        'stages': stages
+    }
+
+
+def write_report(report, path):
+    """
+    Save a report as JSON
+
+    Args:
+        report: Dict returned by collect_metrics
+        path: Output path
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def diff_reports(before, after, tolerance=0.2):
+    """
+    Compare two reports overall and per job group
+
+    Args:
+        before: Baseline report (dict)
+        after: New report (dict)
+        tolerance: Allowed relative increase of times and bytes (0.2 = 20%)
+
+    Returns:
+        DataFrame: scope, metric, before, after, change_pct and regression flag
+            for every metric that changed
+    """
+    scopes = [('total', before['totals'], after['totals'])]
+    for group in sorted(set(before['by_group']) | set(after['by_group'])):
+        scopes.append((group, before['by_group'].get(group, {}), after['by_group'].get(group, {})))
+
+    rows = []
+    for scope, old, new in scopes:
+        for metric in TOTAL_FIELDS:
+            old_value, new_value = old.get(metric, 0), new.get(metric, 0)
+            if old_value == new_value:
+                continue
+            if metric in COUNT_FIELDS:
+                regression = new_value > old_value
+            elif metric in SPILL_FIELDS and old_value == 0:
+                regression = True
+            else:
+                # A metric that was zero (e.g. a new job group) is covered by the count fields
+                regression = metric in TOLERANCE_FIELDS and 0 < old_value * (1 + tolerance) < new_value
+            rows.append({
+                'scope': scope,
+                'metric': metric,
+                'before': old_value,
+                'after': new_value,
+                'change_pct': (new_value / old_value - 1) * 100 if old_value else None,
+                'regression': regression
+            })
+    return pd.DataFrame(rows, columns=['scope', 'metric', 'before', 'after', 'change_pct', 'regression'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff two Spark metrics reports and flag regressions")
+    parser.add_argument('before', help="Baseline report (JSON)")
+    parser.add_argument('after', help="New report (JSON)")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="Allowed relative increase of times/bytes (default 0.2 = 20%%)")
+    args = parser.parse_args()
+
+    diff = diff_reports(load_report(args.before), load_report(args.after), args.tolerance)
+
+    print("=" * 60)
+    print("SPARK METRICS DIFF")
+    print("=" * 60)
+    if diff.empty:
+        print("\n✅ No metric changed")
+        sys.exit(0)
+
+    print("\n" + diff.to_string(index=False, float_format=lambda v: f"{v:,.1f}"))
+    regressions = diff[diff['regression']]
+    if len(regressions):
+        print(f"\n❌ {len(regressions)} regression(s):")
+        for row in regressions.itertuples():
+            print(f"  [{row.scope}] {row.metric}: {row.before:,} → {row.after:,}")
+        sys.exit(1)
+    print("\n✅ No regressions")
@@ -0,0 +1,93 @@
+"""
+Declared Spark schema for NYC yellow-taxi trip CSVs (2015 layout).
+
+Reading with TRIP_SCHEMA instead of inferSchema=True saves Spark a full pass over
+the file just to guess column types. Column types mirror trip_schema.CSV_DTYPES
+at Spark's narrowest convenient widths; timestamps are parsed with
+TIMESTAMP_FORMAT while the file is read.
+"""
+
+from pyspark.sql import functions as F
+from pyspark.sql.types import (
+    DoubleType, IntegerType, StringType, StructField, StructType, TimestampType
+)
+
+TIMESTAMP_FORMAT = 'yyyy-MM-dd HH:mm:ss'
+
+CORRUPT_RECORD_COLUMN = '_corrupt_record'
+
+TRIP_SCHEMA = StructType([
+    StructField('VendorID', IntegerType()),
+    StructField('tpep_pickup_datetime', TimestampType()),
+    StructField('tpep_dropoff_datetime', TimestampType()),
+    StructField('passenger_count', IntegerType()),
+    StructField('trip_distance', DoubleType()),
+    StructField('pickup_longitude', DoubleType()),
+    StructField('pickup_latitude', DoubleType()),
+    StructField('RateCodeID', IntegerType()),
+    StructField('store_and_fwd_flag', StringType()),
+    StructField('dropoff_longitude', DoubleType()),
+    StructField('dropoff_latitude', DoubleType()),
+    StructField('payment_type', IntegerType()),
+    StructField('fare_amount', DoubleType()),
+    StructField('extra', DoubleType()),
+    StructField('mta_tax', DoubleType()),
+    StructField('tip_amount', DoubleType()),
+    StructField('tolls_amount', DoubleType()),
+    StructField('improvement_surcharge', DoubleType()),
+    StructField('total_amount', DoubleType())
+])
+
+
+def read_trips_csv(spark, path, validate=False):
+    """
+    Read raw trip CSV(s) with the declared schema
+
+    Args:
+        spark: SparkSession
+        path: CSV file, directory or glob
+        validate: Keep the raw text of rows that do not match the schema in a
+            CORRUPT_RECORD_COLUMN column (see report_schema_violations). Without
+            it, unparseable fields are read as NULL, which the quality rules
+            count as violations.
+
+    Returns:
+        Spark DataFrame with the TRIP_SCHEMA columns (plus the corrupt-record
+        column when validating)
+    """
+    schema = TRIP_SCHEMA
+    if validate:
+        schema = StructType(TRIP_SCHEMA.fields + [StructField(CORRUPT_RECORD_COLUMN, StringType())])
+
+    return spark.read.csv(
+        path,
+        schema=schema,
+        header=True,
+        timestampFormat=TIMESTAMP_FORMAT,
+        mode='PERMISSIVE',
+        columnNameOfCorruptRecord=CORRUPT_RECORD_COLUMN
+    )
+
+
+def report_schema_violations(df, samples=5):
+    """
+    Count and print rows that did not match the schema
+
+    Spark refuses queries on a raw CSV that reference only the corrupt-record
+    column, so df must be cached (read_trips_csv(..., validate=True).cache()).
+
+    Args:
+        df: DataFrame from read_trips_csv(..., validate=True), cached
+        samples: Number of offending raw lines to print
+
+    Returns:
+        int: Number of rows that did not match the schema
+    """
+    bad_rows = df.filter(F.col(CORRUPT_RECORD_COLUMN).isNotNull())
+    violations = bad_rows.count()
+
+    print(f"\nSchema validation: {violations:,} row(s) did not match the declared schema")
+    for row in bad_rows.select(CORRUPT_RECORD_COLUMN).limit(samples).collect():
+        print(f"  ✗ {row[CORRUPT_RECORD_COLUMN]}")
+
+    return violations
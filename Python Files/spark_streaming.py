@@ -0,0 +1,243 @@
+"""
+Structured Streaming mode for trip files dropped into a landing directory.
+
+New CSV (or Parquet) files are picked up as they land, cleaned and enriched
+with the same transforms as the batch job, and aggregated into KPI cells: one
+row per (pickup hour, vendor) with trip count and revenue/distance/fare sums.
+Cells are event-time windows under a watermark, so Spark only keeps state for
+recent hours. Each micro-batch upserts its changed cells into a small Parquet
+table and rolls the hourly, vendor and day-of-week KPI tables up from it, so
+the tables are current within seconds of a file landing and history is never
+reprocessed. Progress (processed files, window state) lives in the checkpoint
+directory; restarting resumes where the previous run stopped.
+
+Rows arriving later than the watermark behind the newest pickup seen are
+dropped, so backfills of old months need a fresh checkpoint or a wider
+--watermark.
+"""
+
+import pandas as pd
+from pyspark.sql import functions as F
+import argparse
+import os
+
+import pyspark_etl
+import spark_schema
+import spark_transforms
+
+CELLS_FILE = 'trip_kpi_cells.parquet'
+CELL_KEYS = ['window_start', 'VendorID']
+CELL_SUMS = ['total_trips', 'revenue_sum', 'distance_sum', 'fare_sum', 'fare_per_mile_sum']
+
+
+def read_landing_stream(spark, landing_dir, file_format='csv', max_files_per_trigger=None):
+    """
+    Stream raw trip files from a landing directory
+
+    Args:
+        spark: SparkSession
+        landing_dir: Directory that new files are moved into (write elsewhere
+            and move, so Spark never sees a partially written file)
+        file_format: 'csv' or 'parquet' (raw trip columns)
+        max_files_per_trigger: Cap on files per micro-batch, or None
+
+    Returns:
+        Streaming DataFrame with the TRIP_SCHEMA columns
+    """
+    reader = spark.readStream.schema(spark_schema.TRIP_SCHEMA)
+    if max_files_per_trigger:
+        reader = reader.option('maxFilesPerTrigger', max_files_per_trigger)
+    if file_format == 'parquet':
+        return reader.parquet(landing_dir)
+    return reader \
+        .option('header', True) \
+        .option('timestampFormat', spark_schema.TIMESTAMP_FORMAT) \
+        .option('mode', 'PERMISSIVE') \
+        .csv(landing_dir)
+
+
+def kpi_cells(stream, watermark='6 hours'):
+    """
+    Aggregate a raw trip stream into per-hour, per-vendor KPI cells
+
+    Args:
+        stream: Streaming DataFrame from read_landing_stream
+        watermark: How far behind the newest pickup a trip may arrive and
+            still be counted
+
+    Returns:
+        Streaming DataFrame with CELL_KEYS and CELL_SUMS columns
+    """
+    trips = spark_transforms.clean(stream)
+    return trips \
+        .withWatermark('tpep_pickup_datetime', watermark) \
+        .groupBy(F.window('tpep_pickup_datetime', '1 hour').alias('pickup_window'), 'VendorID') \
+        .agg(
+            F.count('*').alias('total_trips'),
+            F.sum('total_amount').alias('revenue_sum'),
+            F.sum('trip_distance').alias('distance_sum'),
+            F.sum('fare_amount').alias('fare_sum'),
+            F.sum('fare_per_mile').alias('fare_per_mile_sum')
+        ) \
+        .select(F.col('pickup_window.start').alias('window_start'), 'VendorID', *CELL_SUMS)
+
+
+def merge_cells(cells, updates):
+    """
+    Upsert updated cells (update mode carries each cell's full current value)
+
+    Args:
+        cells: Existing cells DataFrame (pandas), or None
+        updates: Changed cells from one micro-batch (pandas)
+
+    Returns:
+        DataFrame: Merged cells; replaying a batch gives the same result
+    """
+    if cells is None or cells.empty:
+        return updates.reset_index(drop=True)
+    merged = pd.concat([cells, updates], ignore_index=True)
+    return merged.drop_duplicates(CELL_KEYS, keep='last').sort_values(CELL_KEYS, ignore_index=True)
+
+
+def rollup_kpis(cells):
+    """
+    Roll the hourly, vendor and day-of-week KPI tables up from the cells
+
+    Args:
+        cells: Cells DataFrame (pandas)
+
+    Returns:
+        dict: 'hourly', 'vendor' and 'day_of_week' DataFrames with the batch
+            job's columns (day_of_week is 0=Monday)
+    """
+    cells = cells.assign(
+        hour=cells['window_start'].dt.hour,
+        day_of_week=cells['window_start'].dt.dayofweek
+    )
+
+    def family(key, columns):
+        sums = cells.groupby(key)[CELL_SUMS].sum()
+        table = pd.DataFrame({
+            'total_trips': sums['total_trips'],
+            'total_revenue': sums['revenue_sum'].round(2),
+            'avg_distance': (sums['distance_sum'] / sums['total_trips']).round(2),
+            'avg_fare': (sums['fare_sum'] / sums['total_trips']).round(2),
+            'avg_fare_per_mile': (sums['fare_per_mile_sum'] / sums['total_trips']).round(2)
+        }).reset_index()
+        return table[columns]
+
+    return {
+        'hourly': family('hour', spark_transforms.HOURLY_COLUMNS),
+        'vendor': family('VendorID', spark_transforms.VENDOR_COLUMNS).sort_values(
+            'total_revenue', ascending=False, ignore_index=True),
+        'day_of_week': family('day_of_week', spark_transforms.DOW_COLUMNS)
+    }
+
+
+def _replace(df, path, writer):
+    # Write next to the target and rename, so dashboards never read a partial file
+    partial = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+    writer(df, partial)
+    os.replace(partial, path)
+
+
+def batch_writer(output_dir):
+    """
+    Build the foreachBatch handler that merges cells and rewrites the KPI tables
+
+    Args:
+        output_dir: Directory for the cells table and the *_kpis_stream files
+
+    Returns:
+        callable: (batch_df, batch_id) handler
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cells_path = os.path.join(output_dir, CELLS_FILE)
+
+    def write_batch(batch_df, batch_id):
+        # Only cells touched by this micro-batch reach the driver
+        updates = batch_df.toPandas()
+        if updates.empty:
+            return
+        cells = pd.read_parquet(cells_path) if os.path.exists(cells_path) else None
+        cells = merge_cells(cells, updates)
+        _replace(cells, cells_path, lambda df, path: df.to_parquet(path, index=False))
+
+        for name, table in rollup_kpis(cells).items():
+            base = os.path.join(output_dir, f"{'dow' if name == 'day_of_week' else name}_kpis_stream")
+            _replace(table, base + '.csv', lambda df, path: df.to_csv(path, index=False))
+            _replace(table, base + '.parquet', lambda df, path: df.to_parquet(path, index=False))
+
+        print(f"✓ Batch {batch_id}: {len(updates):,} cells updated, "
+              f"{int(cells['total_trips'].sum()):,} trips in {len(cells):,} cells")
+
+    return write_batch
+
+
+def start_stream(spark, landing_dir, output_dir='output/streaming', checkpoint_dir='output/checkpoints/trip_kpis',
+                 file_format='csv', trigger_seconds=5, watermark='6 hours', max_files_per_trigger=None,
+                 available_now=False):
+    """
+    Start the streaming KPI query
+
+    Args:
+        spark: SparkSession
+        landing_dir: Directory watched for new trip files
+        output_dir: Directory for the cells table and KPI files
+        checkpoint_dir: Local checkpoint directory (offsets, processed files,
+            window state)
+        file_format: 'csv' or 'parquet'
+        trigger_seconds: Micro-batch interval
+        watermark: Allowed lateness of pickups (see kpi_cells)
+        max_files_per_trigger: Cap on files per micro-batch, or None
+        available_now: Process the files already present, then stop
+
+    Returns:
+        StreamingQuery
+    """
+    cells = kpi_cells(read_landing_stream(spark, landing_dir, file_format, max_files_per_trigger), watermark)
+    writer = cells.writeStream \
+        .queryName('trip_kpis') \
+        .outputMode('update') \
+        .option('checkpointLocation', checkpoint_dir) \
+        .foreachBatch(batch_writer(output_dir))
+    if available_now:
+        writer = writer.trigger(availableNow=True)
+    else:
+        writer = writer.trigger(processingTime=f"{trigger_seconds} seconds")
+    return writer.start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming NYC taxi KPIs from a landing directory")
+    parser.add_argument('landing', nargs='?', default='landing', help="Directory watched for new trip files")
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help="Format of the landed files")
+    parser.add_argument('--output', default='output/streaming', help="Directory for the KPI tables")
+    parser.add_argument('--checkpoint', default='output/checkpoints/trip_kpis', help="Checkpoint directory")
+    parser.add_argument('--trigger-seconds', type=int, default=5, help="Micro-batch interval")
+    parser.add_argument('--watermark', default='6 hours', help="Allowed lateness of pickups")
+    parser.add_argument('--max-files-per-trigger', type=int, default=None, help="Cap on files per micro-batch")
+    parser.add_argument('--available-now', action='store_true',
+                        help="Process the files already landed, then exit")
+    pyspark_etl.add_session_arguments(parser)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("PYSPARK STREAMING KPIs - NYC TAXI DATA")
+    print("=" * 70)
+
+    os.makedirs(args.landing, exist_ok=True)
+    # Shuffle partitions are fixed in the checkpoint by the first run
+    config = pyspark_etl.apply_session_arguments({**pyspark_etl.DEFAULT_CONFIG, 'input': args.landing}, args)
+    spark = pyspark_etl.create_spark_session(config, app_name="NYC_Taxi_Streaming_KPIs")
+
+    query = start_stream(spark, args.landing, args.output, args.checkpoint, args.format, args.trigger_seconds,
+                         args.watermark, args.max_files_per_trigger, args.available_now)
+    print(f"\n👀 Watching {args.landing}/ for new {args.format} files "
+          f"(checkpoint: {args.checkpoint}); KPI tables in {args.output}/")
+    try:
+        query.awaitTermination()
+    except KeyboardInterrupt:
+        print("\nStopping stream...")
+        query.stop()
+    spark.stop()
@@ -0,0 +1,285 @@
+"""
+Spark transformations shared by the Spark ETL and its benchmarks.
+
+flag_and_enrich() tags every raw row with its quality bitmask and validity and
+adds the derived features. single_pass_kpis() then computes the rejection
+counts and the hourly, vendor and day-of-week KPIs with one GROUPING SETS
+aggregation, so the CSV is parsed and the lineage evaluated by a single Spark
+job instead of one job per count and per KPI family. The same pass computes
+approximate quantiles (median/p90/p99) and approximate distinct counts per hour
+and day of week with fixed-size sketches. add_lookup_labels() joins the bundled
+vendor, rate code and payment type lookups with broadcast joins, so labelling
+adds no shuffle. write_cleaned_trips() writes the valid trips as a
+date-partitioned Parquet dataset that trip_store.read_trips() loads like the
+pandas ETL output.
+"""
+
+from pyspark.sql import functions as F
+
+import quality_rules
+import trip_lookups
+
+KPI_VIEW = 'trips_flagged'
+
+# Quantile KPIs: percentile_approx keeps a bounded-size sketch per group, with
+# rank error of at most 1/QUANTILE_ACCURACY of the group's rows
+QUANTILE_METRICS = ['fare_amount', 'trip_distance', 'trip_duration', 'tip_percentage']
+QUANTILES = [0.5, 0.9, 0.99]
+QUANTILE_ACCURACY = 10_000
+QUANTILE_COLUMNS = [f"{metric}_p{round(q * 100)}" for metric in QUANTILE_METRICS for q in QUANTILES]
+DISTINCT_COLUMNS = ['distinct_pickup_cells', 'active_days']
+
+_QUANTILE_AGGREGATES = ''.join(
+    f"    percentile_approx({metric}, array({', '.join(map(str, QUANTILES))}), {QUANTILE_ACCURACY}) "
+    f"FILTER (WHERE is_valid) AS {metric}_quantiles,\n"
+    for metric in QUANTILE_METRICS
+)
+
+# Aggregates over valid rows only; the quality set counts every row. Pickup
+# cells are ~100 m grid squares (coordinates rounded to 3 decimals).
+KPI_QUERY = f"""
+SELECT
+    CASE grouping_id(quality_mask, hour, VendorID, day_of_week)
+        WHEN 7 THEN 'quality'
+        WHEN 11 THEN 'hourly'
+        WHEN 13 THEN 'vendor'
+        ELSE 'day_of_week'
+    END AS kpi_family,
+    quality_mask, hour, VendorID, day_of_week,
+    count(*) AS row_count,
+    count(*) FILTER (WHERE is_valid) AS total_trips,
+    round(sum(total_amount) FILTER (WHERE is_valid), 2) AS total_revenue,
+    round(avg(trip_distance) FILTER (WHERE is_valid), 2) AS avg_distance,
+    round(avg(fare_amount) FILTER (WHERE is_valid), 2) AS avg_fare,
+    round(avg(fare_per_mile) FILTER (WHERE is_valid), 2) AS avg_fare_per_mile,
+{_QUANTILE_AGGREGATES}    approx_count_distinct(concat_ws(',', round(pickup_longitude, 3), round(pickup_latitude, 3)))
+        FILTER (WHERE is_valid) AS distinct_pickup_cells,
+    approx_count_distinct(to_date(tpep_pickup_datetime)) FILTER (WHERE is_valid) AS active_days
+FROM {KPI_VIEW}
+GROUP BY GROUPING SETS ((quality_mask), (hour), (VendorID), (day_of_week))
+"""
+
+HOURLY_COLUMNS = ['hour', 'total_trips', 'total_revenue', 'avg_distance', 'avg_fare', 'avg_fare_per_mile']
+VENDOR_COLUMNS = ['VendorID', 'total_trips', 'total_revenue', 'avg_fare']
+DOW_COLUMNS = ['day_of_week', 'total_trips', 'total_revenue', 'avg_fare']
+HOURLY_QUANTILE_COLUMNS = ['hour', 'total_trips'] + QUANTILE_COLUMNS + DISTINCT_COLUMNS
+DOW_QUANTILE_COLUMNS = ['day_of_week', 'total_trips'] + QUANTILE_COLUMNS + DISTINCT_COLUMNS
+
+# Column order and Spark types of the cleaned trips, matching
+# trip_schema.CLEANED_SCHEMA (TIMESTAMP_NTZ is written as a plain, non-UTC
+# Parquet timestamp, so pandas reads back the original wall-clock times)
+CLEANED_SPARK_TYPES = [
+    ('VendorID', 'tinyint'),
+    ('tpep_pickup_datetime', 'timestamp_ntz'),
+    ('tpep_dropoff_datetime', 'timestamp_ntz'),
+    ('passenger_count', 'tinyint'),
+    ('trip_distance', 'float'),
+    ('pickup_longitude', 'float'),
+    ('pickup_latitude', 'float'),
+    ('RateCodeID', 'tinyint'),
+    ('store_and_fwd_flag', 'string'),
+    ('dropoff_longitude', 'float'),
+    ('dropoff_latitude', 'float'),
+    ('payment_type', 'tinyint'),
+    ('fare_amount', 'double'),
+    ('extra', 'double'),
+    ('mta_tax', 'double'),
+    ('tip_amount', 'double'),
+    ('tolls_amount', 'double'),
+    ('improvement_surcharge', 'double'),
+    ('total_amount', 'double'),
+    ('hour', 'tinyint'),
+    ('day_of_week', 'tinyint'),
+    ('day', 'tinyint'),
+    ('is_weekend', 'boolean'),
+    ('is_peak', 'boolean'),
+    ('trip_duration', 'float'),
+    ('fare_per_mile', 'float'),
+    ('tip_percentage', 'float')
+]
+# Appended when the trips went through add_lookup_labels
+LABEL_SPARK_TYPES = [(label, 'string') for label in trip_lookups.LABEL_COLUMNS]
+
+
+def add_features(df, valid=None):
+    """
+    Add the derived time and fare features
+
+    Args:
+        df: Spark DataFrame with timestamp pickup/dropoff columns
+        valid: Optional boolean column; the ratio features are only computed
+            where it is true (NULL elsewhere), so rows failing the cleaning
+            rules cannot divide by zero
+
+    Returns:
+        Spark DataFrame with hour, day_of_week (0=Monday, as in pandas), day,
+        is_weekend, is_peak, trip_duration, fare_per_mile and tip_percentage added
+    """
+    def guarded(expression):
+        return expression if valid is None else F.when(valid, expression)
+
+    return df \
+        .withColumn('hour', F.hour('tpep_pickup_datetime')) \
+        .withColumn('day_of_week', (F.dayofweek('tpep_pickup_datetime') + 5) % 7) \
+        .withColumn('day', F.dayofmonth('tpep_pickup_datetime')) \
+        .withColumn('is_weekend', F.col('day_of_week').isin([5, 6])) \
+        .withColumn('is_peak', F.col('hour').isin([7, 8, 17, 18, 19])) \
+        .withColumn('trip_duration',
+                    (F.unix_timestamp('tpep_dropoff_datetime') - F.unix_timestamp('tpep_pickup_datetime')) / 60) \
+        .withColumn('fare_per_mile', guarded(F.col('fare_amount') / F.col('trip_distance'))) \
+        .withColumn('tip_percentage', guarded((F.col('tip_amount') / F.col('fare_amount')) * 100))
+
+
+def flag_and_enrich(df):
+    """
+    Tag every row with its quality bitmask and validity and add the features
+
+    Args:
+        df: Spark DataFrame with the raw trip columns
+
+    Returns:
+        Spark DataFrame with quality_mask, is_valid and the feature columns;
+        filter on is_valid for the cleaned, enriched trips
+    """
+    flagged = quality_rules.evaluate_rules_spark(df)
+    flagged = flagged.withColumn(
+        'is_valid', F.col('quality_mask').bitwiseAND(quality_rules.ENFORCED_MASK) == 0)
+    return add_features(flagged, valid=F.col('is_valid'))
+
+
+def valid_trips(flagged):
+    """
+    Keep the trips that pass every enforced quality rule and have a duration
+
+    Args:
+        flagged: DataFrame returned by flag_and_enrich
+
+    Returns:
+        Spark DataFrame of valid trips, same columns as flagged
+    """
+    return flagged.filter(F.col('is_valid') & F.col('trip_duration').isNotNull())
+
+
+def clean(df):
+    """
+    Apply the ETL cleaning rules (quality_rules.QUALITY_RULES) and add features
+
+    Args:
+        df: Spark DataFrame with the raw trip columns
+
+    Returns:
+        Spark DataFrame of valid trips with the feature columns
+    """
+    return valid_trips(flag_and_enrich(df)).drop('quality_mask', 'is_valid')
+
+
+def add_lookup_labels(spark, df):
+    """
+    Add the vendor, rate code and payment type labels with broadcast joins
+
+    The lookups are read on the driver and shipped to the executors with the
+    plan, so each join is a map-side hash join: no shuffle of the trips and no
+    lookup files needed on the workers.
+
+    Args:
+        spark: SparkSession
+        df: Spark DataFrame with the VendorID, RateCodeID and payment_type codes
+
+    Returns:
+        Spark DataFrame with vendor_name, rate_code_name and payment_type_name
+        added (NULL for codes missing from the lookups)
+    """
+    for code_column in trip_lookups.LOOKUPS:
+        lookup = spark.createDataFrame(trip_lookups.load_lookup(code_column).astype({code_column: 'int32'}))
+        df = df.join(F.broadcast(lookup), on=code_column, how='left')
+    return df
+
+
+def single_pass_kpis(spark, flagged):
+    """
+    Compute quality counts and all KPI families in one Spark job
+
+    Args:
+        spark: SparkSession
+        flagged: DataFrame returned by flag_and_enrich
+
+    Returns:
+        dict: 'quality_counts' ({bitmask: rows}), 'initial_count',
+            'cleaned_count', pandas DataFrames 'hourly', 'vendor' and
+            'day_of_week' (the same columns as the per-family queries, plus
+            vendor_name in 'vendor'), and
+            'hourly_quantiles' / 'dow_quantiles' with the approximate
+            quantile and distinct-count KPIs
+    """
+    flagged.createOrReplaceTempView(KPI_VIEW)
+    result = spark.sql(KPI_QUERY).toPandas()
+
+    # Split each [p50, p90, p99] array into one column per quantile
+    for metric in QUANTILE_METRICS:
+        arrays = result.pop(f"{metric}_quantiles")
+        for i, q in enumerate(QUANTILES):
+            result[f"{metric}_p{round(q * 100)}"] = [
+                values[i] if values is not None else None for values in arrays
+            ]
+
+    quality = result[result['kpi_family'] == 'quality']
+    # Groups holding only rejected rows (e.g. a NULL hour) have no KPI values
+    kpis = result[(result['kpi_family'] != 'quality') & (result['total_trips'] > 0)]
+
+    def family(name, columns, sort_by, ascending=True):
+        table = kpis.loc[kpis['kpi_family'] == name, columns].dropna(subset=[columns[0]])
+        table = table.astype({columns[0]: 'int64'})
+        return table.sort_values(sort_by, ascending=ascending, ignore_index=True)
+
+    vendor = family('vendor', VENDOR_COLUMNS, 'total_revenue', ascending=False)
+    vendor.insert(1, 'vendor_name', vendor['VendorID'].map(trip_lookups.label_map('VendorID')))
+
+    return {
+        'quality_counts': {int(mask): int(rows) for mask, rows in zip(quality['quality_mask'], quality['row_count'])},
+        'initial_count': int(quality['row_count'].sum()),
+        'cleaned_count': int(quality['total_trips'].sum()),
+        'hourly': family('hourly', HOURLY_COLUMNS, 'hour'),
+        'vendor': vendor,
+        'day_of_week': family('day_of_week', DOW_COLUMNS, 'day_of_week'),
+        'hourly_quantiles': family('hourly', HOURLY_QUANTILE_COLUMNS, 'hour'),
+        'dow_quantiles': family('day_of_week', DOW_QUANTILE_COLUMNS, 'day_of_week')
+    }
+
+
+def to_cleaned_trips(flagged):
+    """
+    Select the valid trips with the column order and types of the pandas output
+
+    Args:
+        flagged: DataFrame returned by flag_and_enrich
+
+    Returns:
+        Spark DataFrame with the CLEANED_SPARK_TYPES columns, followed by the
+        LABEL_SPARK_TYPES columns when flagged carries them
+    """
+    trips = valid_trips(flagged)
+    columns = CLEANED_SPARK_TYPES + [column for column in LABEL_SPARK_TYPES if column[0] in flagged.columns]
+    return trips.select([F.col(name).cast(spark_type).alias(name) for name, spark_type in columns])
+
+
+def write_cleaned_trips(flagged, output_dir):
+    """
+    Write the valid, enriched trips as a pickup_date-partitioned Parquet dataset
+    with the distributed writer (one sorted file per date; dates present in
+    this run replace their existing partitions)
+
+    Args:
+        flagged: DataFrame returned by flag_and_enrich
+        output_dir: Dataset root directory
+    """
+    trips = to_cleaned_trips(flagged) \
+        .withColumn('pickup_date', F.date_format('tpep_pickup_datetime', 'yyyy-MM-dd'))
+
+    trips.repartition('pickup_date') \
+        .sortWithinPartitions('tpep_pickup_datetime') \
+        .write \
+        .mode('overwrite') \
+        .option('partitionOverwriteMode', 'dynamic') \
+        .option('compression', 'snappy') \
+        .partitionBy('pickup_date') \
+        .parquet(output_dir)
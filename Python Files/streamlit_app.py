@@ -3,9 +3,24 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from groq import Groq
+import os
 import sqlite3
 import time
 
+import quantile_sketches
+import trip_cube
+import trip_histograms
+import trip_lookups
+
+# Cleaned trips: Parquet file, partitioned dataset directory or Arrow IPC file (.arrow)
+TRIPS_PATH = os.environ.get('TRIPS_PATH', 'cleaned_trips.parquet')
+# Rollup cube behind the KPI cards and aggregate charts (built from TRIPS_PATH if missing)
+CUBE_PATH = os.environ.get('CUBE_PATH', trip_cube.CUBE_PATH)
+# Pre-binned fare and distance histograms (built from TRIPS_PATH if missing)
+HISTOGRAMS_PATH = os.environ.get('HISTOGRAMS_PATH', trip_histograms.HISTOGRAMS_PATH)
+# Fare, duration and tip quantile sketches per date and hour (built from TRIPS_PATH if missing)
+SKETCHES_PATH = os.environ.get('SKETCHES_PATH', quantile_sketches.SKETCHES_PATH)
+
 # Page config
 st.set_page_config(
     page_title="NYC Taxi Analytics Dashboard",
@@ -267,25 +282,59 @@ def get_db_connection():
 conn = get_db_connection()
 
 
-# Load data with caching
+@st.cache_resource
+def load_cube():
+    # A few tens of thousands of cells; every aggregate chart re-aggregates these
+    return trip_cube.load_cube(CUBE_PATH, TRIPS_PATH)
+
+
 @st.cache_data
-def load_data():
-    df = pd.read_parquet('cleaned_trips.parquet')
-    return df
+def load_full_period():
+    # First and last pickup date in the data; the default time window
+    pickup_dates = load_cube()['pickup_date']
+    return pickup_dates.min().date(), pickup_dates.max().date()
 
 
 @st.cache_data
-def load_kpis():
-    df = load_data()
-    return {
-        'total_trips': len(df),
-        'total_revenue': df['total_amount'].sum(),
-        'avg_fare': df['fare_amount'].mean(),
-        'avg_distance': df['trip_distance'].mean(),
-        'avg_tip_pct': df['tip_percentage'].mean(),
-        'peak_trips': df[df['is_peak']].shape[0],
-        'weekend_trips': df[df['is_weekend']].shape[0]
-    }
+def load_kpis(start=None, end=None):
+    return trip_cube.summary(load_cube(), start, end)
+
+
+@st.cache_resource
+def load_histograms():
+    # Per-date bin counts; no chart ever receives trip-level rows
+    return trip_histograms.load_histograms(HISTOGRAMS_PATH, TRIPS_PATH)
+
+
+@st.cache_data
+def load_histogram(column, scale, start=None, end=None):
+    return trip_histograms.histogram(load_histograms(), column, scale, start, end)
+
+
+@st.cache_resource
+def load_sketches():
+    return quantile_sketches.load_sketches(SKETCHES_PATH, TRIPS_PATH)
+
+
+@st.cache_data
+def load_quantiles(by=(), start=None, end=None):
+    # Sketches of the window merged per group of by (a tuple, so it can be a cache key)
+    return load_sketches().select(start, end).rollup(list(by)).result()
+
+
+def histogram_chart(hist, label, color, log_scale):
+    # Bars drawn from bin counts; log-spaced bins are drawn as a filled step line
+    # on a log axis, where bar widths would be distorted
+    if log_scale:
+        fig = go.Figure(go.Scatter(x=list(hist['bin_left']) + [hist['bin_right'].iloc[-1]],
+                                   y=list(hist['count']) + [hist['count'].iloc[-1]],
+                                   line_shape='hv', fill='tozeroy', line_color=color))
+        fig.update_xaxes(type='log')
+    else:
+        fig = go.Figure(go.Bar(x=hist['bin_center'], y=hist['count'],
+                               width=hist['bin_right'] - hist['bin_left'], marker_color=color))
+    fig.update_layout(template="plotly_dark", xaxis_title=label, yaxis_title='Trips', bargap=0)
+    return fig
 
 
 # Execute SQL query
@@ -349,6 +398,23 @@ with st.sidebar:
     </div>
     """, unsafe_allow_html=True)
 
+    st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
+    st.markdown("### 📅 Time Window")
+    full_period = load_full_period()
+    date_range = st.date_input(
+        "Pickup dates",
+        value=full_period,
+        min_value=full_period[0],
+        max_value=full_period[1],
+        label_visibility="collapsed"
+    )
+    # The full period loads everything; a narrower window is pushed down to the reader
+    if isinstance(date_range, (tuple, list)) and len(date_range) == 2 and tuple(date_range) != full_period:
+        window_start = pd.Timestamp(date_range[0])
+        window_end = pd.Timestamp(date_range[1]) + pd.Timedelta(days=1)
+    else:
+        window_start, window_end = None, None
+
     if page == "💾 SQL Query Lab":
         st.markdown('<div class="divider"></div>', unsafe_allow_html=True)
         st.markdown("### 📋 Table Schema")
@@ -364,8 +430,8 @@ with st.sidebar:
             """)
 
 # Load data
-df = load_data()
-kpis = load_kpis()
+cells = trip_cube.select(load_cube(), window_start, window_end)
+kpis = load_kpis(window_start, window_end)
 
 # PAGE 1: DASHBOARD
 if page == "📊 Dashboard":
@@ -408,7 +474,7 @@ if page == "📊 Dashboard":
 
     with col1:
         st.markdown("##### 📊 Hourly Demand Pattern")
-        hourly_trips = df.groupby('hour').size().reset_index(name='trips')
+        hourly_trips = trip_cube.rollup(cells, ['hour'], ['total_amount'])[['hour', 'trips']]
         fig = px.bar(hourly_trips, x='hour', y='trips',
                      title='',
                      labels={'hour': 'Hour of Day', 'trips': 'Number of Trips'},
@@ -425,7 +491,8 @@ if page == "📊 Dashboard":
 
     with col2:
         st.markdown("##### 💰 Daily Revenue Trend")
-        daily_revenue = df.groupby('day')['total_amount'].sum().reset_index()
+        daily_revenue = trip_cube.rollup(cells, ['day'], ['total_amount']).rename(
+            columns={'total_amount_sum': 'total_amount'})[['day', 'total_amount']]
         fig = px.area(daily_revenue, x='day', y='total_amount',
                       title='',
                       labels={'day': 'Day of Month', 'total_amount': 'Revenue ($)'},
@@ -445,7 +512,7 @@ if page == "📊 Dashboard":
 
     with col1:
         st.markdown("##### 🎯 Peak vs Off-Peak Distribution")
-        peak_data = df.groupby('is_peak').size().reset_index(name='trips')
+        peak_data = trip_cube.rollup(cells, ['is_peak'], ['total_amount'])[['is_peak', 'trips']]
         peak_data['period'] = peak_data['is_peak'].map({True: 'Peak Hours', False: 'Off-Peak'})
         fig = px.pie(peak_data, values='trips', names='period',
                      title='',
@@ -470,9 +537,9 @@ if page == "📊 Dashboard":
 
     with col2:
         st.markdown("##### 📅 Weekday vs Weekend Analysis")
-        dow_trips = df.groupby('day_of_week').size().reset_index(name='trips')
+        dow_trips = trip_cube.rollup(cells, ['day_of_week'], ['total_amount'])[['day_of_week', 'trips']]
         dow_trips['day_name'] = dow_trips['day_of_week'].map({
-            1: 'Sun', 2: 'Mon', 3: 'Tue', 4: 'Wed', 5: 'Thu', 6: 'Fri', 7: 'Sat'
+            0: 'Mon', 1: 'Tue', 2: 'Wed', 3: 'Thu', 4: 'Fri', 5: 'Sat', 6: 'Sun'
         })
         fig = px.bar(dow_trips, x='day_name', y='trips',
                      title='',
@@ -823,7 +890,7 @@ elif page == "📈 Deep Dive Analytics":
         with col1:
             # Heatmap
             st.markdown("##### 🔥 Demand Heatmap (Day vs Hour)")
-            pivot = df.groupby(['day_of_week', 'hour']).size().reset_index(name='trips')
+            pivot = trip_cube.rollup(cells, ['day_of_week', 'hour'], ['total_amount'])[['day_of_week', 'hour', 'trips']]
             pivot_table = pivot.pivot(index='day_of_week', columns='hour', values='trips')
 
             fig = px.imshow(pivot_table,
@@ -832,7 +899,7 @@ elif page == "📈 Deep Dive Analytics":
                             aspect="auto",
                             template="plotly_dark")
             fig.update_yaxes(tickvals=[0, 1, 2, 3, 4, 5, 6],
-                             ticktext=['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat'])
+                             ticktext=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
             fig.update_layout(
                 height=500,
                 plot_bgcolor='#1a1d29',
@@ -843,7 +910,8 @@ elif page == "📈 Deep Dive Analytics":
 
         with col2:
             st.markdown("##### 📊 Hourly Revenue Distribution")
-            hourly_rev = df.groupby('hour')['total_amount'].sum().reset_index()
+            hourly_rev = trip_cube.rollup(cells, ['hour'], ['total_amount']).rename(
+                columns={'total_amount_sum': 'total_amount'})[['hour', 'total_amount']]
             fig = px.area(hourly_rev, x='hour', y='total_amount',
                           labels={'hour': 'Hour', 'total_amount': 'Revenue ($)'},
                           color_discrete_sequence=['#636EFA'],
@@ -864,11 +932,10 @@ elif page == "📈 Deep Dive Analytics":
 
         with col1:
             st.markdown("##### 📊 Fare Distribution")
-            fig = px.histogram(df, x='fare_amount', nbins=50,
-                               range_x=[0, 50],
-                               labels={'fare_amount': 'Fare ($)'},
-                               color_discrete_sequence=['#00CC96'],
-                               template="plotly_dark")
+            log_fares = st.checkbox("Log-spaced bins", key='fare_log_bins')
+            scale = 'log' if log_fares else 'linear'
+            fig = histogram_chart(load_histogram('fare_amount', scale, window_start, window_end),
+                                  'Fare ($)', '#00CC96', log_fares)
             fig.update_layout(
                 height=500,
                 plot_bgcolor='#1a1d29',
@@ -880,7 +947,8 @@ elif page == "📈 Deep Dive Analytics":
 
         with col2:
             st.markdown("##### 💰 Tip % by Hour")
-            tip_by_hour = df.groupby('hour')['tip_percentage'].mean().reset_index()
+            tip_by_hour = trip_cube.rollup(cells, ['hour'], ['tip_percentage']).rename(
+                columns={'tip_percentage_mean': 'tip_percentage'})[['hour', 'tip_percentage']]
             fig = px.line(tip_by_hour, x='hour', y='tip_percentage',
                           markers=True,
                           labels={'hour': 'Hour', 'tip_percentage': 'Avg Tip %'},
@@ -895,6 +963,40 @@ elif page == "📈 Deep Dive Analytics":
             )
             st.plotly_chart(fig, use_container_width=True, theme=None)
 
+        st.markdown("##### 📐 Percentiles")
+        measure_names = {'fare_amount': 'Fare ($)', 'trip_duration': 'Duration (min)', 'tip_percentage': 'Tip %'}
+        labels = ['p50', 'p90', 'p99']
+        overall = load_quantiles((), window_start, window_end).iloc[0]
+        col1, col2 = st.columns([1, 2])
+
+        with col1:
+            st.dataframe(pd.DataFrame([[overall[f"{column}_{label}"] for label in labels] for column in measure_names],
+                                      index=list(measure_names.values()), columns=['Median', 'p90', 'p99']).round(2),
+                         use_container_width=True)
+            measure = st.selectbox("Measure", list(measure_names), format_func=measure_names.get)
+            by = st.radio("By", ['hour', 'day_of_week'], format_func=lambda g: g.replace('_', ' ').title(),
+                          horizontal=True)
+
+        with col2:
+            by_group = load_quantiles((by,), window_start, window_end)
+            if by == 'day_of_week':
+                by_group[by] = by_group[by].map(dict(enumerate(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])))
+            fig = px.line(by_group, x=by, y=[f"{measure}_{label}" for label in labels],
+                          markers=True,
+                          labels={by: by.replace('_', ' ').title(), 'value': measure_names[measure],
+                                  'variable': 'Percentile'},
+                          color_discrete_sequence=['#00CC96', '#FFA15A', '#EF553B'],
+                          template="plotly_dark")
+            fig.for_each_trace(lambda trace: trace.update(name=trace.name.rsplit('_', 1)[-1]))
+            fig.update_layout(
+                height=400,
+                plot_bgcolor='#1a1d29',
+                paper_bgcolor='#1a1d29',
+                font_color='white',
+                hovermode='x unified'
+            )
+            st.plotly_chart(fig, use_container_width=True, theme=None)
+
     with tab3:
         st.markdown("### 🚖 Trip Patterns")
 
@@ -902,11 +1004,10 @@ elif page == "📈 Deep Dive Analytics":
 
         with col1:
             st.markdown("##### 📏 Distance Distribution")
-            fig = px.histogram(df, x='trip_distance', nbins=50,
-                               range_x=[0, 20],
-                               labels={'trip_distance': 'Distance (miles)'},
-                               color_discrete_sequence=['#FFA15A'],
-                               template="plotly_dark")
+            log_distances = st.checkbox("Log-spaced bins", key='distance_log_bins')
+            scale = 'log' if log_distances else 'linear'
+            fig = histogram_chart(load_histogram('trip_distance', scale, window_start, window_end),
+                                  'Distance (miles)', '#FFA15A', log_distances)
             fig.update_layout(
                 height=500,
                 plot_bgcolor='#1a1d29',
@@ -918,7 +1019,7 @@ elif page == "📈 Deep Dive Analytics":
 
         with col2:
             st.markdown("##### 👥 Passenger Count Distribution")
-            passenger_dist = df['passenger_count'].value_counts().sort_index().reset_index()
+            passenger_dist = trip_cube.rollup(cells, ['passenger_count'], ['total_amount'])[['passenger_count', 'trips']]
             passenger_dist.columns = ['passengers', 'trips']
             fig = px.bar(passenger_dist, x='passengers', y='trips',
                          labels={'passengers': 'Number of Passengers', 'trips': 'Trips'},
@@ -937,12 +1038,13 @@ elif page == "📈 Deep Dive Analytics":
     with tab4:
         st.markdown("### 💳 Payment Analysis")
 
-        payment_stats = df.groupby('payment_type').agg({
-            'fare_amount': 'count',
-            'total_amount': 'sum',
-            'tip_percentage': 'mean'
-        }).reset_index()
+        payment_stats = trip_cube.rollup(cells, ['payment_type'], ['total_amount', 'tip_percentage'])[
+            ['payment_type', 'trips', 'total_amount_sum', 'tip_percentage_mean']]
         payment_stats.columns = ['payment_type', 'trips', 'revenue', 'avg_tip_pct']
+        # Show the payment names from the bundled lookup instead of the raw codes
+        payment_names = trip_lookups.label_map('payment_type')
+        payment_stats['payment_type'] = payment_stats['payment_type'].map(
+            lambda code: 'Missing' if pd.isna(code) else payment_names.get(code, f"Code {int(code)}"))
 
         col1, col2 = st.columns(2)
 
@@ -1109,4 +1211,4 @@ st.markdown("""
     <p style='font-size: 0.9rem; margin-bottom: 0.5rem;'>Built with Streamlit, PySpark & Groq AI</p>
     <p style='font-size: 0.8rem;'>January 2015 Dataset | Real-time Analytics | AI-Powered Insights</p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
\ No newline at end of file
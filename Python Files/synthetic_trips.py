@@ -0,0 +1,251 @@
+"""
+Deterministic synthetic NYC yellow-taxi trips (2015 CSV layout).
+
+Trips follow January 2015-like distributions: an hourly demand curve with
+evening peaks, log-normal distances, hour-dependent speeds, metered fares with
+the flat JFK rate, card-only tips, and pickups clustered around Midtown. A
+configurable fraction of rows is made dirty with one defect each (zero or too
+many passengers, zero or huge distances, negative or huge fares, negative tips,
+dropoff before pickup, 0/0 coordinates), so the quality rules have work to do.
+
+Rows are generated in fixed blocks, each seeded from (seed, block index), so a
+given seed always yields the same file regardless of how it is written, and
+files of 100M rows are written block by block in bounded memory.
+"""
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import argparse
+import os
+import time
+
+CSV_COLUMNS = [
+    'VendorID', 'tpep_pickup_datetime', 'tpep_dropoff_datetime', 'passenger_count',
+    'trip_distance', 'pickup_longitude', 'pickup_latitude', 'RateCodeID',
+    'store_and_fwd_flag', 'dropoff_longitude', 'dropoff_latitude', 'payment_type',
+    'fare_amount', 'extra', 'mta_tax', 'tip_amount', 'tolls_amount',
+    'improvement_surcharge', 'total_amount'
+]
+
+BLOCK_ROWS = 1_000_000
+
+# Share of trips starting in each hour (roughly January 2015)
+HOURLY_DEMAND = np.array([
+    3.6, 2.7, 2.0, 1.5, 1.1, 0.9, 2.0, 3.4, 4.2, 4.3, 4.1, 4.3,
+    4.6, 4.6, 4.8, 4.7, 4.1, 4.9, 6.0, 6.1, 5.5, 5.4, 5.3, 4.6
+])
+HOURLY_DEMAND = HOURLY_DEMAND / HOURLY_DEMAND.sum()
+
+# Typical door-to-door speed (mph) by pickup hour
+HOURLY_SPEED_MPH = np.array([
+    17, 18, 19, 20, 21, 20, 16, 12, 10, 10, 11, 11,
+    11, 11, 10, 10, 10, 10, 11, 12, 14, 15, 16, 16
+], dtype=np.float64)
+
+VENDORS = ([1, 2], [0.48, 0.52])
+PASSENGERS = ([1, 2, 3, 4, 5, 6], [0.70, 0.14, 0.04, 0.02, 0.06, 0.04])
+RATE_CODES = ([1, 2, 3, 4, 5], [0.970, 0.022, 0.002, 0.001, 0.005])
+PAYMENT_TYPES = ([1, 2, 3, 4], [0.62, 0.37, 0.006, 0.004])
+
+# Midtown-centred pickup cloud (degrees) and miles per degree at NYC's latitude
+PICKUP_CENTER = (-73.978, 40.752)
+PICKUP_SPREAD = (0.025, 0.030)
+MILES_PER_DEGREE_LON = 52.5
+MILES_PER_DEGREE_LAT = 69.0
+
+JFK_FLAT_FARE = 52.0
+TOLL_AMOUNT = 5.54
+
+DEFECTS = [
+    'no_passengers', 'too_many_passengers', 'zero_distance', 'huge_distance',
+    'negative_fare', 'huge_fare', 'negative_tip', 'dropoff_before_pickup', 'zero_coordinates'
+]
+
+
+def _choice(rng, options, n):
+    values, weights = options
+    return rng.choice(np.asarray(values, dtype=np.int8), size=n, p=weights)
+
+
+def _generate_block(n, seed, block, start_ns, days, dirty_fraction):
+    rng = np.random.default_rng([seed, block])
+
+    # Pickup times: uniform day, hourly demand curve, uniform second within the hour
+    day = rng.integers(0, days, n)
+    hour = rng.choice(24, size=n, p=HOURLY_DEMAND)
+    second = rng.integers(0, 3600, n)
+    pickup = (start_ns // 1_000_000_000 + day * 86_400 + hour * 3_600 + second).astype('datetime64[s]')
+
+    rate_code = _choice(rng, RATE_CODES, n)
+    jfk = rate_code == 2
+
+    distance = np.clip(rng.lognormal(0.55, 0.75, n), 0.2, 60.0)
+    distance[jfk] = rng.normal(17.5, 2.0, jfk.sum()).clip(12.0, 25.0)
+    distance = np.round(distance, 2)
+
+    speed = HOURLY_SPEED_MPH[hour] * rng.lognormal(0.0, 0.25, n)
+    duration = np.minimum(distance / speed * 3600 + rng.gamma(2.0, 45.0, n), 3 * 3600).astype(np.int64)
+    dropoff = pickup + duration.astype('timedelta64[s]')
+
+    # Pickup around Midtown; dropoff displaced by the straight-line share of the distance
+    pickup_lon = rng.normal(PICKUP_CENTER[0], PICKUP_SPREAD[0], n)
+    pickup_lat = rng.normal(PICKUP_CENTER[1], PICKUP_SPREAD[1], n)
+    angle = rng.uniform(0, 2 * np.pi, n)
+    crow_miles = distance / rng.uniform(1.2, 1.5, n)
+    dropoff_lon = pickup_lon + np.cos(angle) * crow_miles / MILES_PER_DEGREE_LON
+    dropoff_lat = pickup_lat + np.sin(angle) * crow_miles / MILES_PER_DEGREE_LAT
+
+    # Metered fare in $0.50 steps ($2.50 flag drop, $2.50/mile, waiting time), flat to JFK
+    fare = np.round((2.5 + 2.5 * distance + 0.1 * duration / 60) * 2) / 2
+    fare[jfk] = JFK_FLAT_FARE
+
+    weekday = ((start_ns // 86_400_000_000_000 + day + 3) % 7) < 5
+    extra = np.where((hour >= 20) | (hour < 6), 0.5, np.where(weekday & (hour >= 16), 1.0, 0.0))
+    extra[jfk] = 0.0
+    mta_tax = np.full(n, 0.5)
+    surcharge = np.full(n, 0.3)
+    tolls = np.where(rng.random(n) < np.where(jfk, 0.4, 0.03), TOLL_AMOUNT, 0.0)
+
+    # Tips are only recorded for card payments
+    payment_type = _choice(rng, PAYMENT_TYPES, n)
+    tip_rate = np.clip(rng.normal(0.2, 0.05, n), 0.0, 0.5)
+    tipped = (payment_type == 1) & (rng.random(n) < 0.9)
+    tip = np.where(tipped, np.round((fare + extra) * tip_rate, 2), 0.0)
+
+    total = np.round(fare + extra + mta_tax + tip + tolls + surcharge, 2)
+
+    df = pd.DataFrame({
+        'VendorID': _choice(rng, VENDORS, n),
+        'tpep_pickup_datetime': pickup,
+        'tpep_dropoff_datetime': dropoff,
+        'passenger_count': _choice(rng, PASSENGERS, n),
+        'trip_distance': distance,
+        'pickup_longitude': np.round(pickup_lon, 6),
+        'pickup_latitude': np.round(pickup_lat, 6),
+        'RateCodeID': rate_code,
+        'store_and_fwd_flag': np.where(rng.random(n) < 0.01, 'Y', 'N'),
+        'dropoff_longitude': np.round(dropoff_lon, 6),
+        'dropoff_latitude': np.round(dropoff_lat, 6),
+        'payment_type': payment_type,
+        'fare_amount': fare,
+        'extra': extra,
+        'mta_tax': mta_tax,
+        'tip_amount': tip,
+        'tolls_amount': tolls,
+        'improvement_surcharge': surcharge,
+        'total_amount': total
+    }, columns=CSV_COLUMNS)
+
+    dirty = np.flatnonzero(rng.random(n) < dirty_fraction)
+    if len(dirty):
+        _inject_defects(df, dirty, rng.integers(0, len(DEFECTS), len(dirty)), rng)
+    return df
+
+
+def _inject_defects(df, rows, kinds, rng):
+    # One defect per dirty row; kinds index into DEFECTS
+    def at(kind):
+        return rows[kinds == DEFECTS.index(kind)]
+
+    df.loc[at('no_passengers'), 'passenger_count'] = 0
+    selected = at('too_many_passengers')
+    df.loc[selected, 'passenger_count'] = rng.integers(7, 10, len(selected)).astype(np.int8)
+    df.loc[at('zero_distance'), 'trip_distance'] = 0.0
+    selected = at('huge_distance')
+    df.loc[selected, 'trip_distance'] = np.round(rng.uniform(100, 300, len(selected)), 2)
+
+    # Voided trips: the whole fare line is negated, as in the real feed
+    selected = at('negative_fare')
+    money = ['fare_amount', 'extra', 'mta_tax', 'tip_amount', 'tolls_amount', 'improvement_surcharge', 'total_amount']
+    df.loc[selected, money] = -df.loc[selected, money]
+    selected = at('huge_fare')
+    df.loc[selected, 'fare_amount'] = np.round(rng.uniform(500, 5000, len(selected)), 2)
+    df.loc[selected, 'total_amount'] = df.loc[selected, 'fare_amount'] + 0.8
+
+    selected = at('negative_tip')
+    df.loc[selected, 'tip_amount'] = -np.round(rng.uniform(0.01, 5, len(selected)), 2)
+
+    selected = at('dropoff_before_pickup')
+    pickup = df.loc[selected, 'tpep_pickup_datetime'].to_numpy()
+    df.loc[selected, 'tpep_pickup_datetime'] = df.loc[selected, 'tpep_dropoff_datetime'].to_numpy()
+    df.loc[selected, 'tpep_dropoff_datetime'] = pickup
+
+    df.loc[at('zero_coordinates'), ['pickup_longitude', 'pickup_latitude']] = 0.0
+
+
+def iter_trip_blocks(n_rows, seed=2015, dirty_fraction=0.02, start='2015-01-01', days=31):
+    """
+    Generate synthetic trips block by block
+
+    Args:
+        n_rows: Total number of trips
+        seed: Random seed; the same seed and arguments give identical trips
+        dirty_fraction: Share of rows carrying one data-quality defect
+        start: First pickup date
+        days: Number of days the pickups are spread over
+
+    Yields:
+        DataFrame: Up to BLOCK_ROWS trips with the raw CSV columns
+    """
+    start_ns = pd.Timestamp(start).value
+    for block, offset in enumerate(range(0, n_rows, BLOCK_ROWS)):
+        yield _generate_block(min(BLOCK_ROWS, n_rows - offset), seed, block, start_ns, days, dirty_fraction)
+
+
+def generate_trips(n_rows, seed=2015, dirty_fraction=0.02, start='2015-01-01', days=31):
+    """
+    Generate synthetic trips in memory (see iter_trip_blocks for the arguments)
+
+    Returns:
+        DataFrame: n_rows trips with the raw CSV columns
+    """
+    return pd.concat(iter_trip_blocks(n_rows, seed, dirty_fraction, start, days), ignore_index=True)
+
+
+def write_trips_csv(output_path, n_rows, seed=2015, dirty_fraction=0.02, start='2015-01-01', days=31):
+    """
+    Write synthetic trips as a CSV in the 2015 yellow-taxi layout, one block at
+    a time (see iter_trip_blocks for the arguments)
+
+    Args:
+        output_path: CSV path
+
+    Returns:
+        int: File size in bytes
+    """
+    options = pacsv.WriteOptions(include_header=False, quoting_style='none')
+    with open(output_path, 'wb') as f:
+        f.write((','.join(CSV_COLUMNS) + '\n').encode())
+        for block in iter_trip_blocks(n_rows, seed, dirty_fraction, start, days):
+            pacsv.write_csv(pa.Table.from_pandas(block, preserve_index=False), f, options)
+    return os.path.getsize(output_path)
+
+
+def parse_row_count(text):
+    """
+    Parse a row count such as 100000, 100K, 2.5M or 1B
+    """
+    text = text.strip().upper().replace('_', '')
+    multiplier = {'K': 1_000, 'M': 1_000_000, 'B': 1_000_000_000}.get(text[-1:], 1)
+    if multiplier != 1:
+        text = text[:-1]
+    return int(float(text) * multiplier)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic NYC yellow-taxi trips (2015 CSV layout)")
+    parser.add_argument('rows', type=parse_row_count, help="Number of trips, e.g. 100K, 10M, 100M")
+    parser.add_argument('--output', default=None, help="CSV path (default: synthetic_trips_<rows>.csv)")
+    parser.add_argument('--seed', type=int, default=2015, help="Random seed")
+    parser.add_argument('--dirty-fraction', type=float, default=0.02, help="Share of rows with a quality defect")
+    parser.add_argument('--start', default='2015-01-01', help="First pickup date")
+    parser.add_argument('--days', type=int, default=31, help="Days the pickups are spread over")
+    args = parser.parse_args()
+
+    output = args.output or f"synthetic_trips_{args.rows}.csv"
+    print(f"Generating {args.rows:,} trips (seed {args.seed}, {args.dirty_fraction:.1%} dirty)...")
+    started = time.perf_counter()
+    size = write_trips_csv(output, args.rows, args.seed, args.dirty_fraction, args.start, args.days)
+    print(f"✓ Saved: {output} ({size / 1024 ** 2:,.1f} MB in {time.perf_counter() - started:.1f}s)")
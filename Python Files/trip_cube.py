@@ -0,0 +1,218 @@
+"""
+Materialized rollup cube of trip aggregates.
+
+build_cube() groups the cleaned trips once by the dimensions every consumer
+slices on (pickup date, hour, payment type, vendor, passenger count and
+distance bucket; day, day of week, is_peak and is_weekend follow from the date
+and hour) and keeps additive measures per cell: trip count and, per measure,
+sum, sum of squares, min and max. A month of trips becomes a few tens of
+thousands of cells in a small Parquet file. rollup() re-aggregates cells to any
+subset of dimensions, with means and standard deviations derived from the sums,
+so dashboard charts and KPI summaries never touch trip-level data.
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import time
+
+import trip_store
+
+CUBE_PATH = 'trip_cube.parquet'
+
+# Distance buckets (miles), as in the SQL analytics distance categories
+DISTANCE_EDGES = [1, 3, 10]
+DISTANCE_LABELS = ['< 1 mi', '1-3 mi', '3-10 mi', '10+ mi']
+
+# Cells are keyed by these; DERIVED_DIMENSIONS are functions of pickup_date/hour
+KEY_DIMENSIONS = ['pickup_date', 'hour', 'payment_type', 'VendorID', 'passenger_count', 'distance_bucket']
+DERIVED_DIMENSIONS = ['day', 'day_of_week', 'is_peak', 'is_weekend']
+DIMENSIONS = KEY_DIMENSIONS + DERIVED_DIMENSIONS
+
+MEASURES = ['total_amount', 'fare_amount', 'tip_amount', 'trip_distance', 'trip_duration', 'tip_percentage',
+            'fare_per_mile']
+
+# Trip columns build_cube reads
+SOURCE_COLUMNS = ['tpep_pickup_datetime', 'hour', 'day', 'day_of_week', 'is_peak', 'is_weekend', 'payment_type',
+                  'VendorID', 'passenger_count'] + MEASURES
+
+
+def build_cube(trips):
+    """
+    Aggregate trips into cube cells
+
+    Args:
+        trips: Cleaned trips with the SOURCE_COLUMNS
+
+    Returns:
+        DataFrame: One row per non-empty cell: DIMENSIONS, 'trips' and
+            {measure}_sum, _sumsq, _min and _max for every measure
+    """
+    frame = pd.DataFrame({
+        'pickup_date': trips['tpep_pickup_datetime'].dt.floor('D'),
+        'hour': trips['hour'],
+        # Nullable: missing codes get cells of their own instead of failing the
+        # cast (read back from Parquet they arrive as float64 NaN)
+        'payment_type': trips['payment_type'].astype('Int8'),
+        'VendorID': trips['VendorID'].astype('Int8'),
+        'passenger_count': trips['passenger_count'].astype('Int8'),
+        'distance_bucket': np.searchsorted(DISTANCE_EDGES, trips['trip_distance'].to_numpy(), side='right')
+                             .astype('int8')
+    })
+    aggregations = {'trips': ('hour', 'size')}
+    for column in DERIVED_DIMENSIONS:
+        frame[column] = trips[column].to_numpy()
+        aggregations[column] = (column, 'first')
+    for measure in MEASURES:
+        values = trips[measure].to_numpy(dtype=np.float64)
+        frame[measure] = values
+        frame[f"{measure}_squared"] = values * values
+        aggregations.update({
+            f"{measure}_sum": (measure, 'sum'),
+            f"{measure}_sumsq": (f"{measure}_squared", 'sum'),
+            f"{measure}_min": (measure, 'min'),
+            f"{measure}_max": (measure, 'max')
+        })
+
+    cube = frame.groupby(KEY_DIMENSIONS, sort=True, dropna=False).agg(**aggregations).reset_index()
+    return cube[DIMENSIONS + [name for name in aggregations if name not in DERIVED_DIMENSIONS]]
+
+
+def write_cube(cube, path=CUBE_PATH, trips_path=None):
+    """
+    Save the cube as Parquet (see trip_store.write_derived)
+
+    Args:
+        cube: Cube cells
+        path: Output Parquet path
+        trips_path: Cleaned trips the cube was built from, recorded so
+            load_cube() can tell when it is stale
+
+    Returns:
+        int: File size in bytes
+    """
+    return trip_store.write_derived(cube, path, trips_path)
+
+
+def read_cube(path=CUBE_PATH):
+    return pd.read_parquet(path)
+
+
+def load_cube(path=CUBE_PATH, trips_path='cleaned_trips.parquet'):
+    """
+    Read the cube, building and saving it from the cleaned trips first if it
+    does not exist yet or was built from another version of them
+
+    Args:
+        path: Cube Parquet file
+        trips_path: Cleaned trips (any trip_store layout), used when building
+
+    Returns:
+        DataFrame: Cube cells
+    """
+    if not trip_store.is_current(path, trips_path):
+        cube = build_cube(trip_store.read_trips(trips_path, columns=SOURCE_COLUMNS))
+        write_cube(cube, path, trips_path)
+        return cube
+    return read_cube(path)
+
+
+def select(cube, start=None, end=None, where=None):
+    """
+    Cells inside a pickup date window and matching dimension values
+
+    Args:
+        cube: Cube cells
+        start: Inclusive lower bound on the pickup date, or None
+        end: Exclusive upper bound on the pickup date, or None
+        where: {dimension: value or list of values}, or None
+
+    Returns:
+        DataFrame: Matching cells
+    """
+    keep = np.ones(len(cube), dtype=bool)
+    if start is not None:
+        keep &= (cube['pickup_date'] >= pd.Timestamp(start).floor('D')).to_numpy()
+    if end is not None:
+        keep &= (cube['pickup_date'] < pd.Timestamp(end)).to_numpy()
+    for dimension, value in (where or {}).items():
+        values = value if isinstance(value, (list, tuple, set)) else [value]
+        keep &= cube[dimension].isin(values).to_numpy()
+    return cube[keep]
+
+
+def rollup(cube, by=None, measures=None, start=None, end=None, where=None):
+    """
+    Aggregate cube cells to a subset of dimensions
+
+    Args:
+        cube: Cube cells
+        by: Dimensions to group by (default: none, one overall row)
+        measures: Measures to return (default: all MEASURES)
+        start, end, where: Cell selection, see select()
+
+    Returns:
+        DataFrame: by columns, 'trips' and {measure}_sum, _mean, _std (sample),
+            _min and _max per measure, sorted by the by columns
+    """
+    cells = select(cube, start, end, where)
+    by = list(by or [])
+    measures = measures or MEASURES
+
+    additive = ['trips'] + [f"{m}_{stat}" for m in measures for stat in ('sum', 'sumsq')]
+    grouped = cells.groupby(by, sort=True, dropna=False) if by else cells.groupby(np.zeros(len(cells), dtype=np.int8))
+    totals = grouped[additive].sum()
+    minima = grouped[[f"{m}_min" for m in measures]].min()
+    maxima = grouped[[f"{m}_max" for m in measures]].max()
+
+    result = pd.DataFrame({'trips': totals['trips']}, index=totals.index)
+    n = totals['trips']
+    for m in measures:
+        total = totals[f"{m}_sum"]
+        result[f"{m}_sum"] = total
+        result[f"{m}_mean"] = total / n
+        variance = (totals[f"{m}_sumsq"] - total * total / n) / (n - 1)
+        result[f"{m}_std"] = np.sqrt(variance.clip(lower=0)).where(n > 1)
+        result[f"{m}_min"] = minima[f"{m}_min"]
+        result[f"{m}_max"] = maxima[f"{m}_max"]
+    return result.reset_index() if by else result.reset_index(drop=True)
+
+
+def summary(cube, start=None, end=None):
+    """
+    Headline KPIs of the selected cells
+
+    Returns:
+        dict: total_trips, total_revenue, avg_fare, avg_distance, avg_tip_pct,
+            peak_trips and weekend_trips
+    """
+    cells = select(cube, start, end)
+    total = rollup(cells, measures=['total_amount', 'fare_amount', 'trip_distance', 'tip_percentage']).iloc[0]
+    return {
+        'total_trips': int(total['trips']),
+        'total_revenue': total['total_amount_sum'],
+        'avg_fare': total['fare_amount_mean'],
+        'avg_distance': total['trip_distance_mean'],
+        'avg_tip_pct': total['tip_percentage_mean'],
+        'peak_trips': int(cells.loc[cells['is_peak'], 'trips'].sum()),
+        'weekend_trips': int(cells.loc[cells['is_weekend'], 'trips'].sum())
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the trip rollup cube from cleaned trips")
+    parser.add_argument('trips', nargs='?', default='cleaned_trips.parquet',
+                        help="Cleaned trips: Parquet file, partitioned dataset or Arrow IPC file")
+    parser.add_argument('--output', default=CUBE_PATH, help="Cube Parquet path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("BUILDING TRIP ROLLUP CUBE")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    trips = trip_store.read_trips(args.trips, columns=SOURCE_COLUMNS)
+    cube = build_cube(trips)
+    size = write_cube(cube, args.output, args.trips)
+    print(f"✓ {len(trips):,} trips → {len(cube):,} cells in {time.perf_counter() - start:.2f}s")
+    print(f"✓ Saved: {args.output} ({size / 1024 ** 2:.2f} MB)")
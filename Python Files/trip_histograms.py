@@ -0,0 +1,189 @@
+"""
+Pre-binned histograms of trip distributions.
+
+Charts draw bar heights from bin counts instead of handing every trip to the
+plotting library, so matplotlib and the browser receive a few hundred numbers
+instead of millions of values. Each column has fixed-width bins over the charted
+range and log-spaced bins over its full range. Binning is one vectorized pass:
+bin indexes are computed arithmetically and counted with np.bincount.
+
+build_histograms() counts per pickup date. The counts are additive, so
+histogram() can answer any date window by summing dates. The ETL writes them to
+trip_histograms.parquet next to the rollup cube.
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import time
+
+import trip_store
+
+HISTOGRAMS_PATH = 'trip_histograms.parquet'
+
+# Column -> {scale: (low, high, bins)}; log ranges must be positive
+HISTOGRAMS = {
+    'fare_amount': {'linear': (0, 50, 50), 'log': (0.5, 500, 60)},
+    'trip_distance': {'linear': (0, 20, 50), 'log': (0.1, 100, 60)}
+}
+
+SOURCE_COLUMNS = ['tpep_pickup_datetime'] + list(HISTOGRAMS)
+
+
+def bin_edges(column, scale='linear'):
+    """
+    Returns:
+        ndarray: bins + 1 edges of a column's histogram
+    """
+    low, high, bins = HISTOGRAMS[column][scale]
+    if scale == 'log':
+        edges = np.logspace(np.log10(low), np.log10(high), bins + 1)
+        # logspace can miss the end points by a rounding error
+        edges[[0, -1]] = low, high
+        return edges
+    return np.linspace(low, high, bins + 1)
+
+
+def _bin_indexes(values, column, scale):
+    # Like np.histogram: bins are half-open except the last, which includes the
+    # upper edge; values outside [low, high] get -1
+    low, high, bins = HISTOGRAMS[column][scale]
+    edges = bin_edges(column, scale)
+    values = np.asarray(values, dtype=np.float64)
+    inside = (values >= edges[0]) & (values <= edges[-1])
+    values = np.where(inside, values, low)
+    if scale == 'log':
+        position = (np.log10(values) - np.log10(low)) / (np.log10(high) - np.log10(low))
+    else:
+        position = (values - low) / (high - low)
+    indexes = np.clip(np.floor(position * bins).astype(np.int64), 0, bins - 1)
+    # Arithmetic rounding can land a value on the wrong side of an exact edge
+    indexes -= values < edges[indexes]
+    indexes += (values >= edges[indexes + 1]) & (indexes < bins - 1)
+    indexes[~inside] = -1
+    return indexes
+
+
+def _frame(column, scale, counts):
+    edges = bin_edges(column, scale)
+    return pd.DataFrame({
+        'bin_left': edges[:-1],
+        'bin_right': edges[1:],
+        'bin_center': np.sqrt(edges[:-1] * edges[1:]) if scale == 'log' else (edges[:-1] + edges[1:]) / 2,
+        'count': counts
+    })
+
+
+def histogram_of(values, column, scale='linear'):
+    """
+    Bin counts of in-memory values
+
+    Args:
+        values: Series or array of one HISTOGRAMS column
+        column: Column name (selects the bins)
+        scale: 'linear' or 'log'
+
+    Returns:
+        DataFrame: bin_left, bin_right, bin_center and count per bin
+    """
+    indexes = _bin_indexes(values, column, scale)
+    bins = HISTOGRAMS[column][scale][2]
+    return _frame(column, scale, np.bincount(indexes[indexes >= 0], minlength=bins))
+
+
+def build_histograms(trips):
+    """
+    Count every HISTOGRAMS column and scale per pickup date
+
+    Args:
+        trips: Cleaned trips with the SOURCE_COLUMNS
+
+    Returns:
+        DataFrame: pickup_date, column, scale, bin and count (non-empty bins only)
+    """
+    dates = trips['tpep_pickup_datetime'].dt.floor('D')
+    date_codes, unique_dates = pd.factorize(dates, sort=True)
+    parts = []
+    for column, scales in HISTOGRAMS.items():
+        for scale, (_, _, bins) in scales.items():
+            indexes = _bin_indexes(trips[column], column, scale)
+            inside = indexes >= 0
+            counts = np.bincount(date_codes[inside] * bins + indexes[inside], minlength=len(unique_dates) * bins)
+            occupied = np.flatnonzero(counts)
+            parts.append(pd.DataFrame({
+                'pickup_date': unique_dates[occupied // bins],
+                'column': column,
+                'scale': scale,
+                'bin': (occupied % bins).astype(np.int16),
+                'count': counts[occupied]
+            }))
+    return pd.concat(parts, ignore_index=True)
+
+
+def write_histograms(histograms, path=HISTOGRAMS_PATH, trips_path=None):
+    """
+    Save the per-date counts as Parquet (see trip_store.write_derived), recording
+    the cleaned trips they were counted from
+
+    Returns:
+        int: File size in bytes
+    """
+    return trip_store.write_derived(histograms, path, trips_path)
+
+
+def load_histograms(path=HISTOGRAMS_PATH, trips_path='cleaned_trips.parquet'):
+    """
+    Read the per-date counts, building and saving them from the cleaned trips
+    first if the file does not exist yet or was built from another version of them
+
+    Returns:
+        DataFrame: As returned by build_histograms
+    """
+    if not trip_store.is_current(path, trips_path):
+        histograms = build_histograms(trip_store.read_trips(trips_path, columns=SOURCE_COLUMNS))
+        write_histograms(histograms, path, trips_path)
+        return histograms
+    return pd.read_parquet(path)
+
+
+def histogram(histograms, column, scale='linear', start=None, end=None):
+    """
+    One histogram over a pickup date window
+
+    Args:
+        histograms: DataFrame returned by build_histograms/load_histograms
+        column: HISTOGRAMS column
+        scale: 'linear' or 'log'
+        start: Inclusive lower bound on the pickup date, or None
+        end: Exclusive upper bound on the pickup date, or None
+
+    Returns:
+        DataFrame: bin_left, bin_right, bin_center and count per bin
+    """
+    keep = (histograms['column'] == column) & (histograms['scale'] == scale)
+    if start is not None:
+        keep &= histograms['pickup_date'] >= pd.Timestamp(start).floor('D')
+    if end is not None:
+        keep &= histograms['pickup_date'] < pd.Timestamp(end)
+    bins = HISTOGRAMS[column][scale][2]
+    counts = histograms[keep].groupby('bin')['count'].sum().reindex(range(bins), fill_value=0)
+    return _frame(column, scale, counts.to_numpy())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute trip histograms from cleaned trips")
+    parser.add_argument('trips', nargs='?', default='cleaned_trips.parquet',
+                        help="Cleaned trips: Parquet file, partitioned dataset or Arrow IPC file")
+    parser.add_argument('--output', default=HISTOGRAMS_PATH, help="Histogram Parquet path")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("PRECOMPUTING TRIP HISTOGRAMS")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    trips = trip_store.read_trips(args.trips, columns=SOURCE_COLUMNS)
+    histograms = build_histograms(trips)
+    size = write_histograms(histograms, args.output, args.trips)
+    print(f"✓ {len(trips):,} trips → {len(histograms):,} date/bin counts in {time.perf_counter() - start:.2f}s")
+    print(f"✓ Saved: {args.output} ({size / 1024:.1f} KB)")
@@ -0,0 +1,45 @@
+"""
+Bundled lookup tables for the coded trip dimensions.
+
+lookups/ holds one small CSV per code column (vendor, rate code, payment type),
+mapping each TLC code to a readable label. The Spark ETL joins them with
+broadcast joins (spark_transforms.add_lookup_labels); pandas code maps codes
+with label_map().
+"""
+
+import pandas as pd
+import os
+
+LOOKUP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lookups')
+
+# Code column -> (lookup file, label column)
+LOOKUPS = {
+    'VendorID': ('vendor.csv', 'vendor_name'),
+    'RateCodeID': ('rate_code.csv', 'rate_code_name'),
+    'payment_type': ('payment_type.csv', 'payment_type_name')
+}
+
+LABEL_COLUMNS = [label for _, label in LOOKUPS.values()]
+
+
+def load_lookup(code_column):
+    """
+    Load the lookup table of one code column
+
+    Args:
+        code_column: Key of LOOKUPS (e.g. 'payment_type')
+
+    Returns:
+        DataFrame: Two columns, the code (int8) and its label (str)
+    """
+    filename, label = LOOKUPS[code_column]
+    return pd.read_csv(os.path.join(LOOKUP_DIR, filename), dtype={code_column: 'int8', label: 'str'})
+
+
+def label_map(code_column):
+    """
+    Returns:
+        dict: code -> label for one code column
+    """
+    lookup = load_lookup(code_column)
+    return dict(zip(lookup[code_column], lookup[LOOKUPS[code_column][1]]))
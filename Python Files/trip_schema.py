@@ -0,0 +1,221 @@
+"""
+Declared schema for NYC yellow-taxi trips (2015 layout).
+
+Raw columns load with narrow types: nullable Int8 for small counts and codes (a
+blank field becomes <NA> instead of failing the read, and codes outside the
+documented range, e.g. payment type 7, keep their value for the quality report),
+float32 for distances and coordinates and a categorical for the store-and-forward
+flag. Monetary columns stay float64 so revenue totals over millions of rows do
+not lose cents. The derived columns added by the ETL use int8/float32 as well.
+"""
+
+import pandas as pd
+import pyarrow as pa
+import argparse
+import os
+
+DATETIME_COLUMNS = ['tpep_pickup_datetime', 'tpep_dropoff_datetime']
+DATETIME_DTYPE = 'datetime64[ns]'
+
+# Documented payment codes; others are kept and flagged by quality_rules
+PAYMENT_TYPES = [1, 2, 3, 4, 5, 6]
+STORE_AND_FWD_FLAGS = ['N', 'Y']
+
+CSV_DTYPES = {
+    'VendorID': 'Int8',
+    'passenger_count': 'Int8',
+    'trip_distance': 'float32',
+    'pickup_longitude': 'float32',
+    'pickup_latitude': 'float32',
+    'RateCodeID': 'Int8',
+    'store_and_fwd_flag': pd.CategoricalDtype(STORE_AND_FWD_FLAGS),
+    'dropoff_longitude': 'float32',
+    'dropoff_latitude': 'float32',
+    'payment_type': 'Int8',
+    'fare_amount': 'float64',
+    'extra': 'float64',
+    'mta_tax': 'float64',
+    'tip_amount': 'float64',
+    'tolls_amount': 'float64',
+    'improvement_surcharge': 'float64',
+    'total_amount': 'float64'
+}
+
+# Code columns held as nullable Int8 in every frame, raw or cleaned
+CODE_COLUMNS = [column for column, dtype in CSV_DTYPES.items() if dtype == 'Int8']
+
+FEATURE_DTYPES = {
+    'hour': 'int8',
+    'day_of_week': 'int8',
+    'day': 'int8',
+    'is_weekend': 'bool',
+    'is_peak': 'bool',
+    'trip_duration': 'float32',
+    'fare_per_mile': 'float32',
+    'tip_percentage': 'float32'
+}
+
+# Arrow schema of cleaned_trips.parquet (raw columns followed by derived features).
+# The integer codes are nullable: cleaning requires passenger_count, but a blank
+# VendorID, RateCodeID or payment_type is kept as a null.
+CLEANED_SCHEMA = pa.schema([
+    ('VendorID', pa.int8()),
+    ('tpep_pickup_datetime', pa.timestamp('ns')),
+    ('tpep_dropoff_datetime', pa.timestamp('ns')),
+    ('passenger_count', pa.int8()),
+    ('trip_distance', pa.float32()),
+    ('pickup_longitude', pa.float32()),
+    ('pickup_latitude', pa.float32()),
+    ('RateCodeID', pa.int8()),
+    ('store_and_fwd_flag', pa.dictionary(pa.int8(), pa.string())),
+    ('dropoff_longitude', pa.float32()),
+    ('dropoff_latitude', pa.float32()),
+    ('payment_type', pa.int8()),
+    ('fare_amount', pa.float64()),
+    ('extra', pa.float64()),
+    ('mta_tax', pa.float64()),
+    ('tip_amount', pa.float64()),
+    ('tolls_amount', pa.float64()),
+    ('improvement_surcharge', pa.float64()),
+    ('total_amount', pa.float64()),
+    ('hour', pa.int8()),
+    ('day_of_week', pa.int8()),
+    ('day', pa.int8()),
+    ('is_weekend', pa.bool_()),
+    ('is_peak', pa.bool_()),
+    ('trip_duration', pa.float32()),
+    ('fare_per_mile', pa.float32()),
+    ('tip_percentage', pa.float32())
+])
+
+# Optional label columns added by the Spark ETL's lookup joins (see trip_lookups),
+# stored after the CLEANED_SCHEMA columns
+LABEL_FIELDS = [
+    pa.field('vendor_name', pa.dictionary(pa.int8(), pa.string())),
+    pa.field('rate_code_name', pa.dictionary(pa.int8(), pa.string())),
+    pa.field('payment_type_name', pa.dictionary(pa.int8(), pa.string()))
+]
+
+
+def _normalize_datetimes(df):
+    # The pyarrow and C parsers return different datetime resolutions
+    for column in DATETIME_COLUMNS:
+        df[column] = df[column].astype(DATETIME_DTYPE)
+    return df
+
+
+def read_trips_csv(filepath, chunksize=None, names=None):
+    """
+    Read a raw trip CSV using the declared schema
+
+    Args:
+        filepath: Path (or file-like buffer) of the CSV containing taxi trip data
+        chunksize: If given, return an iterator of DataFrames with this many rows
+            (the C parser is used, since the pyarrow engine cannot stream)
+        names: Column names, for input without a header line (e.g. a byte range
+            taken from the middle of a file)
+
+    Returns:
+        DataFrame, or iterator of DataFrames when chunksize is set
+    """
+    header = 'infer' if names is None else None
+
+    if chunksize is None:
+        df = pd.read_csv(
+            filepath,
+            engine='pyarrow',
+            header=header,
+            names=names,
+            dtype=CSV_DTYPES,
+            parse_dates=DATETIME_COLUMNS
+        )
+        return _normalize_datetimes(df)
+
+    reader = pd.read_csv(
+        filepath,
+        header=header,
+        names=names,
+        dtype=CSV_DTYPES,
+        parse_dates=DATETIME_COLUMNS,
+        chunksize=chunksize
+    )
+    return (_normalize_datetimes(chunk) for chunk in reader)
+
+
+def apply_feature_dtypes(df):
+    """
+    Cast the derived feature columns to their declared narrow types
+
+    Args:
+        df: DataFrame with the derived feature columns
+
+    Returns:
+        DataFrame: df with cast columns (modified in place)
+    """
+    for column, dtype in FEATURE_DTYPES.items():
+        df[column] = df[column].astype(dtype)
+    return df
+
+
+def to_arrow(df):
+    """
+    Convert a cleaned trip DataFrame to an Arrow table with CLEANED_SCHEMA
+
+    Args:
+        df: Cleaned and feature-engineered trip DataFrame
+
+    Returns:
+        pyarrow.Table
+    """
+    return pa.Table.from_pandas(df, schema=CLEANED_SCHEMA, preserve_index=False)
+
+
+def report_savings(baseline_path, typed_path):
+    """
+    Print in-memory and on-disk footprint of a baseline (wide-typed) Parquet file
+    against one written with the declared schema
+
+    Args:
+        baseline_path: Parquet file written before the typed schema existed
+        typed_path: Parquet file written with CLEANED_SCHEMA
+
+    Returns:
+        DataFrame: Per-column memory usage in MB for both files
+    """
+    print("\n" + "=" * 60)
+    print("SCHEMA FOOTPRINT REPORT")
+    print("=" * 60)
+
+    baseline = pd.read_parquet(baseline_path)
+    typed = pd.read_parquet(typed_path)
+
+    columns = pd.DataFrame({
+        'baseline_mb': baseline.memory_usage(deep=True, index=False) / 1024 ** 2,
+        'typed_mb': typed.memory_usage(deep=True, index=False) / 1024 ** 2,
+        'baseline_dtype': baseline.dtypes.astype(str),
+        'typed_dtype': typed.dtypes.astype(str)
+    })
+    print(columns.to_string(float_format=lambda v: f"{v:.2f}"))
+
+    baseline_mem = columns['baseline_mb'].sum()
+    typed_mem = columns['typed_mb'].sum()
+    baseline_file = os.path.getsize(baseline_path) / 1024 ** 2
+    typed_file = os.path.getsize(typed_path) / 1024 ** 2
+
+    print(f"\n✓ Rows: {len(baseline):,} baseline, {len(typed):,} typed")
+    print(f"✓ Memory: {baseline_mem:.2f} MB → {typed_mem:.2f} MB "
+          f"({(1 - typed_mem / baseline_mem) * 100:.1f}% smaller)")
+    print(f"✓ File size: {baseline_file:.2f} MB → {typed_file:.2f} MB "
+          f"({(1 - typed_file / baseline_file) * 100:.1f}% smaller)")
+
+    return columns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare a wide-typed Parquet file with a schema-typed one")
+    parser.add_argument('baseline', help="Parquet file from the previous (untyped) pipeline")
+    parser.add_argument('typed', nargs='?', default='cleaned_trips.parquet',
+                        help="Parquet file written with the declared schema")
+    args = parser.parse_args()
+
+    report_savings(args.baseline, args.typed)
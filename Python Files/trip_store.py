@@ -0,0 +1,290 @@
+"""
+Storage layouts for cleaned trip data.
+
+write_partitioned() lays trips out as a hive-partitioned Parquet dataset
+(pickup_date=YYYY-MM-DD[/pickup_hour=H]) sorted by pickup time, with bounded row
+groups and column statistics. write_arrow_ipc() writes an uncompressed Arrow IPC
+file as a single record batch, which readers memory-map: numeric columns of the
+loaded frame are views of the mapped file, so processes share one page-cache
+copy. read_trips() reads any of these layouts; every consumer passes the columns
+it uses and its row predicates. For Parquet the dataset scanner applies them
+while reading, so only those columns are decoded and partitions and row groups
+outside a requested time window or failing the predicates' statistics are
+skipped.
+
+Files derived from the cleaned trips (rollup cube, histograms, sketches) are
+written with write_derived(), which records the trips' path and modification
+time in the Parquet metadata; is_current() tells readers when to rebuild them.
+"""
+
+import pandas as pd
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import json
+import os
+
+import trip_schema
+
+PARTITION_COLUMNS = ['pickup_date', 'pickup_hour']
+
+IPC_EXTENSIONS = ('.arrow', '.feather', '.ipc')
+
+# Row groups of ~64K rows give several groups per day, so min/max statistics on the
+# sorted pickup column can prune within a day as well as across days
+MAX_ROWS_PER_GROUP = 65_536
+MIN_ROWS_PER_GROUP = 16_384
+
+# Parquet metadata key of the source_stamp() a derived file was built from
+SOURCE_METADATA_KEY = b'trips_source'
+
+
+def write_partitioned(df, output_dir, partition_hour=False):
+    """
+    Write cleaned trips as a hive-partitioned dataset sorted by pickup time
+
+    Args:
+        df: Cleaned and feature-engineered trip DataFrame
+        output_dir: Dataset root directory (existing partitions that receive new
+            data are replaced)
+        partition_hour: Also partition by pickup hour below each date
+
+    Returns:
+        int: Number of files written
+    """
+    table = trip_schema.to_arrow(df)
+    pickup = table.column('tpep_pickup_datetime')
+
+    partition_fields = [('pickup_date', pa.string())]
+    table = table.append_column('pickup_date', pc.strftime(pickup, format='%Y-%m-%d'))
+    if partition_hour:
+        partition_fields.append(('pickup_hour', pa.int8()))
+        table = table.append_column('pickup_hour', pc.hour(pickup).cast(pa.int8()))
+
+    table = table.sort_by('tpep_pickup_datetime')
+
+    written = []
+    ds.write_dataset(
+        table,
+        output_dir,
+        format='parquet',
+        partitioning=ds.partitioning(pa.schema(partition_fields), flavor='hive'),
+        file_options=ds.ParquetFileFormat().make_write_options(compression='snappy', write_statistics=True),
+        basename_template='part-{i}.parquet',
+        max_rows_per_group=MAX_ROWS_PER_GROUP,
+        min_rows_per_group=MIN_ROWS_PER_GROUP,
+        existing_data_behavior='delete_matching',
+        file_visitor=lambda written_file: written.append(written_file.path)
+    )
+    return len(written)
+
+
+def write_arrow_ipc(df, output_path):
+    """
+    Write cleaned trips as an uncompressed Arrow IPC file with one record batch.
+    Readers memory-map it, and with a single batch every column is one
+    contiguous buffer that pandas can use in place, so loading involves no
+    decoding or copying and processes on the same machine share one page-cache
+    copy.
+
+    Args:
+        df: Cleaned and feature-engineered trip DataFrame
+        output_path: Path for the .arrow file
+
+    Returns:
+        int: File size in bytes
+    """
+    table = trip_schema.to_arrow(df).combine_chunks()
+    with pa.OSFile(output_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=max(len(table), 1)):
+            writer.write_batch(batch)
+    return os.path.getsize(output_path)
+
+
+def is_arrow_ipc(path):
+    return os.path.isfile(path) and path.lower().endswith(IPC_EXTENSIONS)
+
+
+def _read_arrow_ipc(path, columns, expression):
+    # Read the memory-mapped file directly instead of through the dataset
+    # scanner, which re-chunks the batches (and pandas would then have to join
+    # them into new arrays). Without a filter the columns stay views of the map.
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    if columns is None:
+        columns = [name for name in table.column_names if name not in PARTITION_COLUMNS]
+    if expression is not None:
+        table = table.filter(expression)
+    return table.select(list(columns))
+
+
+def _open_dataset(path):
+    if os.path.isdir(path):
+        return ds.dataset(path, format='parquet', partitioning='hive')
+    return ds.dataset(path, format='parquet')
+
+
+def _time_window_filter(names, start, end):
+    # Row filter on the sorted pickup column (row groups are pruned by their
+    # statistics) plus a partition filter so whole directories are skipped
+    expression = None
+
+    def combine(left, right):
+        return right if left is None else left & right
+
+    if start is not None:
+        start = pd.Timestamp(start)
+        expression = combine(expression, pc.field('tpep_pickup_datetime') >= pa.scalar(start, pa.timestamp('ns')))
+        if 'pickup_date' in names:
+            expression = combine(expression, pc.field('pickup_date') >= start.strftime('%Y-%m-%d'))
+    if end is not None:
+        end = pd.Timestamp(end)
+        expression = combine(expression, pc.field('tpep_pickup_datetime') < pa.scalar(end, pa.timestamp('ns')))
+        if 'pickup_date' in names:
+            expression = combine(expression, pc.field('pickup_date') <= end.strftime('%Y-%m-%d'))
+    return expression
+
+
+def _conform(table):
+    # Other producers (e.g. the Spark ETL writes microsecond timestamps and plain
+    # strings) are cast to CLEANED_SCHEMA so every reader sees the same Arrow
+    # types; _to_pandas then gives them the same pandas dtypes
+    fields = {field.name: field for field in list(trip_schema.CLEANED_SCHEMA) + trip_schema.LABEL_FIELDS}
+    for i, name in enumerate(table.column_names):
+        if name in fields:
+            field = fields[name]
+            if table.schema.field(i).type != field.type:
+                table = table.set_column(i, field, table.column(i).cast(field.type))
+    return table
+
+
+def _nullable_int8(column):
+    # Int8 array over the Arrow value buffer; pandas' own conversion copies it
+    array = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+    if len(array) == 0:
+        return pd.array([], dtype='Int8')
+    values = np.frombuffer(array.buffers()[1], dtype=np.int8)[array.offset:array.offset + len(array)]
+    mask = array.is_null().to_numpy(zero_copy_only=False)
+    return pd.arrays.IntegerArray(values, mask, copy=False)
+
+
+def _to_pandas(table):
+    # The code columns are nullable Int8 whoever wrote the file: by default
+    # pandas picks Int8, int8 or float64 depending on the writer's pandas
+    # metadata and on whether a null is present
+    codes = [name for name in trip_schema.CODE_COLUMNS if name in table.column_names]
+    # split_blocks keeps numeric columns as views of the (memory-mapped) Arrow
+    # buffers instead of consolidating them into new 2-D blocks
+    df = table.drop_columns(codes).to_pandas(split_blocks=True)
+    columns = {name: _nullable_int8(table.column(name)) if name in codes else df[name]
+               for name in table.column_names}
+    # Assigning or inserting a column would copy it
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_trips(path='cleaned_trips.parquet', start=None, end=None, columns=None, filters=None):
+    """
+    Load cleaned trips, optionally restricted to a pickup time window, a subset
+    of columns and rows matching predicates
+
+    Args:
+        path: Parquet file, Arrow IPC file (.arrow/.feather, memory-mapped), or
+            directory written by write_partitioned, the incremental pipeline or
+            the Spark ETL
+        start: Inclusive lower bound on tpep_pickup_datetime (anything
+            pd.Timestamp accepts), or None
+        end: Exclusive upper bound on tpep_pickup_datetime, or None
+        columns: Columns to load (default: all); the others are never decoded
+        filters: Row predicates in the pandas/pyarrow filters format, e.g.
+            [('payment_type', '==', 1), ('trip_distance', '>', 10)] (ANDed;
+            a list of such lists is ORed). Filter columns need not be loaded.
+
+    Returns:
+        DataFrame: Matching trips (partition key columns are not included)
+    """
+    if is_arrow_ipc(path):
+        dataset = None
+        names = pa.ipc.open_file(pa.memory_map(path)).schema.names
+    else:
+        dataset = _open_dataset(path)
+        names = dataset.schema.names
+    expression = _time_window_filter(names, start, end)
+    if filters:
+        predicate = pq.filters_to_expression(filters)
+        expression = predicate if expression is None else expression & predicate
+    if dataset is None:
+        table = _read_arrow_ipc(path, columns, expression)
+    else:
+        if columns is None:
+            columns = [name for name in names if name not in PARTITION_COLUMNS]
+        table = dataset.to_table(columns=list(columns), filter=expression)
+    return _to_pandas(_conform(table))
+
+
+def source_stamp(trips_path):
+    """
+    Identify the current version of the cleaned trips
+
+    Args:
+        trips_path: Parquet file, Arrow IPC file or dataset directory
+
+    Returns:
+        dict: Absolute 'path', 'mtime_ns' (newest file of a directory) and
+            number of 'files'
+    """
+    path = os.path.abspath(trips_path)
+    if os.path.isdir(path):
+        mtimes = [os.stat(os.path.join(root, name)).st_mtime_ns
+                  for root, _, names in os.walk(path) for name in names]
+    else:
+        mtimes = [os.stat(path).st_mtime_ns]
+    return {'path': path, 'mtime_ns': max(mtimes, default=0), 'files': len(mtimes)}
+
+
+def write_derived(df, path, trips_path=None):
+    """
+    Save a table built from the cleaned trips as Parquet, recording
+    source_stamp(trips_path) in its metadata (written next to path and renamed,
+    so readers never see a partial file)
+
+    Args:
+        df: Derived DataFrame (cube cells, histogram counts, sketches)
+        path: Output Parquet path
+        trips_path: Cleaned trips df was built from, or None if it was built
+            from something else (e.g. several files or a time window)
+
+    Returns:
+        int: File size in bytes
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if trips_path is not None:
+        metadata = dict(table.schema.metadata or {})
+        metadata[SOURCE_METADATA_KEY] = json.dumps(source_stamp(trips_path)).encode('utf-8')
+        table = table.replace_schema_metadata(metadata)
+    partial = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+    pq.write_table(table, partial, compression='snappy')
+    os.replace(partial, path)
+    return os.path.getsize(path)
+
+
+def is_current(path, trips_path):
+    """
+    Whether a derived file exists and was built from the current version of
+    the cleaned trips
+
+    Args:
+        path: Derived Parquet file written by write_derived
+        trips_path: Cleaned trips it should reflect
+
+    Returns:
+        bool: False if path is missing, was built from another path or an older
+            version of trips_path, or carries no source metadata; True if
+            trips_path does not exist (there is nothing to rebuild from)
+    """
+    if not os.path.exists(path):
+        return False
+    if not os.path.exists(trips_path):
+        return True
+    recorded = (pq.read_schema(path).metadata or {}).get(SOURCE_METADATA_KEY)
+    return recorded is not None and json.loads(recorded) == source_stamp(trips_path)